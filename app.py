@@ -3,12 +3,13 @@ Flask Web Server for FnO Trading Dashboard
 Mobile-optimized for Samsung S10
 """
 
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, render_template, jsonify, request, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import threading
-import time
 from datetime import datetime
 import json
+import uuid
+import gzip
 import sys
 import os
 
@@ -17,6 +18,13 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import rate limiter
 from rate_limiter import get_rate_limiter, get_batch_manager
+from dashboard_state import get_publisher, format_event
+from lifecycle import get_lifecycle
+from ring_buffer import RingBuffer
+from config import LOGGING_CONFIG, SERVER_CONFIG
+import metrics
+import tracing
+import log_pipeline
 
 app = Flask(__name__)
 CORS(app)
@@ -25,12 +33,56 @@ CORS(app)
 rate_limiter = get_rate_limiter()
 batch_manager = get_batch_manager()
 
-# Global strategy instance
+# Push channel for /api/stream
+publisher = get_publisher()
+
+# Snapshot versions restart at 0 with the process: ETags carry this boot's id
+# so a version from an earlier run never matches (no false 304s)
+BOOT_ID = uuid.uuid4().hex[:12]
+
+# Open /api/stream connections each hold a server worker thread: cap them so
+# /api/* requests always have threads left (server.py sizes it to its pool)
+stream_slots = None
+
+def limit_streams(threads):
+    """Allow at most `threads` minus SERVER_CONFIG["STREAM_RESERVE"] concurrent streams"""
+    global stream_slots
+    stream_slots = threading.BoundedSemaphore(max(1, threads - SERVER_CONFIG.get('STREAM_RESERVE', 3)))
+
+limit_streams(SERVER_CONFIG.get('THREADS', 16))
+
+# Owns the single active strategy and its threads
+lifecycle = get_lifecycle()
+
+# Queued console / JSON-lines logging (log_pipeline.py)
+log = log_pipeline.get_logger('dashboard')
+log_pipeline.setup_logging()
+
+# Dashboard activity log (the strategy keeps its own in strategy.activity_logs)
+app_logs = RingBuffer(LOGGING_CONFIG.get('ACTIVITY_CAPACITY', 1000), spill=log_pipeline.activity_spill(log))
+DASHBOARD_LOGS = LOGGING_CONFIG.get('DASHBOARD_LOGS', 50)
+
+# Scrape-time gauges (read through the globals so a replay's limiter is picked up)
+metrics.gauge_func('fyers_calls_today', 'Fyers API calls counted today by the rate limiter',
+                   lambda: rate_limiter.get_stats()['calls_today'])
+metrics.gauge_func('fyers_calls_last_minute', 'Fyers API calls in the last minute',
+                   lambda: rate_limiter.get_stats()['calls_last_minute'])
+metrics.gauge_func('process_threads', 'Live Python threads', lambda: lifecycle.stats()['threads_total'])
+metrics.gauge_func('strategy_running', '1 while a strategy thread is alive', lambda: int(lifecycle.is_active()))
+metrics.gauge_func('log_queue_depth', 'Log records waiting for the writer thread', lambda: log_pipeline.stats()['queued'])
+metrics.gauge_func('log_records_dropped', 'Log records dropped because the queue was full',
+                   lambda: log_pipeline.stats()['dropped'])
+
+# Global strategy instance (the most recently started one, kept after a stop
+# so its positions stay visible and manual exits still work)
 strategy = None
-strategy_thread = None
-is_running = False
 
-# Store real-time data
+# Set on server shutdown: ends the updater thread and open streams
+shutdown_event = threading.Event()
+
+# Control fields set by request handlers / the strategy thread (single-key
+# assignments only). The updater merges these with live broker data into a
+# new immutable snapshot every second; clients are served from that snapshot.
 dashboard_data = {
     'status': 'idle',
     'current_time': '',
@@ -59,8 +111,7 @@ dashboard_data = {
         'NIFTY50': {'lp': 0, 'pc': 0},
         'BANKNIFTY': {'lp': 0, 'pc': 0}
     },
-    'is_virtual_trading': __import__('config').TRADING_CONFIG.get('VIRTUAL_TRADING', True),
-    'logs': []
+    'is_virtual_trading': __import__('config').TRADING_CONFIG.get('VIRTUAL_TRADING', True)
 }
 
 def load_access_token():
@@ -71,9 +122,15 @@ def load_access_token():
     except FileNotFoundError:
         return None
 
-def get_market_status():
+def get_now():
+    """Current time from the strategy clock (session time during replay)"""
+    if strategy is not None and hasattr(strategy, 'clock'):
+        return strategy.clock.now()
+    return datetime.now()
+
+def get_market_status(now=None):
     """Check if market is open"""
-    now = datetime.now()
+    now = now or get_now()
     current_time = now.time()
     
     # Market hours: 9:15 AM to 3:30 PM
@@ -92,181 +149,177 @@ def get_market_status():
         return 'closed'
 
 def add_log(message):
-    """Add a log entry to dashboard data"""
-    global dashboard_data
-    log_entry = {
+    """Add a log entry to the dashboard activity log"""
+    app_logs.append({
         'time': datetime.now().strftime('%H:%M:%S'),
         'message': message
+    })
+
+def activity_source():
+    """(name, ring buffer) of the activity log the dashboard shows"""
+    if strategy is not None:
+        return 'strategy', strategy.activity_logs
+    return 'dashboard', app_logs
+
+def clock_fields():
+    """Time / market / API-usage fields (cheap, no broker calls)"""
+    now_dt = get_now()
+    return {
+        'current_time': now_dt.strftime('%H:%M:%S'),
+        'market_status': get_market_status(now_dt),
+        'last_update': now_dt.isoformat(timespec='seconds'),
+        'api_stats': rate_limiter.get_stats()
     }
-    dashboard_data['logs'].insert(0, log_entry)
-    if len(dashboard_data['logs']) > 30:
-        dashboard_data['logs'] = dashboard_data['logs'][:30]
 
-def update_dashboard_data():
-    """Update dashboard data from strategy with tiered updates"""
-    global dashboard_data, strategy, rate_limiter
+EMPTY_POSITIONS = {
+    'qualified_stocks': {},
+    'total_positions_ce': 0,
+    'total_positions_pe': 0,
+    'total_capital_ce': 0,
+    'total_capital_pe': 0,
+    'total_pnl': 0,
+    'total_pnl_percent': 0,
+    'total_invested': 0,
+    'greeks': None,
+    'position_greeks': {}
+}
+
+def position_fields():
+    """
+    Qualified stocks with live P&L plus CE/PE totals (one batched quotes call)
+    
+    Quotes go into the strategy's PortfolioAggregator, which recomputes only
+    the positions whose price moved; the rows and totals are shared with the
+    strategy's own P&L monitor. Portfolio / per-position Greeks ride along.
+    """
+    portfolio = getattr(strategy, 'portfolio', None)
+    if portfolio is None or not len(portfolio):
+        return EMPTY_POSITIONS
+    
+    # Fetch all prices (options and their underlyings) in one batch call
+    quotes = strategy.get_multiple_prices(strategy.monitored_symbols())
+    portfolio.update_prices(quotes)
+    greeks = getattr(strategy, 'greeks', None)
+    if greeks is None:
+        return portfolio.dashboard_fields()
+    greeks.update(quotes)
+    return dict(portfolio.dashboard_fields(), **greeks.dashboard_fields())
+
+def build_dashboard_state(counter, market):
+    """
+    Build this cycle's dashboard state as a new dict
+    
+    `dashboard_data` holds the control fields request handlers set (status,
+    config, trading mode, logs); `market` holds the tiered broker data, owned
+    by the updater thread and carried between cycles.
     
+    API Trackers (Tiered)
+    Tier 0 (Every 1s): PnL and Stock Quotes
+    Tier 1 (Every 5s): Market Indices
+    Tier 2 (Every 10s): Order Book (every cycle from the local order index
+                        once the order stream runs - no API call)
+    Tier 3 (Every 15s): Funds
+    """
+    state = dict(dashboard_data)
+    state.update(clock_fields())
+    state['status'] = lifecycle.state
+    if lifecycle.error:
+        state['error'] = lifecycle.error
+    
+    if lifecycle.is_active() and strategy:
+        # Tier 1: Market Indices (Nifty / BankNifty)
+        if counter % 5 == 0:
+            indices = strategy.get_multiple_prices(['NSE:NIFTY50-INDEX', 'NSE:NIFTYBANK-INDEX'])
+            if indices:
+                nifty = indices.get('NSE:NIFTY50-INDEX', {})
+                banknifty = indices.get('NSE:NIFTYBANK-INDEX', {})
+                market['indices'] = {
+                    'NIFTY50': {'lp': nifty.get('lp', 0), 'pc': nifty.get('pc', 0)},
+                    'BANKNIFTY': {'lp': banknifty.get('lp', 0), 'pc': banknifty.get('pc', 0)}
+                }
+        
+        # Tier 2: Order Book
+        stream = getattr(strategy, 'order_stream', None)
+        if stream is not None and stream.started:
+            market['orders'] = stream.orders()
+        elif counter % 10 == 0:
+            market['orders'] = strategy.get_orders_book()
+        
+        # Tier 3: Funds
+        if counter % 15 == 0:
+            market['funds'] = strategy.get_funds()
+        
+        # Tier 0: Qualified stocks PnL (BATCHED)
+        market.update(position_fields())
+    
+    state.update(market)
+    # Newest activity entries (the ring buffer reuses the list until something is logged)
+    source, buffer = activity_source()
+    state['logs'] = buffer.latest(DASHBOARD_LOGS)
+    state['logs_source'] = source
+    return state
+
+def update_dashboard_data():
+    """
+    Dashboard updater thread: once a second, build a new state, serialize it
+    once and swap it in as the published snapshot
+    """
     counter = 0
-    while is_running and strategy:
+    market = {}
+    tracked = None
+    while not shutdown_event.is_set():
         try:
-            now_dt = datetime.now()
-            dashboard_data['current_time'] = now_dt.strftime('%H:%M:%S')
-            dashboard_data['market_status'] = get_market_status()
-            dashboard_data['last_update'] = now_dt.isoformat()
-            
-            # API Trackers (Tiered)
-            # Tier 0 (Every 1s): PnL and Stock Quotes
-            # Tier 1 (Every 5s): Market Indices
-            # Tier 2 (Every 10s): Order Book
-            # Tier 3 (Every 15s): Funds
+            if strategy is not tracked:
+                # New strategy: refresh every tier on its first cycle
+                tracked = strategy
+                counter = 0
             
-            # Update API stats
-            dashboard_data['api_stats'] = rate_limiter.get_stats()
+            # Push changed fields to /api/stream and /api/status clients
+            with metrics.DASHBOARD_CYCLE.time():
+                publisher.publish(build_dashboard_state(counter, market))
             
-            # Tier 1: Market Indices (Nifty / BankNifty)
-            if counter % 5 == 0:
-                indices = strategy.get_multiple_prices(['NSE:NIFTY50-INDEX', 'NSE:NIFTYBANK-INDEX'])
-                if indices:
-                    nifty = indices.get('NSE:NIFTY50-INDEX', {})
-                    banknifty = indices.get('NSE:NIFTYBANK-INDEX', {})
-                    dashboard_data['indices']['NIFTY50'] = {
-                        'lp': nifty.get('lp', 0),
-                        'pc': nifty.get('pc', 0)
-                    }
-                    dashboard_data['indices']['BANKNIFTY'] = {
-                        'lp': banknifty.get('lp', 0),
-                        'pc': banknifty.get('pc', 0)
-                    }
-
-            # Tier 2: Order Book
-            if counter % 10 == 0:
-                dashboard_data['orders'] = strategy.get_orders_book()
-
-            # Tier 3: Funds
-            if counter % 15 == 0:
-                dashboard_data['funds'] = strategy.get_funds()
-                
-            # Update activity logs from strategy
-            if hasattr(strategy, 'activity_logs'):
-                dashboard_data['logs'] = strategy.activity_logs
-            
-            # Tier 0: Update qualified stocks PnL (BATCHED)
-            if hasattr(strategy, 'qualified_stocks') and strategy.qualified_stocks:
-                # Ensure we have a place to store existing prices
-                if 'qualified_stocks' not in dashboard_data:
-                    dashboard_data['qualified_stocks'] = {}
-                
-                total_pnl = 0
-                total_invested = 0
-                pos_ce = 0
-                pos_pe = 0
-                cap_ce = 0
-                cap_pe = 0
-                
-                current_qualified = {}
-                
-                # Fetch all prices in one batch call
-                symbols = [details['option_symbol'] for details in strategy.qualified_stocks.values()]
-                prices = strategy.get_multiple_prices(symbols)
-                
-                for stock, details in strategy.qualified_stocks.items():
-                    opt_symbol = details['option_symbol']
-                    side = details.get('type', 'CE')
-                    lot_size = details.get('lot_size', 1)
-                    investment = details['entry_price'] * lot_size
-                    
-                    # Get price from batch results
-                    price_info = prices.get(opt_symbol, {})
-                    fresh_price = price_info.get('lp') if isinstance(price_info, dict) else None
-                    
-                    # Use fresh price if available, otherwise fallback to last known or entry
-                    last_known = dashboard_data.get('qualified_stocks', {}).get(stock, {}).get('current_price')
-                    current_price = fresh_price if fresh_price is not None else (last_known if last_known is not None else details['entry_price'])
-                    
-                    pnl_per_share = current_price - details['entry_price']
-                    total_pnl_for_stock = pnl_per_share * lot_size
-                    pnl_percent = (pnl_per_share / details['entry_price']) * 100
-                    
-                    total_pnl += total_pnl_for_stock
-                    total_invested += investment
-                    
-                    if side == 'CE':
-                        pos_ce += 1
-                        cap_ce += investment
-                    else:
-                        pos_pe += 1
-                        cap_pe += investment
-                    
-                    current_qualified[stock] = {
-                        'symbol': stock,
-                        'option_symbol': opt_symbol,
-                        'type': side,
-                        'strike': details['strike'],
-                        'entry_price': details['entry_price'],
-                        'current_price': current_price,
-                        'total_pnl': total_pnl_for_stock,
-                        'pnl_percent': pnl_percent,
-                        'lot_size': lot_size,
-                        'investment': investment,
-                        'entry_time': details['entry_time'].strftime('%H:%M:%S'),
-                        'is_stale': fresh_price is None
-                    }
-                
-                dashboard_data['qualified_stocks'] = current_qualified
-                dashboard_data['total_positions_ce'] = pos_ce
-                dashboard_data['total_positions_pe'] = pos_pe
-                dashboard_data['total_capital_ce'] = cap_ce
-                dashboard_data['total_capital_pe'] = cap_pe
-                
-                if total_invested > 0:
-                    dashboard_data['total_pnl'] = total_pnl
-                    dashboard_data['total_pnl_percent'] = (total_pnl / total_invested) * 100
-                    dashboard_data['total_invested'] = total_invested
-                else:
-                    dashboard_data['total_pnl'] = 0
-                    dashboard_data['total_pnl_percent'] = 0
-                    dashboard_data['total_invested'] = 0
-            else:
-                dashboard_data['qualified_stocks'] = {}
-                dashboard_data['total_positions_ce'] = 0
-                dashboard_data['total_positions_pe'] = 0
-                dashboard_data['total_capital_ce'] = 0
-                dashboard_data['total_capital_pe'] = 0
-                dashboard_data['total_pnl'] = 0
-                dashboard_data['total_pnl_percent'] = 0
-                dashboard_data['total_invested'] = 0
-            
-            counter += 1
-            time.sleep(1)  # 1 second updates for PnL
+            if lifecycle.is_active() and strategy:
+                counter += 1
+            shutdown_event.wait(1)  # 1 second updates for PnL
             
         except Exception as e:
             print(f"Error updating dashboard: {e}")
             import traceback
             traceback.print_exc()
-            time.sleep(2)
+            shutdown_event.wait(2)
 
-def run_strategy_background():
-    """Run strategy in background thread"""
-    global strategy, dashboard_data, is_running
+updater_thread = None
+updater_lock = threading.Lock()
+
+def ensure_dashboard_updater():
+    """Start the dashboard updater thread once (publishing a first snapshot)"""
+    global updater_thread
+    with updater_lock:
+        if updater_thread is None or not updater_thread.is_alive():
+            if publisher.seq == 0:
+                publisher.publish(build_dashboard_state(0, {}))
+            updater_thread = threading.Thread(target=update_dashboard_data, name='dashboard-updater', daemon=True)
+            updater_thread.start()
+
+def shutdown(timeout=10):
+    """
+    Graceful shutdown: stop the strategy (open positions are left as they
+    are), wait for its thread, and end the updater and open streams
     
-    try:
-        dashboard_data['status'] = 'running'
-        strategy.run()
-    except Exception as e:
-        dashboard_data['status'] = 'error'
-        dashboard_data['error'] = str(e)
-        print(f"Strategy error: {e}")
-        import traceback
-        traceback.print_exc()
-    finally:
-        is_running = False
-        dashboard_data['status'] = 'stopped'
+    Args:
+        timeout: Seconds to wait for the strategy thread
+    """
+    lifecycle.stop(timeout)
+    shutdown_event.set()
+    from journal import close_journal
+    close_journal()
 
 @app.route('/')
 def index():
     """Main dashboard page"""
     try:
-        return render_template('dashboard.html')
+        from config import DASHBOARD_CONFIG
+        return render_template('dashboard.html', poll_ms=DASHBOARD_CONFIG.get('POLL_FALLBACK_MS', 1000))
     except Exception as e:
         print(f"Error rendering template: {e}")
         import traceback
@@ -381,41 +434,176 @@ def generate_token():
             'message': str(e)
         })
 
+def json_response(data, etag=None, gzipped=None):
+    """
+    Response for pre-encoded JSON bytes with an optional ETag, gzipped when
+    large enough and the client accepts it
+    
+    Args:
+        data: JSON body (bytes)
+        etag: ETag header value
+        gzipped: Optional callable returning the already-compressed body
+    """
+    from config import DASHBOARD_CONFIG
+    
+    headers = {'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if etag:
+        headers['ETag'] = etag
+    if (len(data) >= DASHBOARD_CONFIG.get('GZIP_MIN_BYTES', 1024)
+            and 'gzip' in request.headers.get('Accept-Encoding', '')):
+        data = gzipped() if gzipped else gzip.compress(data, compresslevel=5)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(data, mimetype='application/json', headers=headers)
+
 @app.route('/api/status')
 def get_status():
-    """Get current status"""
+    """
+    Get current status
+    
+    Query:
+        since: Version the client already has; only sections changed after
+               it are returned ({"version", "since", "changes", "removed"})
+    
+    Sends 304 when If-None-Match matches the current version. ETags are
+    "<boot id>-<version>": a client holding one from before a restart gets
+    the full state, not a 304 or a delta against the wrong version. Bodies
+    come pre-serialized from the published snapshot; nothing is encoded here.
+    """
     try:
-        # Update current time even if strategy not running
-        dashboard_data['current_time'] = datetime.now().strftime('%H:%M:%S')
-        dashboard_data['market_status'] = get_market_status()
-        dashboard_data['last_update'] = datetime.now().isoformat()
-        
-        # Update API stats
-        dashboard_data['api_stats'] = rate_limiter.get_stats()
-        
-        return jsonify(dashboard_data)
+        ensure_dashboard_updater()
+        
+        since = request.args.get('since', type=int)
+        client_etag = request.headers.get('If-None-Match', '')
+        if client_etag and f'"{BOOT_ID}-' not in client_etag:
+            since = None  # Version from an earlier run
+        snapshot, body = publisher.status_body(since)
+        etag = f'"{BOOT_ID}-{snapshot.seq}"'
+        if etag in client_etag:
+            return Response(status=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+        return json_response(body, etag=etag,
+                             gzipped=snapshot.gzip_body if body is snapshot.body else None)
     except Exception as e:
         print(f"Error in get_status: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/stream')
+def stream_status():
+    """
+    Server-Sent Events stream of dashboard state
+    
+    Sends one full 'snapshot' event, then 'delta' events carrying only the
+    fields that changed. Reconnecting browsers resume from Last-Event-ID
+    (or ?since=<seq>); if that is too old, a fresh snapshot is sent.
+    Above the stream cap (limit_streams) the answer is 503 and the page
+    polls /api/status instead.
+    """
+    from config import DASHBOARD_CONFIG
+    heartbeat = DASHBOARD_CONFIG.get('STREAM_HEARTBEAT_SECONDS', 15)
+    retry_ms = DASHBOARD_CONFIG.get('STREAM_RETRY_MS', 2000)
+    
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        since = int(since) if since is not None else None
+    except ValueError:
+        since = None
+    
+    slots = stream_slots
+    if not slots.acquire(blocking=False):
+        response = jsonify({'success': False, 'message': 'Too many open streams - poll /api/status'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    ensure_dashboard_updater()
+    
+    def generate():
+        last = since
+        events = publisher.deltas_since(last) if last is not None else None
+        yield f'retry: {retry_ms}\n\n'
+        quiet = 0
+        while not shutdown_event.is_set():
+            if events is None:
+                last, payload = publisher.snapshot_event()
+                yield format_event(last, payload, event='snapshot')
+                quiet = 0
+            elif events:
+                for seq, payload in events:
+                    yield format_event(seq, payload, event='delta')
+                last = events[-1][0]
+                quiet = 0
+            else:
+                quiet += 1
+                if quiet >= heartbeat:
+                    yield ': heartbeat\n\n'
+                    quiet = 0
+            
+            events = publisher.wait_for_deltas(last, timeout=1.0)
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # The server closes the response when the client goes away (even before the first event)
+    response.call_on_close(slots.release)
+    return response
+
 @app.route('/api/start', methods=['POST'])
 def start_strategy():
     """Start the trading strategy"""
-    global strategy, strategy_thread, is_running
+    global strategy, rate_limiter
     
-    if is_running:
-        return jsonify({'success': False, 'message': 'Strategy already running'})
+    if lifecycle.is_active():
+        message = 'Previous strategy is still stopping' if lifecycle.state == 'stopping' else 'Strategy already running'
+        return jsonify({'success': False, 'message': message})
     
     try:
         # Import here to avoid circular imports
-        from fno_trading_strategy import FnOTradingStrategy
-        from config import FYERS_CONFIG, STOCK_LIST
+        from config import FYERS_CONFIG, STOCK_LIST, REPLAY_CONFIG, TRADING_CONFIG
+        
+        if TRADING_CONFIG.get("ASYNC_MODE"):
+            from async_strategy import AsyncFnOTradingStrategy as strategy_cls
+        else:
+            from fno_trading_strategy import FnOTradingStrategy as strategy_cls
         
         # Get credentials
         client_id = FYERS_CONFIG.get("CLIENT_ID")
         access_token = FYERS_CONFIG.get("ACCESS_TOKEN")
+        fyers_client = None
+        clock = None
+        journal = None
+        
+        if REPLAY_CONFIG.get("ENABLED"):
+            # Offline replay: serve the broker from a recorded session file
+            from fyers_replay import create_replay_client
+            from rate_limiter import FyersRateLimiter
+            fyers_client, clock = create_replay_client(
+                REPLAY_CONFIG["SESSION_FILE"],
+                speed=REPLAY_CONFIG.get("SPEED", 1),
+                start_time=REPLAY_CONFIG.get("START_TIME", "09:14:00"),
+                latency_ms=REPLAY_CONFIG.get("LATENCY_MS", 0)
+            )
+            # Rate windows must run on session time too
+            rate_limiter = FyersRateLimiter(clock=clock)
+            client_id = fyers_client.client_id
+            access_token = "replay"
+            # Keep replayed trades out of the live journal
+            if REPLAY_CONFIG.get("JOURNAL_PATH"):
+                from journal import get_journal
+                journal = get_journal(REPLAY_CONFIG["JOURNAL_PATH"])
+            else:
+                journal = False
+            add_log(f"Replay mode: {REPLAY_CONFIG['SESSION_FILE']} at {REPLAY_CONFIG.get('SPEED', 1)}x")
+        
+        # Live: only scan underlyings that have F&O contracts (replays scan what was recorded)
+        stock_list = STOCK_LIST
+        if not REPLAY_CONFIG.get("ENABLED"):
+            from universe import get_universe
+            universe = get_universe(STOCK_LIST)
+            stock_list = universe['stocks']
+            if len(stock_list) != len(STOCK_LIST):
+                add_log(f"Universe: {len(stock_list)} tradable of {len(STOCK_LIST)} configured stocks")
         
         if not access_token or access_token == "YOUR_ACCESS_TOKEN_HERE":
             access_token = load_access_token()
@@ -432,41 +620,39 @@ def start_strategy():
                 'message': 'Access token not found. Please run: python3 fyers_auth.py'
             })
         
-        # Initialize strategy
-        strategy = FnOTradingStrategy(
-            client_id=client_id,
-            access_token=access_token,
-            stock_list=STOCK_LIST
-        )
-        
-        # Sync virtual trading mode
-        strategy.virtual_trading = dashboard_data['is_virtual_trading']
-        
-        # Pre-fetch previous day data to speed up scan
-        try:
-            strategy.pre_fetch_prev_day_data()
-        except Exception as e:
-            print(f"Error pre-fetching data: {e}")
-        
-        # Start strategy in background
-        is_running = True
-        strategy_thread = threading.Thread(target=run_strategy_background, daemon=True)
-        strategy_thread.start()
-        
-        # Start dashboard update thread
-        update_thread = threading.Thread(target=update_dashboard_data, daemon=True)
-        update_thread.start()
-        
-        dashboard_data['status'] = 'running'
+        def create_strategy():
+            instance = strategy_cls(
+                client_id=client_id,
+                access_token=access_token,
+                stock_list=stock_list,
+                rate_limiter=rate_limiter,
+                fyers_client=fyers_client,
+                clock=clock,
+                journal=journal
+            )
+            # Sync virtual trading mode
+            instance.virtual_trading = dashboard_data['is_virtual_trading']
+            return instance
+        
+        # Start strategy in background (pre-fetch runs on the strategy thread)
+        started, message = lifecycle.start(create_strategy)
+        if not started:
+            return jsonify({'success': False, 'message': message})
+        strategy = lifecycle.strategy
+        
+        # Make sure the dashboard updater is publishing
+        ensure_dashboard_updater()
+        
+        from scheduler import format_scan_time
         dashboard_data['config'] = {
             'timeframe': FYERS_CONFIG.get('TIMEFRAME', '3 MIN'),
-            'scan_time': '09:18:10',
-            'stock_count': len(STOCK_LIST)
+            'scan_time': format_scan_time(TRADING_CONFIG['SCAN_TIME']),
+            'stock_count': len(stock_list)
         }
         
         return jsonify({
             'success': True, 
-            'message': 'Strategy started successfully'
+            'message': message
         })
         
     except ImportError as e:
@@ -488,17 +674,73 @@ def start_strategy():
 
 @app.route('/api/stop', methods=['POST'])
 def stop_strategy():
-    """Stop the trading strategy"""
-    global is_running
+    """Stop the trading strategy (open positions are left as they are)"""
+    from config import SERVER_CONFIG
+    
+    stopped = lifecycle.stop(timeout=SERVER_CONFIG.get('SHUTDOWN_TIMEOUT', 10))
+    
+    return jsonify({
+        'success': stopped, 
+        'message': 'Strategy stopped' if stopped else 'Stop requested; strategy is finishing its current call'
+    })
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/logs')
+def get_logs():
+    """
+    Activity log entries after a sequence number
     
-    is_running = False
-    dashboard_data['status'] = 'stopped'
+    Query:
+        since: Last seq the client has (default 0 = everything kept in memory)
+        limit: Max entries (newest), default 200
+        source: 'strategy' or 'dashboard' (default: the one the dashboard shows)
     
+    Returns:
+        {"source", "last_seq", "first_seq", "entries": [oldest ... newest]}
+        Entries older than first_seq were dropped from memory (the full day
+        is in the activity log file).
+    """
+    since = request.args.get('since', 0, type=int)
+    limit = request.args.get('limit', 200, type=int)
+    source, buffer = activity_source()
+    if request.args.get('source') == 'dashboard':
+        source, buffer = 'dashboard', app_logs
+    elif request.args.get('source') == 'strategy' and strategy is not None:
+        source, buffer = 'strategy', strategy.activity_logs
     return jsonify({
-        'success': True, 
-        'message': 'Strategy stopped'
+        'source': source,
+        'last_seq': buffer.last_seq,
+        'first_seq': buffer.first_seq,
+        'entries': buffer.since(since, limit=limit)
     })
 
+@app.route('/api/trace', methods=['GET', 'POST'])
+def trace_control():
+    """
+    Scan tracing status (GET) or toggle (POST {"enabled": true/false})
+    
+    Trace files are Chrome trace-event JSON: open them in chrome://tracing or ui.perfetto.dev
+    """
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            tracing.enable(data.get('enabled', not tracing.is_enabled()))
+            add_log(f"Scan tracing {'enabled' if tracing.is_enabled() else 'disabled'}")
+        else:
+            tracing.flush()
+        return jsonify({'success': True, **tracing.status()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/api/lifecycle')
+def get_lifecycle_stats():
+    """Strategy state plus live thread / worker counts"""
+    return jsonify(lifecycle.stats())
+
 @app.route('/api/exit-position', methods=['POST'])
 def exit_position():
     """Exit an individual position"""
@@ -527,10 +769,13 @@ def get_config():
     try:
         from config import TRADING_CONFIG, STOCK_LIST
         
+        # The running strategy's compiled universe, else the configured list
+        stocks = list(strategy.stock_list) if strategy is not None else STOCK_LIST
+        
         return jsonify({
             'timeframe': TRADING_CONFIG['TIMEFRAME'],
-            'stocks': STOCK_LIST,
-            'stock_count': len(STOCK_LIST),
+            'stocks': stocks,
+            'stock_count': len(stocks),
             'scan_time': f"{TRADING_CONFIG['SCAN_TIME']['HOUR']}:{TRADING_CONFIG['SCAN_TIME']['MINUTE']:02d}:{TRADING_CONFIG['SCAN_TIME']['SECOND']:02d}",
             'monitor_interval': TRADING_CONFIG['MONITOR_INTERVAL']
         })
@@ -551,9 +796,13 @@ def get_api_stats():
     """Get API usage statistics"""
     try:
         stats = rate_limiter.get_stats()
+        stream = getattr(strategy, 'order_stream', None)
+        fills = getattr(strategy, 'fills', None)
         return jsonify({
             'success': True,
-            'stats': stats
+            'stats': stats,
+            'order_stream': stream.get_stats() if stream is not None else None,
+            'fills': fills.get_stats() if fills is not None else None
         })
     except Exception as e:
         return jsonify({
@@ -565,7 +814,8 @@ def get_api_stats():
 def test_connection():
     """Test Fyers API connection"""
     try:
-        from fyers_apiv3 import fyersModel
+        from fyers_client import create_fyers_client
+        from rate_limiter import RateLimitedClient
         from config import FYERS_CONFIG
         
         client_id = FYERS_CONFIG.get("CLIENT_ID")
@@ -580,7 +830,8 @@ def test_connection():
                 'message': 'Missing credentials. Please update config.py or run fyers_auth.py'
             })
         
-        fyers = fyersModel.FyersModel(client_id=client_id, token=access_token)
+        # Always the live account: counted against the shared (live) budget
+        fyers = RateLimitedClient(create_fyers_client(client_id, access_token), get_rate_limiter())
         response = fyers.get_profile()
         
         if response.get('s') == 'ok':
@@ -674,5 +925,12 @@ if __name__ == '__main__':
     print("\nPress Ctrl+C to stop")
     print("="*70 + "\n")
     
-    # Run on all interfaces so phone can connect
-    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
+    from config import SERVER_CONFIG
+    if '--dev' in sys.argv or SERVER_CONFIG.get('DEV_SERVER'):
+        # Development only: reloader + debugger (runs the app twice)
+        app.run(host=SERVER_CONFIG.get('HOST', '0.0.0.0'), port=SERVER_CONFIG.get('PORT', 5000),
+                debug=True, threaded=True)
+    else:
+        # Run on all interfaces so phone can connect
+        from server import serve
+        serve(sys.modules[__name__])
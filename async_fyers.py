@@ -0,0 +1,147 @@
+"""
+Asyncio Fyers Client
+Wraps quotes / history / orders / funds as coroutines on one shared aiohttp
+session, so hundreds of requests can be in flight on a single thread.
+"""
+
+import asyncio
+
+import aiohttp
+from fyers_apiv3 import fyersModel
+
+from config import ASYNC_CONFIG, HTTP_POOL_CONFIG
+from log_pipeline import get_logger
+
+log = get_logger('async_fyers')
+
+QUOTES_BATCH_SIZE = 50  # Fyers max symbols per quotes request
+
+
+class AsyncFyersClient:
+    """
+    Async counterpart of fyersModel.FyersModel for the calls the strategy uses.
+
+    Either talks to Fyers directly (client_id + access_token) through
+    FyersModel(is_async=True) with a pooled aiohttp session, or adapts an
+    existing synchronous client (e.g. SimulatedFyersModel during replay) by
+    running its calls in a worker thread.
+
+    Use as an async context manager so the HTTP session is closed:
+
+        async with AsyncFyersClient(client_id, token) as client:
+            response = await client.quotes({"symbols": "NSE:SBIN-EQ"})
+    """
+
+    def __init__(self, client_id=None, access_token=None, sync_client=None):
+        """
+        Args:
+            client_id: Fyers client ID
+            access_token: Fyers access token
+            sync_client: Optional synchronous client to adapt instead of calling Fyers
+        """
+        self.sync_client = sync_client
+        self.model = None
+        self.session = None
+        if sync_client is None:
+            self.model = fyersModel.FyersModel(client_id=client_id, token=access_token, is_async=True)
+
+    async def open(self):
+        """Create the pooled aiohttp session (must run inside the event loop)"""
+        if self.model is not None and self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=ASYNC_CONFIG.get('MAX_CONNECTIONS', 100),
+                limit_per_host=ASYNC_CONFIG.get('MAX_CONNECTIONS_PER_HOST', 50),
+                keepalive_timeout=ASYNC_CONFIG.get('KEEPALIVE_SECONDS', 60),
+                ttl_dns_cache=300
+            )
+            timeout = aiohttp.ClientTimeout(
+                sock_connect=HTTP_POOL_CONFIG.get('CONNECT_TIMEOUT', 3.05),
+                sock_read=HTTP_POOL_CONFIG.get('READ_TIMEOUT', 10)
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self.model.service.session = self.session
+            self.model.service._session_created_here = False
+        return self
+
+    async def close(self):
+        """Close the HTTP session"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _call(self, name, *args):
+        if self.model is not None:
+            return await getattr(self.model, name)(*args)
+        return await asyncio.to_thread(getattr(self.sync_client, name), *args)
+
+    async def quotes(self, data):
+        return await self._call('quotes', data)
+
+    async def history(self, data):
+        return await self._call('history', data)
+
+    async def place_order(self, data):
+        return await self._call('place_order', data)
+
+    async def orderbook(self):
+        return await self._call('orderbook')
+
+    async def funds(self):
+        return await self._call('funds')
+
+    async def get_profile(self):
+        return await self._call('get_profile')
+
+    async def warm_connections(self, count=None):
+        """
+        Open `count` keep-alive connections to the API host with HEAD requests
+        (not API calls, so no rate-limit budget is used)
+
+        Returns:
+            int: Number of connections that answered
+        """
+        if self.session is None:
+            return 0
+        count = count or ASYNC_CONFIG.get('WARM_CONNECTIONS', 20)
+
+        async def touch():
+            try:
+                async with self.session.head(fyersModel.Config.DATA_API):
+                    return 1
+            except Exception:
+                return 0
+
+        return sum(await asyncio.gather(*(touch() for _ in range(count))))
+
+    async def batch_quotes(self, symbols, rate_limiter):
+        """
+        Get quotes for many symbols, 50 per request, all batches in flight at once
+
+        Args:
+            symbols: List of symbols
+            rate_limiter: AsyncRateLimiter
+
+        Returns:
+            dict: Symbol -> quote data
+        """
+        batches = [symbols[i:i + QUOTES_BATCH_SIZE] for i in range(0, len(symbols), QUOTES_BATCH_SIZE)]
+        responses = await asyncio.gather(
+            *(rate_limiter.make_call(self.quotes, {"symbols": ",".join(batch)}) for batch in batches),
+            return_exceptions=True
+        )
+
+        quotes = {}
+        for response in responses:
+            if isinstance(response, Exception):
+                log.error(f"Error fetching batch quotes: {response}")
+                continue
+            if response.get('s') == 'ok' and 'd' in response:
+                for quote_data in response['d']:
+                    quotes[quote_data['n']] = quote_data['v']
+        return quotes
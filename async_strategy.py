@@ -0,0 +1,320 @@
+"""
+Asyncio variant of the NSE FnO Trading Strategy
+Same entry rules, order payloads and P&L logic as FnOTradingStrategy, but the
+scan, monitoring and exits run as coroutines on one event loop instead of
+thread pools, so every in-flight request costs a coroutine, not a thread.
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+
+from fno_trading_strategy import FnOTradingStrategy
+from async_fyers import AsyncFyersClient
+from rate_limiter import AsyncRateLimiter
+from metrics import ORDER_RTT
+from log_pipeline import get_logger
+import tracing
+
+log = get_logger('strategy.async')
+
+
+class AsyncFnOTradingStrategy(FnOTradingStrategy):
+    def __init__(self, client_id, access_token, stock_list, rate_limiter=None,
+                 fyers_client=None, clock=None, journal=None):
+        """
+        Initialize the async trading strategy (arguments as FnOTradingStrategy)
+        
+        The synchronous client is still created for callers outside the event
+        loop (dashboard thread, manual exits); both share one rate-limit budget.
+        """
+        super().__init__(client_id, access_token, stock_list, rate_limiter=rate_limiter,
+                         fyers_client=fyers_client, clock=clock, journal=journal)
+        from config import ASYNC_CONFIG
+        
+        self.async_rate_limiter = AsyncRateLimiter(self.rate_limiter)
+        self.max_in_flight = ASYNC_CONFIG.get('MAX_IN_FLIGHT', 100)
+        self.async_client = None
+        self._semaphore = None
+
+    def _make_async_client(self):
+        """Direct async client for live Fyers, thread adapter for simulated clients"""
+        if getattr(self.fyers, 'service', None) is not None:
+            return AsyncFyersClient(self.client_id, self.access_token)
+        return AsyncFyersClient(sync_client=self.fyers)
+
+    async def _api(self, name, *args):
+        """Rate-limited call on the async client, bounded by MAX_IN_FLIGHT"""
+        async with self._semaphore:
+            return await self.async_rate_limiter.make_call(getattr(self.async_client, name), *args)
+
+    async def get_multiple_prices_async(self, symbols):
+        """Batched quotes for many symbols with all batches in flight at once"""
+        return await self.async_client.batch_quotes(symbols, self.async_rate_limiter)
+
+    async def get_previous_day_data_async(self, symbol):
+        try:
+            response = await self._api('history', self._prev_day_request(symbol))
+            return self._parse_prev_day(response)
+        except Exception as e:
+            log.error(f"Error getting previous day data for {symbol}: {e}")
+            return None
+
+    async def pre_fetch_prev_day_data_async(self):
+        """Pre-fetch previous day OHLC for every uncached stock concurrently"""
+        symbols = [self.get_symbol_format(stock) for stock in self.stock_list
+                   if self.get_symbol_format(stock) not in self.prev_day_cache]
+        if not symbols:
+            return
+        log.info(f"Pre-fetching previous day data for {len(symbols)} stocks...")
+        results = await asyncio.gather(*(self.get_previous_day_data_async(sym) for sym in symbols))
+        for sym, data in zip(symbols, results):
+            if data:
+                self.prev_day_cache[sym] = data
+        log.info(f"Pre-fetched data for {len(self.prev_day_cache)} / {len(self.stock_list)} stocks.")
+
+    async def get_first_candle_async(self, symbol):
+        try:
+            with tracing.span('first_candle', symbol=symbol):
+                for attempt, data in enumerate(self._first_candle_requests(symbol)):
+                    with tracing.span('first_candle_attempt', symbol=symbol, attempt=attempt):
+                        response = await self._api('history', data)
+                        candle = self._parse_first_candle(response, exact=(attempt == 0))
+                    if candle:
+                        return candle
+                return None
+        except Exception as e:
+            log.error(f"Error getting first candle for {symbol}: {e}")
+            return None
+
+    async def warm_up_async(self):
+        """Pre-scan warm-up: caches plus keep-alive connections in the aiohttp pool"""
+        started = time.perf_counter()
+        if not self.lot_size_map:
+            await asyncio.to_thread(self.load_lot_sizes)
+        await self.pre_fetch_prev_day_data_async()
+        await asyncio.to_thread(self.option_chain.warm)
+        warmed = await self.async_client.warm_connections()
+        elapsed = time.perf_counter() - started
+        self.log_activity(f"🔥 Warm-up done in {elapsed:.1f}s ({warmed} connections, {len(self.prev_day_cache)} prev-day cached)")
+
+    async def scan_stocks_async(self):
+        """
+        Async 9:18 scan: every first-candle request is in flight concurrently
+        (bounded by MAX_IN_FLIGHT and the shared rate limiter)
+        """
+        log.info(f"\n{'='*60}")
+        log.info(f"Starting async scan at {self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        log.info(f"Scanning {len(self.stock_list)} stocks...")
+        log.info(f"{'='*60}")
+        
+        with self._phase('total'):
+            scan_results = await self._run_scan_async()
+        self._journal('scan', None, scan_results)
+        tracing.flush()
+
+    async def _run_scan_async(self):
+        """Body of scan_stocks_async, timed per phase"""
+        scan_results = self._new_scan_results()
+        
+        # Step 1: First candles for all stocks, plus any missing prev-day data
+        with self._phase('first_candles'):
+            candles = await asyncio.gather(
+                *(self.get_first_candle_async(self.get_symbol_format(s)) for s in self.stock_list)
+            )
+        stock_data = dict(zip(self.stock_list, candles))
+        with self._phase('prev_day_fill'):
+            await self.pre_fetch_prev_day_data_async()
+        
+        # Step 2: Screen stocks that meet OHLC conditions
+        with self._phase('screen'):
+            potential_entries = self._screen_stocks(stock_data, scan_results)
+        if not potential_entries:
+            log.info("No stocks met OHLC entry conditions.")
+            return scan_results
+        
+        # Step 3: Option chains for all potential entries, then pick the contracts
+        log.info(f"Fetching option chains for {len(potential_entries)} potential entries...")
+        with self._phase('option_quotes'):
+            symbols = self.option_chain.plan(self._chain_wants(potential_entries))
+            chain_quotes = await self.get_multiple_prices_async(symbols) if symbols else {}
+            option_quotes = self._select_contracts(potential_entries, chain_quotes)
+        
+        # Step 4: Place all entry orders concurrently
+        orders = []
+        for entry in potential_entries:
+            order_data = self._qualify_entry(entry, option_quotes.get(entry['option_symbol']), scan_results)
+            if order_data:
+                orders.append((entry, order_data))
+        
+        with self._phase('orders'):
+            if self.virtual_trading:
+                for entry, order_data in orders:
+                    self._log_entry_order(entry, order_data, None)
+            else:
+                responses = await asyncio.gather(
+                    *(self._place_order_async(order_data, 'entry') for _, order_data in orders),
+                    return_exceptions=True
+                )
+                for (entry, order_data), resp in zip(orders, responses):
+                    if isinstance(resp, Exception):
+                        log.error(f"    ❌ ERROR: {resp}")
+                        self.fills.rejected(entry['stock'], 'entry', str(resp))
+                    else:
+                        self._log_entry_order(entry, order_data, resp)
+        
+        self._print_scan_summary(scan_results)
+        return scan_results
+
+    async def _place_order_async(self, order_data, kind):
+        """Rate-limited async place_order, recording the round trip (kind: entry / exit)"""
+        with ORDER_RTT.time(kind=kind):
+            return await self._api('place_order', order_data)
+
+    async def monitor_pnl_async(self):
+        """Fetch all position prices asynchronously, then report P&L"""
+        if not self.qualified_stocks:
+            log.info("No stocks to monitor")
+            return
+        try:
+            prices = await self.get_multiple_prices_async(self.monitored_symbols())
+        except Exception as e:
+            log.error(f"Error fetching batch prices: {e}")
+            prices = {}
+        self.monitor_pnl(prices)
+
+    async def exit_position_async(self, stock):
+        """Square off an open position at LTP (async)"""
+        blocked = self._exit_blocked(stock)
+        if blocked:
+            return blocked
+        
+        opt_symbol = self.qualified_stocks[stock]['option_symbol']
+        try:
+            if not self.virtual_trading:
+                self.fills.signal(stock, 'exit')
+                done = await asyncio.to_thread(self._exit_open_entry, stock)
+                if done:
+                    return done
+            
+            quotes = await self.get_multiple_prices_async([opt_symbol])
+            ltp = quotes.get(opt_symbol, {}).get('lp')
+            if not ltp:
+                return {"success": False, "message": f"Could not get LTP for {opt_symbol}"}
+            
+            log.info(f"SQUARING OFF {stock}: {opt_symbol} at {ltp}...")
+            if self.virtual_trading:
+                return self._finish_exit(stock, ltp, None)
+            response = await self._place_order_async(self._exit_order(stock, ltp), 'exit')
+            return self._finish_exit(stock, ltp, response)
+        except Exception as e:
+            log.error(f"Error exiting position for {stock}: {e}")
+            return {"success": False, "message": str(e)}
+
+    async def exit_all_positions_async(self):
+        """Exit all open positions concurrently (unfilled entry orders are cancelled)"""
+        running_stocks = self.open_positions()
+        if not running_stocks:
+            return {"success": True, "message": "No running positions to exit"}
+        
+        self.log_activity(f"⚠️ PANIC EXIT TRIGGERED for {len(running_stocks)} positions")
+        results = await asyncio.gather(*(self.exit_position_async(s) for s in running_stocks))
+        for stock, res in zip(running_stocks, results):
+            if res.get('success'):
+                self.log_activity(f"✅ Panic Exit: {stock} successful")
+            else:
+                self.log_activity(f"❌ Panic Exit: {stock} failed - {res.get('message')}")
+        return {"success": True, "results": list(results)}
+
+    async def run_async(self):
+        """
+        Main event loop - Scans ONCE at SCAN_TIME, then monitors P&L
+        """
+        from config import TRADING_CONFIG
+        from scheduler import format_scan_time
+        
+        scan_time = TRADING_CONFIG['SCAN_TIME']
+        scan_label = format_scan_time(scan_time)
+        warmup_seconds = TRADING_CONFIG.get('WARMUP_SECONDS', 30)
+        
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.async_client = self._make_async_client()
+        
+        async with self.async_client:
+            log.info("Starting FnO Trading Strategy (asyncio)...")
+            log.info(f"Monitoring stocks: {', '.join(self.stock_list)}")
+            log.info(f"\n⚠️  Entry conditions will be checked ONCE at {scan_label}")
+            
+            await asyncio.to_thread(self.start_order_stream)
+            if self.resume_from_journal():
+                log.info("\n♻️  Today's scan already ran - resuming P&L monitoring from the journal")
+                if self.qualified_stocks:
+                    await self.monitor_pnl_async()
+                    await asyncio.to_thread(self.reconcile_with_broker)
+            elif not await self._wait_and_scan_async(scan_label, scan_time, warmup_seconds):
+                return
+            
+            if not self.qualified_stocks:
+                log.info("\n✗ No stocks qualified for trading today")
+                log.info("Strategy will remain idle. You can stop it.")
+                return
+            
+            log.info(f"\n✓ Tracking {len(self.qualified_stocks)} stock(s)")
+            log.info("📊 Starting P&L monitoring (every 2 seconds)...")
+            
+            monitor_interval = 2
+            speed = getattr(self.clock, 'speed', 1.0)
+            while not self.stop_event.is_set():
+                try:
+                    started = self.clock.time()
+                    await self.monitor_pnl_async()
+                    elapsed = self.clock.time() - started
+                    await asyncio.sleep(max(monitor_interval - elapsed, 0.1) / speed)
+                except asyncio.CancelledError:
+                    log.info("\n\nStopping strategy...")
+                    raise
+                except Exception as e:
+                    log.error(f"\nError in monitoring loop: {e}")
+                    await asyncio.sleep(2 / speed)
+            
+            log.info("Strategy stopped")
+
+    async def _wait_and_scan_async(self, scan_label, scan_time, warmup_seconds):
+        """
+        Wait for SCAN_TIME (warming up shortly before) and run the entry scan
+        
+        Returns:
+            bool: False if the strategy was stopped before the scan
+        """
+        from config import TRADING_CONFIG
+        from scheduler import wait_until_async, scan_target
+        
+        now = self.clock.now()
+        target_time = scan_target(self.clock, scan_time)
+        
+        if now >= target_time:
+            log.info(f"\n⚠️  Already past {scan_label} - scanning now...")
+        else:
+            log.info(f"\nWaiting until {scan_label} ({(target_time - now).total_seconds():.0f} seconds)...")
+            warmup_time = target_time - timedelta(seconds=warmup_seconds)
+            if now < warmup_time:
+                if await wait_until_async(self.clock, warmup_time, spin_seconds=0,
+                                          stop_event=self.stop_event) is None:
+                    log.info("Strategy stopped before the scan")
+                    return False
+            await self.warm_up_async()
+            skew = await wait_until_async(self.clock, target_time,
+                                          spin_seconds=TRADING_CONFIG.get('SPIN_WAIT_MS', 5) / 1000.0,
+                                          stop_event=self.stop_event)
+            if skew is None:
+                log.info("Strategy stopped before the scan")
+                return False
+            self.log_activity(f"⏱️ Scan trigger fired {skew * 1000:+.2f} ms from {scan_label}")
+        
+        log.info("\n🔍 Starting ENTRY SCAN...")
+        await self.scan_stocks_async()
+        return True
+
+    def run(self):
+        """Run the async strategy on its own event loop (blocking, like FnOTradingStrategy.run)"""
+        asyncio.run(self.run_async())
@@ -0,0 +1,258 @@
+"""
+Greeks Benchmark
+Checks the vectorized Black-Scholes solver (greeks.py) against a scalar
+math.erf reference and times both at 10 / 100 / 300 / 1,000 contracts:
+
+- accuracy: IV recovered from reference premiums (vs the true vol and vs
+  the scalar solver) and delta / gamma / theta / vega differences
+- speed: IV + Greeks for every contract (vectorized call vs Python loop),
+  and a full GreeksEngine.update() over a PositionBook of that size with
+  every quote moving between ticks
+
+Usage:
+    python bench_greeks.py
+    python bench_greeks.py --sizes 100,300 --repeats 500
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from bench_scan import percentile, git_label, RESULTS_DIR
+from greeks import implied_vol, greeks, GreeksEngine, YEAR_DAYS
+from position_book import PositionBook
+
+RATE = 0.065
+
+
+# ----------------------------------------------------------------------
+# Scalar reference (exact normal CDF)
+# ----------------------------------------------------------------------
+
+def ref_cdf(x):
+    return 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
+
+
+def ref_pdf(x):
+    return math.exp(-0.5 * x * x) / math.sqrt(2 * math.pi)
+
+
+def ref_price(S, K, T, r, sigma, is_call):
+    vol_t = sigma * math.sqrt(T)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / vol_t
+    d2 = d1 - vol_t
+    if is_call:
+        return S * ref_cdf(d1) - K * math.exp(-r * T) * ref_cdf(d2)
+    return K * math.exp(-r * T) * ref_cdf(-d2) - S * ref_cdf(-d1)
+
+
+def ref_iv(price, S, K, T, r, is_call, tol=1e-6):
+    """Scalar Newton with bisection fallback"""
+    lo, hi = 1e-4, 5.0
+    sigma = min(max(math.sqrt(2 * math.pi / T) * price / S, 0.05), 2.0)
+    for _ in range(100):
+        diff = ref_price(S, K, T, r, sigma, is_call) - price
+        if abs(diff) <= tol:
+            return sigma
+        if diff < 0:
+            lo = sigma
+        else:
+            hi = sigma
+        d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * math.sqrt(T))
+        vega = S * ref_pdf(d1) * math.sqrt(T)
+        step = sigma - diff / vega if vega > 1e-12 else -1
+        sigma = step if lo < step < hi else 0.5 * (lo + hi)
+    return sigma
+
+
+def ref_greeks(S, K, T, r, sigma, is_call):
+    sqrt_t = math.sqrt(T)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    pdf = ref_pdf(d1)
+    delta = ref_cdf(d1) if is_call else ref_cdf(d1) - 1.0
+    gamma = pdf / (S * sigma * sqrt_t)
+    decay = -S * pdf * sigma / (2 * sqrt_t)
+    if is_call:
+        theta = decay - r * K * math.exp(-r * T) * ref_cdf(d2)
+    else:
+        theta = decay + r * K * math.exp(-r * T) * ref_cdf(-d2)
+    return delta, gamma, theta / YEAR_DAYS, S * pdf * sqrt_t / 100.0
+
+
+def ref_all(contracts):
+    """IV + Greeks for every contract, one at a time"""
+    out = []
+    for price, S, K, T, is_call in contracts:
+        iv = ref_iv(price, S, K, T, RATE, is_call)
+        out.append((iv,) + ref_greeks(S, K, T, RATE, iv, is_call))
+    return out
+
+
+def vector_all(arrays):
+    price, S, K, T, is_call = arrays
+    iv = implied_vol(price, S, K, T, RATE, is_call)
+    return iv, greeks(S, K, T, RATE, iv, is_call)
+
+
+# ----------------------------------------------------------------------
+# Workload
+# ----------------------------------------------------------------------
+
+def synthetic_contracts(count, seed=11):
+    """Liquid near-the-money stock options: (premium, spot, strike, years, is_call) plus the true vol"""
+    rng = random.Random(seed)
+    contracts, vols = [], []
+    for _ in range(count):
+        S = rng.uniform(100, 4000)
+        step = 5 if S < 500 else 10 if S < 1500 else 50
+        K = max(step, round(S * rng.uniform(0.9, 1.1) / step) * step)
+        T = rng.uniform(1, 60) / YEAR_DAYS
+        sigma = rng.uniform(0.15, 0.8)
+        is_call = rng.random() < 0.5
+        price = ref_price(S, K, T, RATE, sigma, is_call)
+        if price < 0.05:
+            price = 0.05
+            sigma = ref_iv(price, S, K, T, RATE, is_call)
+        contracts.append((price, S, K, T, is_call))
+        vols.append(sigma)
+    return contracts, vols
+
+
+class _Strategy:
+    """Just enough of FnOTradingStrategy for GreeksEngine"""
+
+    def __init__(self, book, now):
+        from clock import SimulatedClock
+        self.qualified_stocks = book
+        self.clock = SimulatedClock(now)
+        self.option_chain = None
+
+    def log_activity(self, message):
+        pass
+
+
+def build_engine(contracts, now):
+    """A PositionBook holding the contracts and a GreeksEngine over it"""
+    book = PositionBook()
+    quotes = {}
+    for i, (price, S, K, T, is_call) in enumerate(contracts):
+        expiry = now + timedelta(days=T * YEAR_DAYS)
+        side = 'CE' if is_call else 'PE'
+        symbol = f"NSE:BENCH{i:04d}{expiry:%y%b}{K}{side}".upper()
+        book[f"BENCH{i:04d}"] = {
+            'spot_symbol': f"NSE:BENCH{i:04d}-EQ", 'option_symbol': symbol, 'type': side, 'strike': K,
+            'entry_time': now, 'entry_price': price, 'spot_price': S, 'lot_size': 500, 'status': 'RUNNING'
+        }
+        quotes[symbol] = {'lp': price}
+        quotes[f"NSE:BENCH{i:04d}-EQ"] = {'lp': S}
+    engine = GreeksEngine(_Strategy(book, now))
+    # Exact expiries (the monthly-symbol rule would round them to month end)
+    for i, symbol in enumerate(book.option_symbols()):
+        engine._expiries[symbol] = now + timedelta(days=contracts[i][3] * YEAR_DAYS)
+    return engine, quotes
+
+
+def moving_quotes(quotes, count, seed=7):
+    """Quote batches that random-walk every price by a few basis points per tick"""
+    rng = random.Random(seed)
+    batches, prices = [], {symbol: quote['lp'] for symbol, quote in quotes.items()}
+    for _ in range(count):
+        prices = {symbol: price * (1 + rng.gauss(0, 0.002)) for symbol, price in prices.items()}
+        batches.append({symbol: {'lp': round(price, 2)} for symbol, price in prices.items()})
+    return iter(batches)
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {'p50': percentile(samples, 50) * 1e6, 'p95': percentile(samples, 95) * 1e6,
+            'mean': sum(samples) / len(samples) * 1e6}
+
+
+def run_size(count, repeats):
+    contracts, vols = synthetic_contracts(count)
+    arrays = tuple(np.array(column, dtype=float if i < 4 else bool) for i, column in enumerate(zip(*contracts)))
+
+    reference = ref_all(contracts)
+    iv, g = vector_all(arrays)
+    ref = np.array(reference)
+    accuracy = {
+        'iv_vs_true_volpts': float(np.nanmax(np.abs(iv - np.array(vols))) * 100),
+        'iv_vs_scalar_volpts': float(np.nanmax(np.abs(iv - ref[:, 0])) * 100),
+        'delta': float(np.nanmax(np.abs(g['delta'] - ref[:, 1]))),
+        'gamma': float(np.nanmax(np.abs(g['gamma'] - ref[:, 2]))),
+        'theta': float(np.nanmax(np.abs(g['theta'] - ref[:, 3]))),
+        'vega': float(np.nanmax(np.abs(g['vega'] - ref[:, 4]))),
+        'unsolved': int(np.isnan(iv).sum())
+    }
+
+    now = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+    engine, quotes = build_engine(contracts, now)
+    engine.update(quotes)
+    ticks = moving_quotes(quotes, repeats)
+    return {
+        'contracts': count,
+        'accuracy': accuracy,
+        'scalar_us': timed(lambda: ref_all(contracts), max(3, repeats // 20)),
+        'vector_us': timed(lambda: vector_all(arrays), repeats),
+        'engine_us': timed(lambda: engine.update(next(ticks)), repeats)
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vectorized vs scalar Black-Scholes IV / Greeks")
+    parser.add_argument("--sizes", default="10,100,300,1000", help="Contract counts (comma separated)")
+    parser.add_argument("--repeats", type=int, default=200, help="Timed runs per size")
+    parser.add_argument("--label", default=None, help="Result label (default: git revision)")
+    args = parser.parse_args()
+
+    label = args.label or git_label()
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    print("\n" + "=" * 78)
+    print("Greeks Benchmark")
+    print("=" * 78)
+
+    results = [run_size(count, args.repeats) for count in sizes]
+
+    print(f"{'Contracts':>9} {'scalar':>10} {'vector':>10} {'engine':>10} {'speedup':>8} "
+          f"{'IV err':>9} {'Δ err':>9} {'unsolved':>8}   (p50)")
+    for r in results:
+        a = r['accuracy']
+        print(f"{r['contracts']:>9} {r['scalar_us']['p50']:>8.0f}µs {r['vector_us']['p50']:>8.0f}µs "
+              f"{r['engine_us']['p50']:>8.0f}µs {r['scalar_us']['p50'] / r['vector_us']['p50']:>7.1f}x "
+              f"{a['iv_vs_scalar_volpts']:>7.1e}pt {a['delta']:>9.1e} {a['unsolved']:>8}")
+    print("IV err / Δ err: largest difference from the scalar math.erf reference (vol points / delta)")
+    print("=" * 78)
+
+    output = {
+        'label': label,
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'config': {'sizes': sizes, 'repeats': args.repeats, 'rate': RATE},
+        'results': results
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"greeks_{label}.json")
+    with open(path, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
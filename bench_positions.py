@@ -0,0 +1,156 @@
+"""
+Position Book Benchmark
+Compares the old dict-of-dicts qualified_stocks with the array-backed
+PositionBook at 10, 100 and 1,000 positions:
+
+- memory held by the book (tracemalloc)
+- per-tick cost of the P&L aggregator (portfolio.py) over positions read
+  from either store: a batch of quotes applied, then the CE/PE totals
+
+Usage:
+    python bench_positions.py
+    python bench_positions.py --sizes 10,100,1000,5000 --ticks 500
+"""
+
+import os
+import sys
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_scan import percentile, git_label, RESULTS_DIR
+from portfolio import PortfolioAggregator
+from position_book import PositionBook
+
+
+def synthetic_record(i, now):
+    """One qualified_stocks record shaped like execute_entry's"""
+    side = 'CE' if i % 2 == 0 else 'PE'
+    return {
+        'spot_symbol': f"NSE:BENCH{i:04d}-EQ",
+        'option_symbol': f"NSE:BENCH{i:04d}26JAN{1000 + i * 10}{side}",
+        'type': side,
+        'strike': 1000 + i * 10,
+        'entry_time': now,
+        'entry_price': 20.0 + i % 17,
+        'spot_price': 1000.0 + i * 10,
+        'lot_size': 500,
+        'status': 'RUNNING'
+    }
+
+
+def build_dicts(count, now):
+    return {f"BENCH{i:04d}": synthetic_record(i, now) for i in range(count)}
+
+
+def build_book(count, now):
+    book = PositionBook()
+    for i in range(count):
+        book[f"BENCH{i:04d}"] = synthetic_record(i, now)
+    return book
+
+
+def measure_memory(build, count, now):
+    """Bytes allocated (and still held) by building a book of `count` positions"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    book = build(count, now)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del book
+    return after - before
+
+
+def build_portfolio(book):
+    """The strategy's P&L aggregator over every position of a book"""
+    portfolio = PortfolioAggregator()
+    for stock in book:
+        portfolio.upsert(stock, book[stock])
+    return portfolio
+
+
+def tick(portfolio, quotes):
+    """One price tick: quotes applied, then the totals the dashboard reads"""
+    portfolio.update_prices(quotes)
+    return portfolio.summary()
+
+
+def time_ticks(portfolio, quote_batches):
+    samples = []
+    for quotes in quote_batches:
+        started = time.perf_counter()
+        tick(portfolio, quotes)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run_size(count, ticks):
+    now = datetime.now()
+    portfolios = {'dict': build_portfolio(build_dicts(count, now)), 'book': build_portfolio(build_book(count, now))}
+    symbols = portfolios['dict'].symbols()
+    quote_batches = [{s: {'lp': 20.0 + (t + j) % 23 * 0.05} for j, s in enumerate(symbols)} for t in range(ticks)]
+
+    # Same numbers from both
+    expected, actual = (tick(portfolios[name], quote_batches[0]) for name in ('dict', 'book'))
+    assert abs(expected['value'] - actual['value']) < 1e-6 * max(1.0, expected['value'])
+
+    result = {'positions': count}
+    for name, build in (('dict', build_dicts), ('book', build_book)):
+        result[name] = {'memory_bytes': measure_memory(build, count, now)}
+        # tick = every price moved; quiet = nothing moved (unchanged prices are skipped)
+        for key, batches in (('tick_us', quote_batches), ('quiet_us', quote_batches[-1:] * ticks)):
+            samples = time_ticks(portfolios[name], batches)
+            result[name][key] = {
+                'p50': percentile(samples, 50) * 1e6,
+                'p95': percentile(samples, 95) * 1e6,
+                'mean': sum(samples) / len(samples) * 1e6
+            }
+    return result
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="dict-of-dicts vs array-backed position book")
+    parser.add_argument("--sizes", default="10,100,1000", help="Book sizes (comma separated)")
+    parser.add_argument("--ticks", type=int, default=300, help="Quote batches per size")
+    parser.add_argument("--label", default=None, help="Result label (default: git revision)")
+    args = parser.parse_args()
+
+    label = args.label or git_label()
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    print("\n" + "=" * 70)
+    print("Position Book Benchmark")
+    print("=" * 70)
+
+    results = [run_size(count, args.ticks) for count in sizes]
+
+    print(f"{'Positions':>9} {'dict mem':>10} {'book mem':>10} {'dict tick':>10} {'book tick':>10} "
+          f"{'dict quiet':>10} {'book quiet':>10}   (p50)")
+    for r in results:
+        d, b = r['dict'], r['book']
+        print(f"{r['positions']:>9} {d['memory_bytes'] / 1024:>8.1f}KB {b['memory_bytes'] / 1024:>8.1f}KB "
+              f"{d['tick_us']['p50']:>8.0f}µs {b['tick_us']['p50']:>8.0f}µs "
+              f"{d['quiet_us']['p50']:>8.0f}µs {b['quiet_us']['p50']:>8.0f}µs")
+    print("=" * 70)
+
+    output = {
+        'label': label,
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'config': {'sizes': sizes, 'ticks': args.ticks},
+        'results': results
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"positions_{label}.json")
+    with open(path, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Scan-Latency Benchmark for scan_stocks_at_918
+Runs the real 9:18 scan against a local mock Fyers server with configurable
+latency, jitter and rate limits, at universe sizes of 50, 180 and 500 symbols.
+
+Reports p50/p99 time-to-first-order, time-to-last-order, API calls used and
+peak threads, and stores the results as JSON so regressions show up between
+versions.
+
+Usage:
+    python bench_scan.py                                  # 50/180/500 symbols, 5 runs each
+    python bench_scan.py --sizes 50 --repeats 10 --latency-ms 40 --jitter-ms 15
+    python bench_scan.py --client-limits 1000,100000      # measure without the client throttle
+    python bench_scan.py --compare bench_results/scan_latency_abc123.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import threading
+import contextlib
+import subprocess
+import multiprocessing
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from clock import SimulatedClock
+from fyers_replay import ReplaySession, SimulatedFyersModel, generate_session
+
+SCAN_TIME = "09:18:10"
+DEFAULT_SIZES = (50, 180, 500)
+RESULTS_DIR = "bench_results"
+
+
+# ============================================================================
+# MOCK FYERS SERVER
+# ============================================================================
+
+class MockFyersHandler(BaseHTTPRequestHandler):
+    """HTTP front-end for SimulatedFyersModel that speaks the Fyers REST paths"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay_and_throttle(self):
+        """Apply simulated network latency and the server-side rate limit"""
+        server = self.server
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if server.rate_per_second:
+            with server.lock:
+                now = time.monotonic()
+                while server.window and now - server.window[0] > 1:
+                    server.window.pop(0)
+                if len(server.window) >= server.rate_per_second:
+                    server.rejected += 1
+                    return False
+                server.window.append(now)
+        return True
+
+    def _route(self, method):
+        parsed = urllib.parse.urlparse(self.path)
+        path = parsed.path
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        server = self.server
+
+        if path == "/__bench__/stats":
+            with server.lock:
+                return self._send({
+                    'calls': dict(server.fyers.call_counts),
+                    'order_times': list(server.order_times),
+                    'rejected': server.rejected
+                })
+        if path == "/__bench__/reset":
+            with server.lock:
+                server.fyers = SimulatedFyersModel(server.session, server.clock)
+                server.order_times = []
+                server.window = []
+                server.rejected = 0
+            return self._send({'s': 'ok'})
+
+        if not self._delay_and_throttle():
+            return self._send({"s": "error", "code": 429, "message": "request limit reached"}, 429)
+
+        fyers = server.fyers
+        if path.endswith("/data/history"):
+            return self._send(fyers.history(params))
+        if path.endswith("/data/quotes"):
+            return self._send(fyers.quotes(params))
+        if path.endswith("/orders/sync") and method == "POST":
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+            response = fyers.place_order(data)
+            with server.lock:
+                server.order_times.append(time.monotonic())
+            return self._send(response)
+        if path.endswith("/orders"):
+            return self._send(fyers.orderbook())
+        if path.endswith("/funds"):
+            return self._send(fyers.funds())
+        if path.endswith("/profile"):
+            return self._send(fyers.get_profile())
+        return self._send({"s": "error", "code": 404, "message": "Not found"}, 404)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+
+def _serve(session_data, port, latency_ms, jitter_ms, rate_per_second, ready):
+    """Mock server process entry point"""
+    session = ReplaySession(session_data)
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockFyersHandler)
+    server.daemon_threads = True
+    server.session = session
+    server.clock = SimulatedClock(session.start_datetime(SCAN_TIME), speed=1)
+    server.fyers = SimulatedFyersModel(session, server.clock)
+    server.latency = latency_ms / 1000.0
+    server.jitter = jitter_ms / 1000.0
+    server.rate_per_second = rate_per_second
+    server.lock = threading.Lock()
+    server.order_times = []
+    server.window = []
+    server.rejected = 0
+    ready.set()
+    server.serve_forever()
+
+
+class MockFyersServer:
+    """
+    Local mock Fyers server running in its own process, so its request
+    threads never show up in the client's thread count.
+    """
+
+    def __init__(self, session_data, port=8765, latency_ms=0, jitter_ms=0, rate_per_second=0):
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}"
+        ready = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=_serve,
+            args=(session_data, port, latency_ms, jitter_ms, rate_per_second, ready),
+            daemon=True
+        )
+        self.process.start()
+        if not ready.wait(30):
+            raise RuntimeError("Mock Fyers server did not start")
+
+    def _get(self, path):
+        with urllib.request.urlopen(self.base_url + path, timeout=30) as response:
+            return json.loads(response.read())
+
+    def reset(self):
+        return self._get("/__bench__/reset")
+
+    def stats(self):
+        return self._get("/__bench__/stats")
+
+    def point_fyers_sdk_here(self):
+        """Redirect fyers_apiv3 REST calls to this server"""
+        from fyers_apiv3.fyersModel import Config
+        Config.API = f"{self.base_url}/api/v3"
+        Config.DATA_API = f"{self.base_url}/data"
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join(5)
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def percentile(values, pct):
+    """Linear-interpolated percentile (pct in 0-100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class ThreadSampler:
+    """Samples threading.active_count() in the background to find the peak"""
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        # The sampler itself is not part of the workload
+        self.peak -= 1
+
+
+def build_strategy(stock_list, session, client_limits):
+    """Create a strategy wired to the mock server, with prev-day data preloaded"""
+    from fno_trading_strategy import FnOTradingStrategy
+    from rate_limiter import FyersRateLimiter
+
+    class BenchStrategy(FnOTradingStrategy):
+        def load_lot_sizes(self):
+            # Lot sizes come from the quote ('ls'); keep the benchmark offline
+            self.lot_size_map = {}
+
+    clock = SimulatedClock(session.start_datetime(SCAN_TIME), speed=1)
+    limiter = FyersRateLimiter(clock=clock, limit_per_second=client_limits[0], limit_per_minute=client_limits[1])
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        strategy = BenchStrategy(
+            client_id="BENCH-100",
+            access_token="bench",
+            stock_list=stock_list,
+            rate_limiter=limiter,
+            clock=clock,
+            journal=False
+        )
+    strategy.virtual_trading = False
+
+    # Pre-fetch happens before the trigger in production; it is not what we measure
+    for stock in stock_list:
+        symbol = strategy.get_symbol_format(stock)
+        daily = session.history[symbol]['D']
+        prev = daily[-2]
+        strategy.prev_day_cache[symbol] = {'high': prev[2], 'low': prev[3], 'close': prev[4]}
+    return strategy
+
+
+def run_universe(size, repeats, server_opts, client_limits, port):
+    """Benchmark one universe size; returns the aggregated result dict"""
+    stock_list = [f"BENCH{i:04d}" for i in range(size)]
+    session_data = generate_session(stock_list, seed=size)
+    session = ReplaySession(session_data)
+
+    server = MockFyersServer(session_data, port=port, **server_opts)
+    server.point_fyers_sdk_here()
+
+    runs = []
+    try:
+        for run in range(repeats):
+            server.reset()
+            strategy = build_strategy(stock_list, session, client_limits)
+
+            with ThreadSampler() as sampler:
+                t0 = time.monotonic()
+                with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                    strategy.scan_stocks_at_918()
+                t_end = time.monotonic()
+
+            stats = server.stats()
+            order_offsets = [t - t0 for t in stats['order_times']]
+            runs.append({
+                'scan_s': t_end - t0,
+                'first_order_s': min(order_offsets) if order_offsets else None,
+                'last_order_s': max(order_offsets) if order_offsets else None,
+                'orders': len(order_offsets),
+                'api_calls': sum(stats['calls'].values()),
+                'api_calls_by_endpoint': stats['calls'],
+                'rejected_429': stats['rejected'],
+                'peak_threads': sampler.peak
+            })
+            print(f"  [{size:4d} symbols] run {run + 1}/{repeats}: scan {runs[-1]['scan_s']:.2f}s, "
+                  f"orders {runs[-1]['orders']}, calls {runs[-1]['api_calls']}, threads {sampler.peak}")
+    finally:
+        server.stop()
+
+    def summary(key):
+        values = [r[key] for r in runs if r[key] is not None]
+        return {'p50': percentile(values, 50), 'p99': percentile(values, 99),
+                'min': min(values) if values else None, 'max': max(values) if values else None}
+
+    return {
+        'symbols': size,
+        'repeats': repeats,
+        'time_to_first_order_s': summary('first_order_s'),
+        'time_to_last_order_s': summary('last_order_s'),
+        'scan_duration_s': summary('scan_s'),
+        'api_calls': summary('api_calls'),
+        'peak_threads': max(r['peak_threads'] for r in runs),
+        'runs': runs
+    }
+
+
+def git_label():
+    """Short git revision of the working tree, used to tag result files"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current, baseline_path):
+    """Print p50/p99 deltas against a previous result file"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    print(f"\nComparison against {baseline_path} ({baseline.get('label')})")
+    for size, result in current['results'].items():
+        base = baseline.get('results', {}).get(size)
+        if not base:
+            continue
+        for metric in ('time_to_first_order_s', 'time_to_last_order_s'):
+            for pct in ('p50', 'p99'):
+                new, old = result[metric][pct], base[metric][pct]
+                if new is None or old is None:
+                    continue
+                delta = (new - old) / old * 100 if old else 0
+                flag = "  <-- REGRESSION" if delta > 10 else ""
+                print(f"  {size:>4} {metric} {pct}: {old:.3f}s -> {new:.3f}s ({delta:+.1f}%){flag}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark scan_stocks_at_918 against a mock Fyers server")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Universe sizes (comma separated)")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per universe size")
+    parser.add_argument("--latency-ms", type=float, default=30, help="Mock server latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--server-rate", type=int, default=10, help="Server-side calls/sec before 429 (0 = unlimited)")
+    parser.add_argument("--client-limits", default="8,180", help="Client rate limiter per-second,per-minute")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--label", default=None, help="Result label (default: git revision)")
+    parser.add_argument("--compare", default=None, help="Previous result JSON to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    client_limits = tuple(int(x) for x in args.client_limits.split(","))
+    server_opts = {'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms, 'rate_per_second': args.server_rate}
+    label = args.label or git_label()
+
+    print("\n" + "=" * 70)
+    print("Scan Latency Benchmark")
+    print("=" * 70)
+    print(f"Latency: {args.latency_ms}ms +/- {args.jitter_ms}ms | Server rate: {args.server_rate}/s | "
+          f"Client limits: {client_limits[0]}/s, {client_limits[1]}/min")
+
+    results = {}
+    for i, size in enumerate(sizes):
+        results[str(size)] = run_universe(size, args.repeats, server_opts, client_limits, args.port + i)
+
+    output = {
+        'label': label,
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'config': {
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'server_rate_per_second': args.server_rate,
+            'client_limits': list(client_limits),
+            'repeats': args.repeats
+        },
+        'results': results
+    }
+
+    print("\n" + "=" * 70)
+    print(f"{'Symbols':>8} {'first p50':>10} {'first p99':>10} {'last p50':>10} {'last p99':>10} {'calls':>7} {'threads':>8}")
+    for size, r in results.items():
+        fmt = lambda v: f"{v:.3f}s" if v is not None else "-"
+        print(f"{size:>8} {fmt(r['time_to_first_order_s']['p50']):>10} {fmt(r['time_to_first_order_s']['p99']):>10} "
+              f"{fmt(r['time_to_last_order_s']['p50']):>10} {fmt(r['time_to_last_order_s']['p99']):>10} "
+              f"{r['api_calls']['p50']:>7.0f} {r['peak_threads']:>8}")
+    print("=" * 70)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"scan_latency_{label}.json")
+    with open(path, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"Results saved to {path}")
+
+    if args.compare:
+        compare(output, args.compare)
+
+
+if __name__ == "__main__":
+    main()
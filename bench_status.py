@@ -0,0 +1,198 @@
+"""
+Dashboard Load Benchmark for /api/status
+Starts the dashboard in a separate process on the production server
+(waitress and/or Werkzeug threaded) with a synthetic book of open
+positions, then hammers /api/status from N concurrent keep-alive clients.
+
+Reports requests/sec, p50/p95/p99 latency and bytes per response, both for
+full snapshots and for the ?since= / If-None-Match polling used by the page.
+
+Usage:
+    python bench_status.py                                # 20 clients, 10s, both backends
+    python bench_status.py --clients 50 --duration 20 --positions 100
+    python bench_status.py --backends waitress --modes full
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import http.client
+import multiprocessing
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_scan import percentile, git_label, RESULTS_DIR
+
+MODES = ('full', 'since')
+
+
+def synthetic_positions(count):
+    """qualified_stocks section shaped like the updater's output"""
+    positions = {}
+    for i in range(count):
+        stock = f"BENCH{i:04d}"
+        entry = 20.0 + i % 17
+        positions[stock] = {
+            'symbol': stock,
+            'option_symbol': f"NSE:{stock}26JAN{1000 + i * 10}{'CE' if i % 2 == 0 else 'PE'}",
+            'type': 'CE' if i % 2 == 0 else 'PE',
+            'strike': 1000 + i * 10,
+            'entry_price': entry,
+            'current_price': entry * 1.03,
+            'total_pnl': entry * 0.03 * 500,
+            'pnl_percent': 3.0,
+            'lot_size': 500,
+            'investment': entry * 500,
+            'entry_time': '09:18:12',
+            'is_stale': False
+        }
+    return positions
+
+
+def _serve(backend, port, threads, positions, ready):
+    """Server process: the real app module on the production server"""
+    import app as dashboard
+    from server import DashboardServer
+
+    dashboard.dashboard_data['qualified_stocks'] = synthetic_positions(positions)
+    for i in range(30):
+        dashboard.app_logs.append({'time': '09:18:12', 'message': f'Bench log line {i}'})
+    server = DashboardServer(dashboard.app, host='127.0.0.1', port=port, threads=threads, backend=backend)
+    ready.set()
+    server.serve_forever()
+
+
+def _client(port, mode, deadline, latencies, sizes, errors):
+    """One keep-alive client polling /api/status until the deadline"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    etag = None
+    while time.perf_counter() < deadline:
+        path, headers = '/api/status', {'Accept-Encoding': 'gzip'}
+        if mode == 'since' and etag is not None:
+            version = etag.strip('"').rsplit('-', 1)[1]   # "<boot id>-<version>"
+            path = f'/api/status?since={version}'
+            headers['If-None-Match'] = etag
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except Exception:
+            errors.append(1)
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - started)
+        sizes.append(len(body))
+        if mode == 'since':
+            etag = response.getheader('ETag') or etag
+    conn.close()
+
+
+def run_load(backend, mode, clients, duration, positions, threads, port):
+    """Start a server process and measure one backend / polling mode"""
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=_serve, args=(backend, port, threads, positions, ready), daemon=True)
+    process.start()
+    ready.wait(30)
+    time.sleep(1.5)  # let the updater publish its first snapshots
+
+    latencies, sizes, errors = [], [], []
+    deadline = time.perf_counter() + duration
+    workers = [threading.Thread(target=_client, args=(port, mode, deadline, latencies, sizes, errors))
+               for _ in range(clients)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    process.terminate()
+    process.join(5)
+
+    return {
+        'backend': backend,
+        'mode': mode,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0,
+        'latency_ms': {
+            'p50': percentile(latencies, 50) * 1000 if latencies else None,
+            'p95': percentile(latencies, 95) * 1000 if latencies else None,
+            'p99': percentile(latencies, 99) * 1000 if latencies else None
+        },
+        'avg_bytes': sum(sizes) / len(sizes) if sizes else 0
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load-test /api/status on the production server")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent keep-alive clients")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per run")
+    parser.add_argument("--positions", type=int, default=50, help="Synthetic open positions in the snapshot")
+    parser.add_argument("--threads", type=int, default=None, help="Server threads (default SERVER_CONFIG)")
+    parser.add_argument("--backends", default="waitress,werkzeug", help="Servers to test (comma separated)")
+    parser.add_argument("--modes", default=",".join(MODES), help="full = whole snapshot, since = delta + ETag polling")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--label", default=None, help="Result label (default: git revision)")
+    args = parser.parse_args()
+
+    from config import SERVER_CONFIG
+    threads = args.threads or SERVER_CONFIG.get('THREADS', 16)
+    label = args.label or git_label()
+
+    print("\n" + "=" * 70)
+    print("/api/status Load Benchmark")
+    print("=" * 70)
+    print(f"Clients: {args.clients} | Duration: {args.duration}s | Positions: {args.positions} | Server threads: {threads}")
+
+    results = []
+    port = args.port
+    for backend in [b for b in args.backends.split(",") if b]:
+        if backend == 'waitress':
+            try:
+                import waitress  # noqa: F401
+            except ImportError:
+                print("waitress not installed - skipping")
+                continue
+        for mode in [m for m in args.modes.split(",") if m]:
+            print(f"Running {backend} / {mode}...")
+            results.append(run_load(backend, mode, args.clients, args.duration, args.positions, threads, port))
+            port += 1
+
+    print("\n" + "=" * 70)
+    print(f"{'Server':>9} {'Mode':>6} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'bytes':>8} {'errors':>7}")
+    for r in results:
+        lat = r['latency_ms']
+        fmt = lambda v: f"{v:.1f}ms" if v is not None else "-"
+        print(f"{r['backend']:>9} {r['mode']:>6} {r['requests_per_second']:>9.0f} {fmt(lat['p50']):>8} "
+              f"{fmt(lat['p95']):>8} {fmt(lat['p99']):>8} {r['avg_bytes']:>8.0f} {r['errors']:>7}")
+    print("=" * 70)
+
+    output = {
+        'label': label,
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'config': {
+            'clients': args.clients,
+            'duration_s': args.duration,
+            'positions': args.positions,
+            'server_threads': threads
+        },
+        'results': results
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"status_load_{label}.json")
+    with open(path, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,7 +25,7 @@ source.exclude_patterns = license, images/*/*.jpg, *.md, *.ipynb, *.log, *.txt,
 # (list) Application requirements
 # Critical: Numpy must come before Pandas for correct recipe ordering
 # Added android, pyjnius for native WebView support
-requirements = python3,kivy==2.3.0,numpy,pandas,flask,flask-cors,requests,python-dateutil,fyers-apiv3,webcolors,sqlite3,openssl,android,pyjnius
+requirements = python3,kivy==2.3.0,numpy,pandas,flask,flask-cors,waitress,requests,python-dateutil,fyers-apiv3,webcolors,sqlite3,openssl,android,pyjnius
 
 # (str) Icon of the application
 icon.filename = static/icons/icon-512.png
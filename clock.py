@@ -0,0 +1,109 @@
+"""
+Clock abstraction for the trading strategy
+Lets the strategy run against wall-clock time (live) or a simulated
+session clock (offline replay at 1x, 100x, ...)
+"""
+
+import time
+from datetime import datetime
+
+
+class SystemClock:
+    """
+    Real wall clock. This is the default clock used in live trading.
+    """
+
+    speed = 1.0
+
+    def now(self):
+        """Current local datetime"""
+        return datetime.now()
+
+    def time(self):
+        """Current epoch time in seconds"""
+        return time.time()
+
+    def monotonic(self):
+        """Monotonic seconds (never jumps backwards)"""
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        """Sleep for the given number of seconds"""
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class SimulatedClock:
+    """
+    Session clock that starts at a fixed datetime and advances at
+    `speed` times real time.
+
+    All values returned by now() / time() / monotonic() and the duration
+    passed to sleep() are in *session* seconds, so code written against
+    SystemClock behaves identically, just faster.
+    """
+
+    def __init__(self, start, speed=1.0):
+        """
+        Args:
+            start: datetime the session clock starts at (e.g. 09:14:00 of the replay day)
+            speed: Time multiplier (1 = real time, 100 = one session minute every 0.6s)
+        """
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self.start = start
+        self.speed = float(speed)
+        self._start_epoch = start.timestamp()
+        self._real_t0 = time.monotonic()
+
+    def _elapsed(self):
+        return (time.monotonic() - self._real_t0) * self.speed
+
+    def now(self):
+        """Current session datetime"""
+        return datetime.fromtimestamp(self._start_epoch + self._elapsed())
+
+    def time(self):
+        """Current session epoch time in seconds"""
+        return self._start_epoch + self._elapsed()
+
+    def monotonic(self):
+        """Session seconds elapsed since the clock was created"""
+        return self._elapsed()
+
+    def sleep(self, seconds):
+        """Sleep for `seconds` of session time"""
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def state(self):
+        """Picklable state for an identical clock in another process (see from_state)"""
+        return {'start_epoch': self._start_epoch, 'real_t0': self._real_t0, 'speed': self.speed}
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Clock reading the same session time as the one state() was taken from
+        (time.monotonic is system-wide, so this works across processes)
+        """
+        clock = cls(datetime.fromtimestamp(state['start_epoch']), speed=state['speed'])
+        clock._real_t0 = state['real_t0']
+        return clock
+
+    def set_speed(self, speed):
+        """Change the replay speed without jumping the session time"""
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        now_epoch = self.time()
+        self._start_epoch = now_epoch
+        self._real_t0 = time.monotonic()
+        self.speed = float(speed)
+
+
+# Default clock shared by live components
+system_clock = SystemClock()
+
+
+def get_clock():
+    """Get the default (wall) clock instance"""
+    return system_clock
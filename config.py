@@ -208,6 +208,22 @@ TRADING_CONFIG = {
         "SECOND": 10
     },
     
+    # Seconds before SCAN_TIME to pre-fetch caches and warm HTTP connections
+    "WARMUP_SECONDS": 30,
+    
+    # Final busy-wait window before SCAN_TIME (milliseconds) for a precise trigger
+    "SPIN_WAIT_MS": 5,
+    
+    # Thread-pool widths for the 9:18 scan and the prev-day pre-fetch
+    # (the HTTP connection pool is sized from these)
+    "SCAN_WORKERS": 15,
+    "PREFETCH_WORKERS": 10,
+    
+    # Worker processes for the 9:18 scan (0 or 1 = single process).
+    # Each process scans a shard of STOCK_LIST; API calls still come out
+    # of this process's rate limiter, so the account limits hold.
+    "SCAN_PROCESSES": 0,
+    
     # PnL monitoring interval in seconds (60 = 1 minute)
     "MONITOR_INTERVAL": 1,
     
@@ -219,6 +235,9 @@ TRADING_CONFIG = {
     "MARKET_OPEN": "09:15:00",
     "MARKET_CLOSE": "15:30:00",
     
+    # Run the scan / monitoring loop on asyncio (async_strategy.py) instead of thread pools
+    "ASYNC_MODE": False,
+    
     # Virtual Trading Mode (Paper Trading)
     # If True, no orders will be actually placed in Fyers
     "VIRTUAL_TRADING": True
@@ -235,7 +254,24 @@ RISK_CONFIG = {
     "TARGET_PROFIT_PERCENT": 20,     # Target profit percentage
     "TRAILING_STOP_LOSS": True,      # Enable trailing stop loss
     "TRAILING_SL_PERCENT": 5,        # Trailing stop loss percentage
-    "MAX_POSITIONS": 10              # Maximum concurrent positions
+    "MAX_POSITIONS": 10,             # Maximum concurrent positions
+    # Portfolio Greek limits (greeks.py): alert when breached and hold back
+    # entries that would breach them. None = no limit
+    "MAX_NET_DELTA_VALUE": None,     # |Σ delta × qty × spot| in rupees
+    "MAX_NET_VEGA": None,            # |Σ vega| in rupees per 1 vol point
+    "MAX_THETA_PER_DAY": None        # Time decay in rupees per day
+}
+
+# ============================================================================
+# OPTION GREEKS (greeks.py - Black-Scholes IV / Greeks of open positions)
+# ============================================================================
+
+GREEKS_CONFIG = {
+    "ENABLED": True,
+    "RISK_FREE_RATE": 0.065,         # Annual, continuously compounded
+    "DIVIDEND_YIELD": 0.0,
+    "EXPIRY_WEEKDAY": 1,             # Monthly stock options expire on the last Tuesday
+    "EXPIRY_TIME": "15:30"
 }
 
 # ============================================================================
@@ -243,9 +279,164 @@ RISK_CONFIG = {
 # ============================================================================
 
 LOGGING_CONFIG = {
-    "ENABLE_LOGGING": True,
-    "LOG_FILE": "trading_logs.txt",
-    "LOG_LEVEL": "INFO"  # DEBUG, INFO, WARNING, ERROR
+    "ENABLE_LOGGING": True,          # JSON-lines log file (log_pipeline.py)
+    "LOG_FILE": "logs/trading_log.jsonl",
+    "LOG_LEVEL": "INFO",             # DEBUG, INFO, WARNING, ERROR (DEBUG adds per-stock / per-position lines)
+    "CONSOLE": True,                 # Also write plain messages to stdout
+    "MAX_BYTES": 5 * 1024 * 1024,    # Rotate the log file at this size
+    "BACKUP_COUNT": 5,               # Rotated files kept
+    "QUEUE_SIZE": 10000,             # Records beyond this are dropped, never blocking the caller
+    "ACTIVITY_FILE": "logs/activity.jsonl",  # Whole-day activity log (rotated at midnight); None = off
+    "ACTIVITY_DAYS": 7,              # Rotated activity files kept
+    "ACTIVITY_CAPACITY": 1000,       # Activity entries kept in memory (ring buffer, /api/logs)
+    "DASHBOARD_LOGS": 50             # Newest entries shown on the dashboard
+}
+
+# ============================================================================
+# HTTP CONNECTION POOL (shared by every Fyers REST client - see fyers_client.py)
+# ============================================================================
+
+HTTP_POOL_CONFIG = {
+    "POOL_HOSTS": 4,            # Distinct hosts kept in the pool
+    "EXTRA_CONNECTIONS": 4,     # Per-host connections on top of the widest worker pool
+    "POOL_BLOCK": False,        # Block instead of opening overflow connections
+    "RETRIES": 2,               # Retries for idempotent GETs that failed to connect
+    "BACKOFF_FACTOR": 0.2,      # Retry backoff: 0.2s, 0.4s, ...
+    "CONNECT_TIMEOUT": 3.05,    # Seconds
+    "READ_TIMEOUT": 10          # Seconds
+}
+
+# ============================================================================
+# API RATE LIMIT (rate_limiter.py)
+# ============================================================================
+
+RATE_LIMIT_CONFIG = {
+    # Share one call budget between every process on this machine (strategy,
+    # dashboard, order_manager.py, test scripts) so the account limits hold
+    # in total. Needs fcntl (Linux / Termux / macOS); per process otherwise.
+    "SHARED": True,
+    "STATE_FILE": "state/fyers_rate_limit.bin"   # Relative to this directory
+}
+
+# ============================================================================
+# REQUEST GUARD (request_guard.py - no API calls for requests that cannot succeed)
+# ============================================================================
+
+REQUEST_GUARD_CONFIG = {
+    # Validate history/quotes parameters before they use budget, and answer
+    # repeats of invalid-symbol / invalid-input failures locally for the day
+    "ENABLED": True,
+    "MAX_ENTRIES": 10000        # Remembered failures (oldest dropped first)
+}
+
+# ============================================================================
+# OPTION CHAIN (option_chain.py - contract selection for entries)
+# ============================================================================
+
+OPTION_CHAIN_CONFIG = {
+    "STRIKES_EACH_SIDE": 2,         # Quote ATM±N strikes (5 symbols per qualifier)
+    "TTL_SECONDS": 5,               # Re-use a chain snapshot for this long
+    "MAX_SPREAD_PCT": 5.0,          # Skip strikes whose bid/ask spread is wider (% of LTP)
+    "MIN_VOLUME": 0,                # ... or whose traded volume is lower
+    "FALLBACK_STRIKE_STEP": 50      # Strike step when an underlying is not in the symbol master
+}
+
+# ============================================================================
+# TRADING UNIVERSE (universe.py - STOCK_LIST checked against the NSE_FO master)
+# ============================================================================
+
+UNIVERSE_CONFIG = {
+    # Dedupe STOCK_LIST, map renamed symbols and drop names with no F&O
+    # contracts before a live run, so scans only spend calls on tradable stocks
+    "ENABLED": True,
+    "CACHE_FILE": "state/universe.json"   # Relative to this directory
+}
+
+# ============================================================================
+# ASYNCIO CLIENT (used when TRADING_CONFIG["ASYNC_MODE"] is True)
+# ============================================================================
+
+ASYNC_CONFIG = {
+    "MAX_IN_FLIGHT": 100,             # Concurrent requests awaiting a response
+    "MAX_CONNECTIONS": 100,           # aiohttp connection pool size
+    "MAX_CONNECTIONS_PER_HOST": 50,
+    "KEEPALIVE_SECONDS": 60,
+    "WARM_CONNECTIONS": 20            # Connections opened during pre-scan warm-up
+}
+
+# ============================================================================
+# SESSION REPLAY (Offline simulation - see fyers_replay.py)
+# ============================================================================
+
+REPLAY_CONFIG = {
+    # If True, app.py runs the strategy against a recorded session file
+    # instead of the live Fyers API (no broker calls are made)
+    "ENABLED": False,
+    "SESSION_FILE": "sessions/replay_session.json",
+    "SPEED": 1,                 # 1 = real time, 100 = 100x faster
+    "START_TIME": "09:14:00",   # Session time the replay clock starts at
+    "LATENCY_MS": 0,            # Simulated per-call network latency
+    "JOURNAL_PATH": None        # Separate trade journal for replays (None = no journal)
+}
+
+# ============================================================================
+# WEB SERVER (server.py)
+# ============================================================================
+
+SERVER_CONFIG = {
+    "HOST": "0.0.0.0",          # All interfaces so the phone can connect
+    "PORT": 5000,
+    "THREADS": 16,              # Request threads (each open /api/stream holds one)
+    "ANDROID_THREADS": 6,       # Smaller pool for the in-app server (main.py)
+    "STREAM_RESERVE": 3,        # Threads kept free of /api/stream (streams capped at THREADS - this)
+    "SHUTDOWN_TIMEOUT": 10,     # Seconds to wait for the strategy thread on exit
+    "DEV_SERVER": False         # True = Flask dev server with reloader/debugger
+}
+
+# ============================================================================
+# DASHBOARD PUSH CHANNEL (/api/stream) AND /api/status DELTAS
+# ============================================================================
+
+DASHBOARD_CONFIG = {
+    "STREAM_HEARTBEAT_SECONDS": 15,   # Comment frame to keep idle connections open
+    "STREAM_HISTORY": 300,            # Deltas kept for Last-Event-ID resume
+    "STREAM_RETRY_MS": 2000,          # Browser reconnect delay
+    "POLL_FALLBACK_MS": 1000,         # /api/status polling when SSE is unavailable
+    "GZIP_MIN_BYTES": 1024            # Compress /api/status responses larger than this
+}
+
+# ============================================================================
+# ORDER UPDATES (order_stream.py - local order index fed by the order socket)
+# ============================================================================
+
+ORDER_STREAM_CONFIG = {
+    # Follow order updates on the Fyers order socket instead of pulling the
+    # whole orderbook every 10s; the orderbook is polled only as a fallback
+    "ENABLED": True,
+    "USE_SOCKET": True,         # False = poll only
+    "POLL_SECONDS": 10,         # Orderbook poll while the socket is down
+    "RECONCILE_SECONDS": 60,    # Safety-net poll while the socket is up
+    "CANCEL_CONFIRM_SECONDS": 5  # Wait for a cancelled entry to settle before selling its fills
+}
+
+# ============================================================================
+# TRADE JOURNAL (journal.py - crash recovery)
+# ============================================================================
+
+JOURNAL_CONFIG = {
+    "ENABLED": True,            # Restore today's positions after a restart instead of re-scanning
+    "PATH": "journal/trading_journal.db",
+    "SYNCHRONOUS": "NORMAL"     # SQLite WAL: NORMAL survives app crashes; FULL also survives power loss
+}
+
+# ============================================================================
+# SCAN TRACING (tracing.py - Chrome trace-event files)
+# ============================================================================
+
+TRACE_CONFIG = {
+    "ENABLED": False,           # Can also be toggled at runtime: POST /api/trace
+    "DIR": "traces",            # One trace_YYYYMMDD.json per day
+    "MAX_EVENTS": 100000        # Pending events kept between flushes (oldest dropped beyond)
 }
 
 # ============================================================================
@@ -0,0 +1,225 @@
+"""
+Dashboard State Publisher
+Turns the periodically rebuilt dashboard state into immutable, numbered
+snapshots. Each snapshot is serialized once when it is published and then
+swapped in atomically, so request threads only ever read finished bytes:
+serving /api/status or /api/stream costs the same for 1 or 100 positions.
+
+- /api/stream (Server-Sent Events): one snapshot, then deltas carrying only
+  the top-level fields that changed, with a bounded history so a
+  reconnecting browser can resume from its Last-Event-ID.
+- /api/status: every top-level field (section) carries the version it last
+  changed at, so ?since=<version> answers with just the newer sections and
+  an ETag of the current version.
+"""
+
+import gzip
+import json
+import threading
+from collections import deque
+from types import MappingProxyType
+
+try:
+    import orjson
+except ImportError:  # Optional fast encoder
+    orjson = None
+
+
+def encode(value):
+    """Compact JSON encoding used for both change detection and the wire"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            pass  # e.g. ints beyond 64 bits; fall through to json
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+class Snapshot:
+    """
+    One published dashboard state (read-only)
+
+    Attributes:
+        seq: Version number
+        fields: key -> encoded JSON of the value
+        versions: key -> seq the field last changed at
+        removed: key -> seq the field was removed at
+        body: Full /api/status body (bytes)
+        event: Full-state SSE payload
+    """
+
+    def __init__(self, seq, fields, versions, removed):
+        self.seq = seq
+        self.fields = MappingProxyType(fields)
+        self.versions = MappingProxyType(versions)
+        self.removed = MappingProxyType(removed)
+        members = ','.join(f'{encode(k)}:{v}' for k, v in fields.items())
+        self.body = f'{{{members}{"," if members else ""}"version":{seq}}}'.encode('utf-8')
+        self.event = f'{{"seq":{seq},"state":{{{members}}}}}'
+        self._gzip = None
+        self._deltas = {}
+        self._lock = threading.Lock()
+
+    def gzip_body(self):
+        """Gzipped full body, compressed at most once per snapshot"""
+        if self._gzip is None:
+            with self._lock:
+                if self._gzip is None:
+                    self._gzip = gzip.compress(self.body, compresslevel=5)
+        return self._gzip
+
+    def delta_body(self, since):
+        """
+        /api/status body with only the sections newer than `since`
+        (cached per `since`; pollers are normally one version behind)
+        """
+        cached = self._deltas.get(since)
+        if cached is not None:
+            return cached
+
+        body = ','.join(f'{encode(k)}:{self.fields[k]}'
+                        for k, version in self.versions.items() if version > since)
+        removed = [k for k, version in self.removed.items() if version > since]
+        data = (f'{{"version":{self.seq},"since":{since},'
+                f'"changes":{{{body}}},"removed":{encode(removed)}}}').encode('utf-8')
+        with self._lock:
+            if len(self._deltas) < 16:
+                self._deltas[since] = data
+        return data
+
+
+class DashboardPublisher:
+    """
+    Publishes dashboard states as immutable snapshots plus numbered deltas
+
+    publish() is called by the single dashboard updater thread. Readers grab
+    `self.snapshot` (a plain attribute read, atomic under the GIL) and never
+    see a half-built state.
+    """
+
+    def __init__(self, history=300):
+        """
+        Args:
+            history: Number of deltas kept for resume-from-sequence
+        """
+        self.snapshot = Snapshot(0, {}, {}, {})
+        self.history = deque(maxlen=history)   # (seq, SSE delta payload)
+        self.condition = threading.Condition()
+
+    @property
+    def seq(self):
+        return self.snapshot.seq
+
+    def publish(self, data):
+        """
+        Publish a new state; a new snapshot is swapped in only if something changed
+
+        Args:
+            data: Dashboard dict for this cycle (not retained)
+
+        Returns:
+            int: Current sequence number
+        """
+        encoded = {key: encode(value) for key, value in data.items()}
+
+        with self.condition:
+            current = self.snapshot
+            changes = {k: v for k, v in encoded.items() if current.fields.get(k) != v}
+            removed = [k for k in current.fields if k not in encoded]
+            if not changes and not removed:
+                return current.seq
+
+            seq = current.seq + 1
+            versions = dict(current.versions)
+            tombstones = dict(current.removed)
+            for key in changes:
+                versions[key] = seq
+                tombstones.pop(key, None)
+            for key in removed:
+                del versions[key]
+                tombstones[key] = seq
+
+            body = ','.join(f'{encode(k)}:{v}' for k, v in changes.items())
+            self.history.append((seq, f'{{"seq":{seq},"changes":{{{body}}},"removed":{encode(removed)}}}'))
+            self.snapshot = Snapshot(seq, encoded, versions, tombstones)
+            self.condition.notify_all()
+            return seq
+
+    def snapshot_event(self):
+        """Full-state event: (seq, JSON payload)"""
+        snapshot = self.snapshot
+        return snapshot.seq, snapshot.event
+
+    def status_body(self, since=None):
+        """
+        Body for /api/status from the current snapshot
+
+        Args:
+            since: Version the client already has; None for the full state
+
+        Returns:
+            tuple: (snapshot, bytes). The full state is the dashboard dict
+                   plus "version"; a delta is {"version", "since", "changes",
+                   "removed"} with only sections newer than `since`.
+        """
+        snapshot = self.snapshot
+        if since is None or since > snapshot.seq:
+            return snapshot, snapshot.body
+        return snapshot, snapshot.delta_body(since)
+
+    def deltas_since(self, since):
+        """
+        Delta events after `since`
+
+        Returns:
+            list: [(seq, JSON payload), ...], or None when `since` is older
+                  than the kept history (caller must send a snapshot)
+        """
+        with self.condition:
+            return self._deltas_locked(since)
+
+    def _deltas_locked(self, since):
+        seq = self.snapshot.seq
+        if since > seq:
+            return None  # Id from before a server restart
+        if since == seq:
+            return []
+        if not self.history or self.history[0][0] > since + 1:
+            return None
+        return [(s, payload) for s, payload in self.history if s > since]
+
+    def wait_for_deltas(self, since, timeout):
+        """
+        Block until there is something newer than `since` or `timeout` passes
+
+        Returns:
+            list / None: As deltas_since()
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.snapshot.seq > since, timeout=timeout)
+            return self._deltas_locked(since)
+
+
+def format_event(seq, payload, event=None, retry_ms=None):
+    """Format one Server-Sent Events frame"""
+    lines = []
+    if retry_ms:
+        lines.append(f'retry: {retry_ms}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'id: {seq}')
+    lines.append(f'data: {payload}')
+    return '\n'.join(lines) + '\n\n'
+
+
+# Global publisher instance
+_publisher = None
+
+
+def get_publisher():
+    """Get or create global dashboard publisher"""
+    global _publisher
+    if _publisher is None:
+        from config import DASHBOARD_CONFIG
+        _publisher = DashboardPublisher(history=DASHBOARD_CONFIG.get('STREAM_HISTORY', 300))
+    return _publisher
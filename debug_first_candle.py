@@ -3,7 +3,8 @@ Debug script to test first candle fetching
 Tests actual data retrieval for stocks that should have qualified
 """
 
-from fyers_apiv3 import fyersModel
+from fyers_client import create_fyers_client
+from rate_limiter import RateLimitedClient
 from config import FYERS_CONFIG
 from datetime import datetime, timedelta
 import json
@@ -26,7 +27,7 @@ def test_stock_conditions(stock_symbol):
     if not access_token or access_token == "YOUR_ACCESS_TOKEN_HERE":
         access_token = load_access_token()
     
-    fyers = fyersModel.FyersModel(client_id=client_id, token=access_token)
+    fyers = RateLimitedClient(create_fyers_client(client_id, access_token))  # Shares the account's call budget
     
     symbol = f"NSE:{stock_symbol}-EQ"
     
@@ -84,8 +85,10 @@ def test_stock_conditions(stock_symbol):
     attempts = [
         {
             "name": "Today with time",
-            "range_from": f"{today.strftime('%Y-%m-%d')} 09:15:00",
-            "range_to": f"{today.strftime('%Y-%m-%d')} 09:18:00"
+            # Times need date_format 0 (epoch); date_format 1 takes YYYY-MM-DD only
+            "date_format": "0",
+            "range_from": str(int(today.replace(hour=9, minute=15, second=0, microsecond=0).timestamp())),
+            "range_to": str(int(today.replace(hour=9, minute=18, second=0, microsecond=0).timestamp()))
         },
         {
             "name": "Today date only",
@@ -110,7 +113,7 @@ def test_stock_conditions(stock_symbol):
             data = {
                 "symbol": symbol,
                 "resolution": "3",
-                "date_format": "1",
+                "date_format": attempt.get('date_format', "1"),
                 "range_from": attempt['range_from'],
                 "range_to": attempt['range_to'],
                 "cont_flag": "1"
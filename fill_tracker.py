@@ -0,0 +1,266 @@
+"""
+Fill-Confirmed Positions
+Drives position status from the broker's order updates (order_stream.py)
+instead of assuming an order filled the moment place_order said "ok":
+
+    entry: PENDING -> PARTIAL -> RUNNING        (or REJECTED / CANCELLED)
+    exit:  RUNNING -> EXITED at the fill price  (a failed exit leaves it RUNNING)
+
+Entry and exit prices are the broker's average traded price and lot_size
+is the quantity actually filled, so P&L only counts what is held. Every
+live order also records its signal -> ack -> fill latencies (session
+seconds) in the order_latency_seconds histogram and get_stats().
+
+Without an order stream (ORDER_STREAM_CONFIG["ENABLED"] False) there is no
+fill information: orders count as filled at their limit price on ack.
+
+Usage (wired into FnOTradingStrategy):
+    fills.signal('SBIN', 'entry')                       # decision taken
+    fills.acknowledged('SBIN', 'entry', order_id, qty, limit_price)
+    fills.rejected('SBIN', 'entry', 'RMS: margin shortfall')
+"""
+
+import threading
+from collections import deque
+
+from log_pipeline import get_logger
+from metrics import ORDER_LATENCY
+from order_stream import TERMINAL_STATUSES
+
+log = get_logger('fills')
+
+ORDER_STATUS_REJECTED = 5
+STAGES = ('signal_to_ack', 'ack_to_fill', 'signal_to_fill')
+ORDER_ID_KEYS = {'entry': 'entry_order_id', 'exit': 'exit_order_id'}
+
+# Position statuses that still hold (or may still get) a quantity
+OPEN_STATUSES = ('PENDING', 'PARTIAL', 'RUNNING')
+
+
+class FillTracker:
+    """
+    Applies order updates for the strategy's own orders to its positions
+    """
+
+    def __init__(self, strategy, history=500):
+        """
+        Args:
+            strategy: FnOTradingStrategy (qualified_stocks, portfolio, order_stream, clock)
+            history: Completed orders kept for get_stats()
+        """
+        self.strategy = strategy
+        self.book = strategy.qualified_stocks
+        self.clock = strategy.clock
+        self.stream = strategy.order_stream
+        self.lock = threading.Lock()
+        self._settled = threading.Condition(self.lock)   # Notified when a tracked order completes
+        self._signals = {}                  # (stock, kind) -> signal time
+        self._orders = {}                   # order id -> tracked order
+        self.completed = deque(maxlen=history)
+        if self.stream is not None:
+            self.stream.subscribe(self.on_orders)
+
+    # ------------------------------------------------------------------
+    # Order lifecycle (called by the strategy)
+    # ------------------------------------------------------------------
+
+    def signal(self, stock, kind):
+        """The strategy decided to enter / exit (start of the latency clock)"""
+        with self.lock:
+            self._signals[(stock, kind)] = self.clock.time()
+
+    def acknowledged(self, stock, kind, order_id, qty, price):
+        """
+        The broker accepted an order
+
+        Args:
+            stock: Position the order belongs to
+            kind: 'entry' or 'exit'
+            order_id: Broker order ID
+            qty: Ordered quantity
+            price: Limit price (the assumed fill price when there is no order stream)
+        """
+        now = self.clock.time()
+        with self.lock:
+            signal = self._signals.pop((stock, kind), None)
+            record = {'id': order_id, 'stock': stock, 'kind': kind, 'qty': int(qty), 'filled': 0,
+                      'price': price, 'signal': signal, 'ack': now}
+            self._orders[order_id] = record
+        if signal is not None:
+            ORDER_LATENCY.observe(now - signal, kind=kind, stage='signal_to_ack')
+        self._update(stock, {ORDER_ID_KEYS[kind]: order_id})
+
+        if self.stream is None:
+            # No order updates: take the ack as a complete fill at the limit price
+            self._apply(record, {'id': order_id, 'status': 2, 'filledQty': int(qty), 'tradedPrice': price})
+            return
+        order = self.stream.index.get(order_id)
+        if order is not None:
+            self._apply(record, order)   # The update overtook the place_order response
+
+    def rejected(self, stock, kind, message):
+        """place_order itself failed (no order ID)"""
+        with self.lock:
+            self._signals.pop((stock, kind), None)
+        if kind == 'entry' and stock in self.book:
+            self._update(stock, {'status': 'REJECTED', 'lot_size': 0})
+            self.strategy.log_activity(f"❌ Entry rejected: {stock} - {message}")
+
+    def resume(self):
+        """
+        Track the orders of positions restored from the journal that were
+        still waiting for a fill, and apply what the order index already knows
+        """
+        resumed = []
+        for stock, details in self.book.items():
+            status = details.get('status')
+            for kind, key in ORDER_ID_KEYS.items():
+                order_id = details.get(key)
+                waiting = status in ('PENDING', 'PARTIAL') if kind == 'entry' else status in OPEN_STATUSES
+                if not order_id or not waiting:
+                    continue
+                qty = details.get('order_qty', details.get('lot_size', 0)) if kind == 'entry' else details['lot_size']
+                record = {'id': order_id, 'stock': stock, 'kind': kind, 'qty': int(qty),
+                          'filled': int(details.get('lot_size', 0)) if kind == 'entry' else 0,
+                          'signal': None, 'ack': None}
+                with self.lock:
+                    self._orders[order_id] = record
+                resumed.append(record)
+        if resumed:
+            log.info(f"Tracking {len(resumed)} restored order(s) awaiting a fill")
+        for record in resumed:
+            order = self.stream.index.get(record['id']) if self.stream is not None else None
+            if order is not None:
+                self._apply(record, order)
+
+    def pending_order(self, stock, kind):
+        """Order ID of a tracked (not yet complete) order of a position, or None"""
+        with self.lock:
+            return next((oid for oid, r in self._orders.items() if r['stock'] == stock and r['kind'] == kind), None)
+
+    def wait_settled(self, order_id, timeout):
+        """
+        Wait until a tracked order is complete and applied to its position
+
+        Args:
+            order_id: Broker order ID
+            timeout: Session seconds to wait
+
+        Returns:
+            bool: True if the order is no longer pending
+        """
+        speed = getattr(self.clock, 'speed', 1.0)
+        with self._settled:
+            return self._settled.wait_for(lambda: order_id not in self._orders, timeout / speed)
+
+    # ------------------------------------------------------------------
+    # Order updates
+    # ------------------------------------------------------------------
+
+    def on_orders(self, changes):
+        """OrderStream listener: the orders that changed"""
+        for order in changes:
+            with self.lock:
+                record = self._orders.get(order.get('id'))
+            if record is not None:
+                self._apply(record, order)
+
+    def _apply(self, record, order):
+        status = order.get('status')
+        filled = int(order.get('filledQty') or 0)
+        done = status in TERMINAL_STATUSES or filled >= record['qty']
+        with self.lock:
+            if record.get('done') or record['id'] not in self._orders or (filled == record['filled'] and not done):
+                return   # Already complete, or nothing new
+            if filled > record['filled']:
+                record['filled_at'] = self.clock.time()
+            record['filled'] = filled
+            record['done'] = done
+        price = order.get('tradedPrice') or None
+        if record['kind'] == 'entry':
+            self._apply_entry(record, status, filled, price, done)
+        else:
+            self._apply_exit(record, status, filled, price, done)
+        if done:
+            self._complete(record, filled)
+            # Stays pending until the position reflects the final fill (wait_settled)
+            with self._settled:
+                self._orders.pop(record['id'], None)
+                self._settled.notify_all()
+
+    def _apply_entry(self, record, status, filled, price, done):
+        stock = record['stock']
+        if filled == 0:
+            if done:
+                outcome = 'REJECTED' if status == ORDER_STATUS_REJECTED else 'CANCELLED'
+                self._update(stock, {'status': outcome, 'lot_size': 0})
+                self.strategy.log_activity(f"❌ Entry {outcome.lower()}: {stock}")
+            return
+        update = {'status': 'RUNNING' if done else 'PARTIAL', 'lot_size': filled}
+        if price:
+            update['entry_price'] = price
+        self._update(stock, update)
+        if done:
+            self.strategy.log_activity(f"✅ Entry filled: {stock} {filled} @ ₹{price or 0:.2f}"
+                                       + (f" ({filled}/{record['qty']})" if filled < record['qty'] else ''))
+
+    def _apply_exit(self, record, status, filled, price, done):
+        stock = record['stock']
+        if not done:
+            return   # Partially sold: the position closes when the order completes
+        if filled >= record['qty']:
+            self._update(stock, {'status': 'EXITED', 'exit_price': price or record.get('price'),
+                                 'exit_time': self.clock.now()})
+            self.strategy.log_activity(f"✅ Exit filled: {stock} @ ₹{price or 0:.2f}")
+            return
+        remaining = record['qty'] - filled
+        self._update(stock, {'exit_order_id': None, 'lot_size': remaining})
+        self.strategy.log_activity(f"⚠️ Exit order for {stock} ended with {filled}/{record['qty']} filled - "
+                                   f"{remaining} still held")
+
+    def _complete(self, record, filled):
+        """Record the latencies of a finished order (up to its last fill)"""
+        now = record.get('filled_at')
+        latencies = {}
+        if record['ack'] is not None and record['signal'] is not None:
+            latencies['signal_to_ack'] = record['ack'] - record['signal']
+        if filled and record['ack'] is not None:
+            latencies['ack_to_fill'] = now - record['ack']
+            ORDER_LATENCY.observe(latencies['ack_to_fill'], kind=record['kind'], stage='ack_to_fill')
+            if record['signal'] is not None:
+                latencies['signal_to_fill'] = now - record['signal']
+                ORDER_LATENCY.observe(latencies['signal_to_fill'], kind=record['kind'], stage='signal_to_fill')
+        with self.lock:
+            self.completed.append({'kind': record['kind'], 'filled': bool(filled), **latencies})
+
+    def _update(self, stock, update):
+        """Write an update to the position, the P&L aggregator and the journal"""
+        if stock not in self.book:
+            return
+        details = self.book[stock]
+        for key, value in update.items():
+            details[key] = value
+        self.strategy.portfolio.upsert(stock, details)
+        self.strategy._journal('fill', stock, update)
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+
+    def get_stats(self):
+        """Pending orders plus p50 / p95 latencies (ms) per order kind and stage"""
+        with self.lock:
+            completed = list(self.completed)
+            pending = len(self._orders)
+        stats = {'pending': pending, 'completed': len(completed),
+                 'unfilled': sum(1 for c in completed if not c['filled'])}
+        for kind in ORDER_ID_KEYS:
+            for stage in STAGES:
+                values = sorted(c[stage] for c in completed if c['kind'] == kind and stage in c)
+                if values:
+                    stats[f'{kind}_{stage}_ms'] = {
+                        'p50': round(values[len(values) // 2] * 1000, 1),
+                        'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+                        'count': len(values)
+                    }
+        return stats
@@ -3,17 +3,37 @@ NSE FnO Trading Strategy using Fyers API v3
 WITH PROPER LOT SIZE HANDLING AND ACCURATE P&L CALCULATION
 """
 
-from fyers_apiv3 import fyersModel
-import pandas as pd
+from fyers_client import create_fyers_client
+from metrics import SCAN_PHASE, ORDER_RTT
+from log_pipeline import get_logger, setup_logging, activity_spill
+from ring_buffer import RingBuffer
+from portfolio import PortfolioAggregator, position_pnl
+from position_book import PositionBook
+from option_chain import OptionChainService
+from greeks import GreeksEngine
+from order_stream import create_order_stream
+from fill_tracker import FillTracker, OPEN_STATUSES
+import tracing
 from datetime import datetime, timedelta
 import time
 import math
-import os
-import requests
+import logging
+import threading
+import contextlib
 import concurrent.futures
 
+log = get_logger('strategy')
+
+# orderTag on entry orders (used to spot broker positions the journal doesn't know)
+ENTRY_ORDER_TAG = "AutoEntryScanFast"
+
+# Fyers orderbook status codes
+ORDER_STATUS_FILLED = 2
+ORDER_STATUS_DEAD = {1: 'CANCELLED', 5: 'REJECTED'}
+
 class FnOTradingStrategy:
-    def __init__(self, client_id, access_token, stock_list, rate_limiter=None):
+    def __init__(self, client_id, access_token, stock_list, rate_limiter=None,
+                 fyers_client=None, clock=None, journal=None):
         """
         Initialize the trading strategy
         
@@ -22,41 +42,192 @@ class FnOTradingStrategy:
             access_token: Fyers access token
             stock_list: List of FnO stock symbols (e.g., ['SBIN', 'RELIANCE', 'TCS'])
             rate_limiter: Optional rate limiter instance
+            fyers_client: Optional pre-built client (e.g. SimulatedFyersModel for replay)
+            clock: Optional clock (defaults to the wall clock; SimulatedClock for replay)
+            journal: Optional TradeJournal (defaults to the global one; False disables)
         """
-        self.fyers = fyersModel.FyersModel(client_id=client_id, token=access_token)
+        setup_logging()
+        from clock import get_clock
+        self.clock = clock or get_clock()
+        tracing.use_clock(self.clock)
+        if fyers_client is None:
+            fyers_client = create_fyers_client(client_id, access_token)
+        self.fyers = fyers_client
+        self.client_id = client_id
+        self.access_token = access_token
         self.stock_list = stock_list
-        self.qualified_stocks = {}  # Stores stocks that meet criteria (CE or PE)
+        self.qualified_stocks = PositionBook()  # Stores stocks that meet criteria (CE or PE)
+        self.portfolio = PortfolioAggregator()  # Live P&L / totals over qualified_stocks
         
         # Virtual trading mode
         from config import TRADING_CONFIG
         self.virtual_trading = TRADING_CONFIG.get("VIRTUAL_TRADING", True)
         
+        # Worker pool widths (the shared HTTP pool is sized to match)
+        self.scan_workers = TRADING_CONFIG.get("SCAN_WORKERS", 15)
+        self.prefetch_workers = TRADING_CONFIG.get("PREFETCH_WORKERS", 10)
+        
+        # Worker processes for the sharded scan (0/1 = scan in this process)
+        self.scan_processes = TRADING_CONFIG.get("SCAN_PROCESSES", 0)
+        self.sharded_scanner = None
+        
         # Rate limiter
-        from rate_limiter import get_rate_limiter, get_batch_manager
+        from rate_limiter import get_rate_limiter, get_batch_manager, BatchAPIManager
         self.rate_limiter = rate_limiter or get_rate_limiter()
-        self.batch_manager = get_batch_manager()
+        self.batch_manager = BatchAPIManager(self.rate_limiter) if rate_limiter else get_batch_manager()
         
         # Load lot sizes from Fyers master CSV
         self.lot_size_map = {}
         self.load_lot_sizes()
         
+        # Entry contracts (replays have no symbol master: derived symbols only)
+        self.option_chain = OptionChainService(self, use_master=getattr(self.fyers, 'session', None) is None)
+        
+        # IV / Greeks of the open positions, recomputed with every P&L tick
+        from config import GREEKS_CONFIG
+        self.greeks = GreeksEngine(self) if GREEKS_CONFIG.get('ENABLED', True) else None
+        
+        # Local order index fed by the order-update socket (started by run())
+        self.order_stream = create_order_stream(self)
+        
+        # Position status / size / prices driven by the order updates
+        self.fills = FillTracker(self)
+        
         # Pre-fetch cache
         self.prev_day_cache = {}
         
-        # Activity logs
-        self.activity_logs = []
-        self.max_logs = 50
+        # Activity logs (newest entries in memory, the whole day on disk)
+        from config import LOGGING_CONFIG
+        self.activity_logs = RingBuffer(LOGGING_CONFIG.get('ACTIVITY_CAPACITY', 1000),
+                                        spill=activity_spill(log))
+        
+        # Set by stop(); run() checks it between waits and monitoring cycles
+        self.stop_event = threading.Event()
+        
+        # Crash-safe record of today's scan / entries / orders / exits
+        if journal is None:
+            from journal import get_journal
+            journal = get_journal()
+        self.journal = journal or None
+        self._resumed = None          # Set by resume_from_journal()
+        self._journal_orders = {}     # stock -> order events restored from the journal
+
+    def stop(self):
+        """Ask run() to return at its next wait (does not exit positions)"""
+        self.stop_event.set()
+        if self.sharded_scanner is not None:
+            self.sharded_scanner.stop()
+        if self.order_stream is not None:
+            self.order_stream.stop()
+
+    def start_order_stream(self):
+        """Seed the local order index and start following order updates"""
+        if self.order_stream is not None and not self.stop_event.is_set():
+            self.order_stream.start()
+
+    def _journal(self, kind, stock, data):
+        """Queue a journal event (no-op without a journal)"""
+        if self.journal is not None:
+            now = self.clock.now()
+            self.journal.record(kind, stock, data, day=now.date(), ts=now)
+
+    def resume_from_journal(self):
+        """
+        Restore today's positions from the journal (runs once per instance)
+        
+        Returns:
+            bool: True if today's scan already ran, so run() goes straight to
+                  P&L monitoring instead of scanning again
+        """
+        if self._resumed is not None:
+            return self._resumed
+        self._resumed = False
+        if self.journal is None:
+            return False
+        
+        started = time.perf_counter()
+        state = self.journal.load_day(self.clock.now().date())
+        if not state['scanned'] and not state['positions']:
+            return False
+        
+        self.qualified_stocks.update(state['positions'])
+        for stock, details in state['positions'].items():
+            self.portfolio.upsert(stock, details)
+        self._journal_orders = state['orders']
+        self.fills.resume()
+        # Positions without a scan marker mean the scan was cut off mid-way: never re-enter
+        self._resumed = True
+        running = sum(1 for d in state['positions'].values() if d.get('status') == 'RUNNING')
+        self.log_activity(f"♻️ Restored {len(state['positions'])} position(s) ({running} running) from the journal "
+                          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return True
+
+    def reconcile_with_broker(self):
+        """
+        Check restored positions against the Fyers orderbook
+        
+        - entry order cancelled / rejected at the broker -> status CANCELLED / REJECTED
+        - a filled SELL for the option symbol            -> status EXITED at its traded price
+        - filled BUYs placed by the scan but not in the journal are reported
+        
+        Virtual positions are never at the broker and are left alone.
+        """
+        if self.virtual_trading or not self.qualified_stocks:
+            return
+        orders = self.get_orders_book()
+        if not orders:
+            return
+        
+        by_id = {o.get('id'): o for o in orders}
+        sells = {}
+        for o in orders:
+            if o.get('side') == -1 and o.get('status') == ORDER_STATUS_FILLED:
+                sells[o.get('symbol')] = o
+        
+        changed = 0
+        for stock, details in self.qualified_stocks.items():
+            if details.get('status') != 'RUNNING':
+                continue
+            update = None
+            entry_ids = [e.get('response', {}).get('id') for e in self._journal_orders.get(stock, [])
+                         if e.get('kind') == 'entry' and isinstance(e.get('response'), dict)]
+            entry_order = next((by_id[i] for i in entry_ids if i in by_id), None)
+            if entry_order and entry_order.get('status') in ORDER_STATUS_DEAD:
+                update = {'status': ORDER_STATUS_DEAD[entry_order['status']]}
+            elif details['option_symbol'] in sells:
+                sell = sells[details['option_symbol']]
+                update = {'status': 'EXITED', 'exit_price': sell.get('tradedPrice') or sell.get('limitPrice'),
+                          'exit_time': self.clock.now()}
+            if update:
+                details.update(update)
+                self.portfolio.upsert(stock, details)
+                self._journal('exit', stock, dict(update, reconciled=True))
+                changed += 1
+                self.log_activity(f"🔄 Reconciled {stock}: {update['status']}")
+        
+        tracked = {d['option_symbol'] for d in self.qualified_stocks.values()}
+        for o in orders:
+            if o.get('side') == 1 and o.get('status') == ORDER_STATUS_FILLED and \
+                    o.get('orderTag') == ENTRY_ORDER_TAG and o.get('symbol') not in tracked:
+                self.log_activity(f"⚠️ Broker has a filled entry not in the journal: {o.get('symbol')} ({o.get('id')})")
+        
+        log.info(f"Reconciled {len(self.qualified_stocks)} restored position(s) with the orderbook ({changed} updated)")
+
+    def _pause(self, seconds):
+        """
+        Sleep `seconds` of session time, waking early on stop()
+        
+        Returns:
+            bool: True if the strategy was stopped
+        """
+        return self.stop_event.wait(seconds / getattr(self.clock, 'speed', 1.0))
 
     def log_activity(self, message):
         """Add a log entry with timestamp"""
-        log_entry = {
-            'time': datetime.now().strftime('%H:%M:%S'),
+        self.activity_logs.append({
+            'time': self.clock.now().strftime('%H:%M:%S'),
             'message': message
-        }
-        self.activity_logs.insert(0, log_entry)
-        if len(self.activity_logs) > self.max_logs:
-            self.activity_logs = self.activity_logs[:self.max_logs]
-        print(f"[{log_entry['time']}] {message}")
+        })
         
     def get_current_quote(self, symbol):
         """
@@ -82,7 +253,7 @@ class FnOTradingStrategy:
                 return response['d'][0]['v']
             return None
         except Exception as e:
-            print(f"Error getting quote for {symbol}: {e}")
+            log.error(f"Error getting quote for {symbol}: {e}")
             return None
 
     def get_funds(self):
@@ -96,58 +267,37 @@ class FnOTradingStrategy:
                     return fund_limit['equityAmount']
             return 0
         except Exception as e:
-            print(f"Error getting funds: {e}")
+            log.error(f"Error getting funds: {e}")
             return 0
 
     def get_orders_book(self):
-        """Fetch daily order book from Fyers"""
+        """Today's orders: the local order index once the stream runs, else one orderbook call"""
+        if self.order_stream is not None and self.order_stream.started:
+            return self.order_stream.orders()
         try:
             response = self.rate_limiter.make_call(self.fyers.orderbook)
             if response['s'] == 'ok':
                 return response['orderBook']
             return []
         except Exception as e:
-            print(f"Error getting orderbook: {e}")
+            log.error(f"Error getting orderbook: {e}")
             return []
 
     def load_lot_sizes(self):
         """
         Download and load lot sizes from Fyers master CSV
         """
-        local_file = "nse_fo.csv"
-        url = "https://public.fyers.in/sym_details/NSE_FO.csv"
-        
+        from universe import MASTER_FILE, LOT_SIZE_COLUMN, SYMBOL_COLUMN, load_master
+
         try:
-            # Download if not exists or if more than 24 hours old
-            should_download = False
-            if not os.path.exists(local_file):
-                should_download = True
-            else:
-                file_age = time.time() - os.path.getmtime(local_file)
-                if file_age > 86400:  # 24 hours
-                    should_download = True
-            
-            if should_download:
-                print(f"Downloading Fyers master symbol file from {url}...")
-                response = requests.get(url, timeout=30)
-                if response.status_code == 200:
-                    with open(local_file, 'wb') as f:
-                        f.write(response.content)
-                    print(f"Downloaded {local_file}")
-                else:
-                    print(f"Failed to download Fyers master file: Status {response.status_code}")
-            
-            if os.path.exists(local_file):
-                # Fyers NSE_FO.csv structure:
-                # Column 3 is lot_size, Column 9 is fyers_symbol
-                df = pd.read_csv(local_file, header=None, low_memory=False)
-                # Filter rows where index 9 (symbol) and index 3 (lot size) are present
-                self.lot_size_map = dict(zip(df[9], df[3]))
-                print(f"Loaded {len(self.lot_size_map)} lot sizes from {local_file}")
+            df = load_master(MASTER_FILE)  # Downloaded if missing or more than 24 hours old
+            if df is not None:
+                self.lot_size_map = dict(zip(df[SYMBOL_COLUMN], df[LOT_SIZE_COLUMN]))
+                log.info(f"Loaded {len(self.lot_size_map)} lot sizes from {MASTER_FILE}")
             else:
-                print("Could not load lot sizes: nse_fo.csv not found.")
+                log.warning(f"Could not load lot sizes: {MASTER_FILE} not found.")
         except Exception as e:
-            print(f"Error loading lot sizes: {e}")
+            log.error(f"Error loading lot sizes: {e}")
             self.lot_size_map = {}
 
     def get_lot_size(self, symbol, fallback_lot_size=1):
@@ -172,6 +322,29 @@ class FnOTradingStrategy:
         """Convert stock symbol to Fyers format"""
         return f"NSE:{stock}-EQ"
     
+    def _prev_day_request(self, symbol):
+        """History request for the last few daily candles of a symbol"""
+        return {
+            "symbol": symbol,
+            "resolution": "D",
+            "date_format": "1",
+            "range_from": (self.clock.now() - timedelta(days=5)).strftime("%Y-%m-%d"),
+            "range_to": self.clock.now().strftime("%Y-%m-%d"),
+            "cont_flag": "1"
+        }
+
+    def _parse_prev_day(self, response):
+        """Extract previous trading day's high/low/close from a daily history response"""
+        if response['s'] == 'ok' and len(response['candles']) >= 2:
+            # Get second last day's data (previous trading day)
+            prev_day = response['candles'][-2]
+            return {
+                'high': prev_day[2],  # High
+                'low': prev_day[3],   # Low
+                'close': prev_day[4]  # Close
+            }
+        return None
+
     def get_previous_day_data(self, symbol):
         """
         Get previous day's high and close
@@ -183,51 +356,149 @@ class FnOTradingStrategy:
             dict with 'high', 'low' and 'close' or None
         """
         try:
-            # Get last 2 days of daily data
-            data = {
-                "symbol": symbol,
-                "resolution": "D",
-                "date_format": "1",
-                "range_from": (datetime.now() - timedelta(days=5)).strftime("%Y-%m-%d"),
-                "range_to": datetime.now().strftime("%Y-%m-%d"),
-                "cont_flag": "1"
-            }
-            
             # Use rate-limited API call
-            response = self.rate_limiter.make_call(self.fyers.history, data)
-            
-            if response['s'] == 'ok' and len(response['candles']) >= 2:
-                # Get second last day's data (previous trading day)
-                prev_day = response['candles'][-2]
-                return {
-                    'high': prev_day[2],  # High
-                    'low': prev_day[3],   # Low
-                    'close': prev_day[4]  # Close
-                }
-            return None
+            response = self.rate_limiter.make_call(self.fyers.history, self._prev_day_request(symbol))
+            return self._parse_prev_day(response)
         except Exception as e:
-            print(f"Error getting previous day data for {symbol}: {e}")
+            log.error(f"Error getting previous day data for {symbol}: {e}")
             return None
 
     def pre_fetch_prev_day_data(self):
         """Pre-fetch previous day OHLC for all stocks in the list to speed up scan"""
-        print(f"Pre-fetching previous day data for {len(self.stock_list)} stocks...")
-        symbols = [self.get_symbol_format(stock) for stock in self.stock_list]
+        if self.resume_from_journal():
+            return  # Today's scan already ran; nothing to pre-fetch for
+        # Only fetch what is not cached yet (warm-up may run after an earlier pre-fetch)
+        symbols = [self.get_symbol_format(stock) for stock in self.stock_list
+                   if self.get_symbol_format(stock) not in self.prev_day_cache]
+        if not symbols:
+            return
+        log.info(f"Pre-fetching previous day data for {len(symbols)} stocks...")
         
         # Use ThreadPool to fetch history in parallel (since we need 'resolution': 'D')
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.prefetch_workers,
+                                                   thread_name_prefix='prefetch') as executor:
             future_to_stock = {executor.submit(self.get_previous_day_data, sym): sym for sym in symbols}
             for future in concurrent.futures.as_completed(future_to_stock):
+                if self.stop_event.is_set():
+                    # Stopped: drop queued requests, let in-flight ones finish
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    log.info("Pre-fetch cancelled")
+                    return
                 sym = future_to_stock[future]
                 try:
                     data = future.result()
                     if data:
                         self.prev_day_cache[sym] = data
                 except Exception as e:
-                    print(f"Error pre-fetching {sym}: {e}")
+                    log.error(f"Error pre-fetching {sym}: {e}")
+        
+        log.info(f"Pre-fetched data for {len(self.prev_day_cache)} / {len(self.stock_list)} stocks.")
+
+    def warm_connections(self):
+        """
+        Open keep-alive connections in the shared HTTP pool ahead of the scan
+        (one per scan worker). Replay/simulated clients have no HTTP session
+        and are skipped.
         
-        print(f"Pre-fetched data for {len(self.prev_day_cache)} / {len(symbols)} stocks.")
+        Returns:
+            int: Number of connections that answered
+        """
+        if getattr(self.fyers, 'service', None) is None:
+            return 0
+        from fyers_client import warm_connections
+        return warm_connections(self.scan_workers)
+
+    def warm_up(self):
+        """
+        Pre-scan warm-up: load caches and open HTTP connections so the first
+        scan calls do not pay for downloads or TCP/TLS setup
+        """
+        started = time.perf_counter()
+        if not self.lot_size_map:
+            self.load_lot_sizes()
+        self.pre_fetch_prev_day_data()
+        self.option_chain.warm()
+        warmed = self.warm_connections()
+        if self.scan_processes > 1 and not self._resumed:
+            self.start_sharded_scan()
+        elapsed = time.perf_counter() - started
+        self.log_activity(f"🔥 Warm-up done in {elapsed:.1f}s ({warmed} connections, {len(self.prev_day_cache)} prev-day cached)")
     
+    def _first_candle_requests(self, symbol):
+        """
+        History requests for the first 3-minute candle, in fallback order:
+        1. Exact time range (9:15-9:30)
+        2. Just today's date (let API return all candles)
+        """
+        today = self.clock.now()
+        # Times need epoch ranges: date_format 1 accepts only YYYY-MM-DD (-50 otherwise)
+        market_open = today.replace(hour=9, minute=15, second=0, microsecond=0)
+        exact = {
+            "symbol": symbol,
+            "resolution": "3",
+            "date_format": "0",
+            "range_from": str(int(market_open.timestamp())),
+            "range_to": str(int((market_open + timedelta(minutes=15)).timestamp())),  # Extended to 9:30 to ensure we get the candle
+            "cont_flag": "1"
+        }
+        whole_day = {
+            "symbol": symbol,
+            "resolution": "3",
+            "date_format": "1",
+            "range_from": today.strftime("%Y-%m-%d"),
+            "range_to": today.strftime("%Y-%m-%d"),
+            "cont_flag": "1"
+        }
+        return [exact, whole_day]
+
+    @staticmethod
+    def _candle_dict(candle, candle_time):
+        return {
+            'open': candle[1],
+            'high': candle[2],
+            'low': candle[3],
+            'close': candle[4],
+            'time': candle_time
+        }
+
+    def _parse_first_candle(self, response, exact):
+        """
+        Pick the first morning candle out of a 3-minute history response
+        
+        Args:
+            response: History API response
+            exact: True for the exact-range request (prefers the 9:15 / 9:18 candle)
+        """
+        if not (response['s'] == 'ok' and 'candles' in response and len(response['candles']) > 0):
+            return None
+        
+        if exact:
+            # Look for the first candle (should be at 9:15)
+            for candle in response['candles']:
+                candle_time = datetime.fromtimestamp(candle[0])
+                
+                # Check if this is the 9:15 candle (first 3-min candle)
+                if candle_time.hour == 9 and candle_time.minute in [15, 18]:  # 9:15 or 9:18
+                    return self._candle_dict(candle, candle_time)
+            
+            # If we didn't find exact 9:15, return first candle anyway
+            first_candle = response['candles'][0]
+            candle_time = datetime.fromtimestamp(first_candle[0])
+            
+            # Only accept if it's morning candle (between 9:15 and 9:30)
+            if candle_time.hour == 9 and 15 <= candle_time.minute < 30:
+                return self._candle_dict(first_candle, candle_time)
+            return None
+        
+        # Get the first candle of the day
+        first_candle = response['candles'][0]
+        candle_time = datetime.fromtimestamp(first_candle[0])
+        
+        # Verify it's the morning candle
+        if candle_time.hour == 9 and candle_time.minute >= 15:
+            return self._candle_dict(first_candle, candle_time)
+        return None
+
     def get_first_candle(self, symbol):
         """
         Get first 3-minute candle of the day (9:15-9:18)
@@ -240,83 +511,18 @@ class FnOTradingStrategy:
             dict with 'open', 'high', 'low', 'close' or None
         """
         try:
-            today = datetime.now()
-            
-            # Strategy 1: Try exact time range (9:15-9:18)
-            data = {
-                "symbol": symbol,
-                "resolution": "3",
-                "date_format": "1",
-                "range_from": f"{today.strftime('%Y-%m-%d')} 09:15:00",
-                "range_to": f"{today.strftime('%Y-%m-%d')} 09:30:00",  # Extended to 9:30 to ensure we get the candle
-                "cont_flag": "1"
-            }
-            
-            response = self.rate_limiter.make_call(self.fyers.history, data)
-            
-            if response['s'] == 'ok' and 'candles' in response and len(response['candles']) > 0:
-                # Look for the first candle (should be at 9:15)
-                for candle in response['candles']:
-                    candle_time = datetime.fromtimestamp(candle[0])
-                    
-                    # Check if this is the 9:15 candle (first 3-min candle)
-                    if candle_time.hour == 9 and candle_time.minute in [15, 18]:  # 9:15 or 9:18
-                        return {
-                            'open': candle[1],
-                            'high': candle[2],
-                            'low': candle[3],
-                            'close': candle[4],
-                            'time': candle_time
-                        }
-                
-                # If we didn't find exact 9:15, return first candle anyway
-                if response['candles']:
-                    first_candle = response['candles'][0]
-                    candle_time = datetime.fromtimestamp(first_candle[0])
-                    
-                    # Only accept if it's morning candle (between 9:15 and 9:30)
-                    if candle_time.hour == 9 and 15 <= candle_time.minute < 30:
-                        return {
-                            'open': first_candle[1],
-                            'high': first_candle[2],
-                            'low': first_candle[3],
-                            'close': first_candle[4],
-                            'time': candle_time
-                        }
-            
-            # Strategy 2: Try with just today's date (let API return all candles)
-            data2 = {
-                "symbol": symbol,
-                "resolution": "3",
-                "date_format": "1",
-                "range_from": today.strftime("%Y-%m-%d"),
-                "range_to": today.strftime("%Y-%m-%d"),
-                "cont_flag": "1"
-            }
-            
-            response2 = self.rate_limiter.make_call(self.fyers.history, data2)
-            
-            if response2['s'] == 'ok' and 'candles' in response2 and len(response2['candles']) > 0:
-                # Get the first candle of the day
-                first_candle = response2['candles'][0]
-                candle_time = datetime.fromtimestamp(first_candle[0])
-                
-                # Verify it's the morning candle
-                if candle_time.hour == 9 and candle_time.minute >= 15:
-                    return {
-                        'open': first_candle[1],
-                        'high': first_candle[2],
-                        'low': first_candle[3],
-                        'close': first_candle[4],
-                        'time': candle_time
-                    }
-            
-            return None
+            with tracing.span('first_candle', symbol=symbol):
+                for attempt, data in enumerate(self._first_candle_requests(symbol)):
+                    # attempt 1 = whole-day fallback when the exact window returned nothing
+                    with tracing.span('first_candle_attempt', symbol=symbol, attempt=attempt):
+                        response = self.rate_limiter.make_call(self.fyers.history, data)
+                        candle = self._parse_first_candle(response, exact=(attempt == 0))
+                    if candle:
+                        return candle
+                return None
             
         except Exception as e:
-            print(f"Error getting first candle for {symbol}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception(f"Error getting first candle for {symbol}: {e}")
             return None
     
     def check_entry_conditions(self, symbol, first_candle, prev_day, side='CE'):
@@ -344,7 +550,7 @@ class FnOTradingStrategy:
             
             conditions_met = cond1 and cond2 and cond3
             if conditions_met:
-                print(f"\n✓ {symbol} meets CE conditions:")
+                log.info(f"\n✓ {symbol} meets CE conditions:")
         else:
             # PE Condition 1: First 3 minute open == High
             cond1 = abs(first_candle['open'] - first_candle['high']) < 0.01
@@ -358,11 +564,11 @@ class FnOTradingStrategy:
             
             conditions_met = cond1 and cond2 and cond3
             if conditions_met:
-                print(f"\n✓ {symbol} meets PE conditions:")
+                log.info(f"\n✓ {symbol} meets PE conditions:")
 
         if conditions_met:
-            print(f"  First Candle: O={first_candle['open']}, H={first_candle['high']}, L={first_candle['low']}, C={first_candle['close']}")
-            print(f"  Prev Day: H={prev_day['high']}, L={prev_day.get('low', 'N/A')}, C={prev_day['close']}")
+            log.debug(f"  First Candle: O={first_candle['open']}, H={first_candle['high']}, L={first_candle['low']}, C={first_candle['close']}")
+            log.debug(f"  Prev Day: H={prev_day['high']}, L={prev_day.get('low', 'N/A')}, C={prev_day['close']}")
         
         return conditions_met
     
@@ -396,7 +602,7 @@ class FnOTradingStrategy:
         """
         Get nearest expiry date for the stock
         """
-        now = datetime.now()
+        now = self.clock.now()
         # Simplified: return current month expiry
         month_name = now.strftime("%b").upper()
         year = now.strftime("%y")
@@ -409,17 +615,184 @@ class FnOTradingStrategy:
         """
         return self.batch_manager.batch_get_quotes(self.fyers, symbols)
     
-    def scan_stocks_at_918(self):
+    def monitored_symbols(self):
+        """Symbols quoted each P&L tick: the options held plus their underlyings (for the Greeks)"""
+        symbols = self.portfolio.symbols()
+        if self.greeks is not None:
+            symbols = list(dict.fromkeys(list(symbols) + self.greeks.spot_symbols()))
+        return symbols
+    
+    def _fill_missing_prev_day(self):
+        """Fetch prev-day data for any stock the pre-fetch missed (single calls)"""
+        for stock in self.stock_list:
+            symbol = self.get_symbol_format(stock)
+            if symbol not in self.prev_day_cache:
+                prev_day = self.get_previous_day_data(symbol)
+                if prev_day:
+                    self.prev_day_cache[symbol] = prev_day
+
+    def _screen_stocks(self, stock_data, scan_results):
         """
-        Scan all stocks at 9:18 AM to check entry conditions
-        Should be called at 9:18:10 AM
+        Screen stocks that meet OHLC conditions
+        
+        Args:
+            stock_data: stock -> first candle (or None)
+            scan_results: Summary counters, updated in place
+            
+        Returns:
+            list: Potential entries (stock, symbol, side, spot, ATM strike, option symbol)
+        """
+        potential_entries = []
+        for stock in self.stock_list:
+            entry = self._screen_stock(stock, stock_data.get(stock), scan_results)
+            if entry:
+                potential_entries.append(entry)
+        return potential_entries
+
+    def _screen_stock(self, stock, first_candle, scan_results):
         """
-        print(f"\n{'='*60}")
-        print(f"Starting scan at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Scanning {len(self.stock_list)} stocks...")
-        print(f"{'='*60}")
+        Check one stock's first candle against its previous day
+        
+        Returns:
+            dict: Potential entry, or None (the reason is counted in scan_results)
+        """
+        symbol = self.get_symbol_format(stock)
+        
+        # Use cache for prev day data
+        prev_day = self.prev_day_cache.get(symbol)
+        if not prev_day:
+            scan_results['no_prev_day'] += 1
+            return None
         
-        scan_results = {
+        if not first_candle:
+            scan_results['no_first_candle'] += 1
+            return None
+        
+        # Check conditions
+        ce_qualified = self.check_entry_conditions(stock, first_candle, prev_day, side='CE')
+        pe_qualified = self.check_entry_conditions(stock, first_candle, prev_day, side='PE')
+        
+        if not (ce_qualified or pe_qualified):
+            scan_results['failed_conditions'] += 1
+            return None
+        
+        side = 'CE' if ce_qualified else 'PE'
+        spot_price = first_candle['close']
+        # Nearest listed contract; _execute_entries may move to a more liquid strike
+        atm_strike, option_symbol = self.option_chain.contract_symbol(stock, spot_price, side)
+        
+        return {
+            'stock': stock,
+            'symbol': symbol,
+            'side': side,
+            'spot_price': spot_price,
+            'atm_strike': atm_strike,
+            'option_symbol': option_symbol
+        }
+
+    def _qualify_entry(self, entry, option_quote, scan_results):
+        """
+        Record a qualified entry and build its order
+        
+        Returns:
+            dict: Order payload, or None if the option has no usable quote
+        """
+        if not option_quote:
+            return None
+        
+        stock = entry['stock']
+        option_symbol = entry['option_symbol']
+        side = entry['side']
+        option_price = option_quote.get('lp')
+        # Use CSV-based lot size
+        lot_size = self.get_lot_size(option_symbol, fallback_lot_size=option_quote.get('ls', 1))
+        
+        if not option_price:
+            return None
+        
+        if not self._greeks_allow(entry, option_price, lot_size):
+            return None
+        
+        # Live entries hold nothing until the order fills (FillTracker sets the size / price)
+        self.qualified_stocks[stock] = {
+            'spot_symbol': entry['symbol'],
+            'option_symbol': option_symbol,
+            'type': side,
+            'strike': entry['atm_strike'],
+            'entry_time': self.clock.now(),
+            'entry_price': option_price,
+            'spot_price': entry['spot_price'],
+            'lot_size': lot_size if self.virtual_trading else 0,
+            'status': 'RUNNING' if self.virtual_trading else 'PENDING'
+        }
+        if not self.virtual_trading:
+            self.qualified_stocks[stock]['order_qty'] = int(lot_size)
+            self.fills.signal(stock, 'entry')
+        self._journal('entry', stock, self.qualified_stocks.to_dict(stock))
+        self.portfolio.upsert(stock, self.qualified_stocks[stock], price=option_price)
+        
+        if side == 'CE': scan_results['qualified_ce'] += 1
+        else: scan_results['qualified_pe'] += 1
+        
+        log.info(f"  ✅ {side} QUALIFIED: {stock} at ₹{option_price:.2f}")
+        
+        # PLACING ORDER
+        return {
+            "symbol": option_symbol,
+            "qty": int(lot_size),
+            "type": 1, "side": 1, "productType": "INTRADAY",
+            "limitPrice": float(option_price), "stopPrice": 0, "validity": "DAY",
+            "disclosedQty": 0, "offlineOrder": False, "orderTag": ENTRY_ORDER_TAG
+        }
+
+    def _greeks_allow(self, entry, option_price, lot_size):
+        """RISK_CONFIG Greek limits: hold back an entry that would breach them"""
+        greeks = self.greeks
+        if greeks is None or not any(limit is not None for limit in greeks.limits.values()):
+            return True
+        if len(self.qualified_stocks):
+            greeks.update()  # Include entries placed earlier in this batch (unfilled ones at their order size)
+        candidate = greeks.contract(entry['spot_price'], entry['atm_strike'], entry['option_symbol'],
+                                    option_price, entry['side'], underlying=entry['stock'])
+        if greeks.allows(candidate, lot_size, entry['spot_price']):
+            return True
+        log.warning(f"  ⚠️ {entry['stock']} {entry['side']} skipped: it would breach the Greek limits "
+                    f"(Δ {candidate['delta']:.2f}, V ₹{candidate['vega'] * lot_size:,.0f}/vol pt)")
+        self.log_activity(f"⚠️ Risk: skipped {entry['stock']} {entry['side']} (Greek limits)")
+        return False
+
+    def _log_entry_order(self, entry, order_data, resp):
+        """Log the outcome of an entry order (resp is None for virtual orders)"""
+        stock = entry['stock']
+        side = entry['side']
+        option_price = order_data['limitPrice']
+        self._journal('order', stock, {'kind': 'entry', 'order': order_data, 'response': resp})
+        if resp is None:
+            log.info(f"    📝 VIRTUAL ORDER (SIMULATED): {order_data['symbol']} qty {order_data['qty']}")
+            self.log_activity(f"📝 Virtual Order: {stock} {side} at ₹{option_price:.2f}")
+        elif resp['s'] == 'ok':
+            log.info(f"    🚀 ORDER PLACED: {resp.get('id')}")
+            self.log_activity(f"🚀 Live Order: {stock} {side} at ₹{option_price:.2f}")
+            self.fills.acknowledged(stock, 'entry', resp.get('id'), order_data['qty'], option_price)
+        else:
+            log.warning(f"    ❌ ORDER FAILED: {resp.get('message')}")
+            self.log_activity(f"❌ Order Failed: {stock} {side} - {resp.get('message')}")
+            self.fills.rejected(stock, 'entry', resp.get('message'))
+
+    def _print_scan_summary(self, scan_results):
+        log.info(f"\n{'='*60}")
+        log.info(f"SCAN SUMMARY")
+        log.info(f"{'='*60}")
+        log.info(f"Total stocks scanned: {scan_results['total']}")
+        log.info(f"✅ Qualified CE: {scan_results['qualified_ce']}")
+        log.info(f"✅ Qualified PE: {scan_results['qualified_pe']}")
+        log.info(f"❌ No previous day data: {scan_results['no_prev_day']}")
+        log.info(f"❌ No first candle: {scan_results['no_first_candle']}")
+        log.info(f"❌ Failed conditions: {scan_results['failed_conditions']}")
+        log.info(f"{'='*60}\n")
+
+    def _new_scan_results(self):
+        return {
             'total': len(self.stock_list),
             'qualified_ce': 0,
             'qualified_pe': 0,
@@ -427,11 +800,68 @@ class FnOTradingStrategy:
             'no_first_candle': 0,
             'failed_conditions': 0
         }
+    
+    def scan_stocks_at_918(self):
+        """
+        Scan all stocks at 9:18 AM to check entry conditions
+        Should be called at 9:18:10 AM
+        """
+        log.info(f"\n{'='*60}")
+        log.info(f"Starting scan at {self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        log.info(f"Scanning {len(self.stock_list)} stocks...")
+        log.info(f"{'='*60}")
+        
+        with self._phase('total'):
+            if self.scan_processes > 1:
+                scan_results = self._run_sharded_scan()
+            else:
+                scan_results = self._run_scan()
+        self._journal('scan', None, scan_results)
+        tracing.flush()
+
+    def start_sharded_scan(self):
+        """
+        Spawn the sharded-scan worker processes ahead of the scan (warm-up):
+        they load their shard's caches and then wait for the trigger
+        
+        Returns:
+            ShardedScanner
+        """
+        if self.sharded_scanner is None:
+            from sharded_scan import ShardedScanner
+            self.sharded_scanner = ShardedScanner(self, self.scan_processes)
+            self.sharded_scanner.start()
+        return self.sharded_scanner
+
+    def _run_sharded_scan(self):
+        """Scan across worker processes; qualifiers are quoted and ordered here as they stream in"""
+        scan_results = self._new_scan_results()
+        scanner = self.start_sharded_scan()
+        try:
+            with self._phase('sharded'):
+                scanner.run(scan_results)
+        finally:
+            scanner.stop()
+            self.sharded_scanner = None
+        self._print_scan_summary(scan_results)
+        return scan_results
+
+    @contextlib.contextmanager
+    def _phase(self, phase):
+        """Time a scan phase into the metrics histogram and the trace"""
+        with SCAN_PHASE.time(phase=phase), tracing.span(f'scan:{phase}'):
+            yield
+
+    def _run_scan(self):
+        """Body of scan_stocks_at_918, timed per phase"""
+        scan_results = self._new_scan_results()
 
         # Step 1: Pre-fetch all first candles in parallel
-        print(f"Fetching first candles for all stocks in parallel...")
+        log.info(f"Fetching first candles for all stocks in parallel...")
         stock_data = {}
-        with concurrent.futures.ThreadPoolExecutor(max_workers=15) as executor:
+        with self._phase('first_candles'), \
+                concurrent.futures.ThreadPoolExecutor(max_workers=self.scan_workers,
+                                                      thread_name_prefix='scan') as executor:
             future_to_stock = {
                 executor.submit(self.get_first_candle, self.get_symbol_format(s)): s 
                 for s in self.stock_list
@@ -441,146 +871,106 @@ class FnOTradingStrategy:
                 try:
                     stock_data[stock] = future.result()
                 except Exception as e:
-                    print(f"  ❌ Error fetching candle for {stock}: {e}")
+                    log.error(f"  ❌ Error fetching candle for {stock}: {e}")
                     stock_data[stock] = None
 
         # Step 2: Screen stocks that meet OHLC conditions
-        potential_entries = []
-        for stock in self.stock_list:
-            symbol = self.get_symbol_format(stock)
-            
-            # Use cache for prev day data
-            prev_day = self.prev_day_cache.get(symbol)
-            if not prev_day:
-                # Fallback to single fetch if not in cache
-                prev_day = self.get_previous_day_data(symbol)
-                if not prev_day:
-                    scan_results['no_prev_day'] += 1
-                    continue
-                self.prev_day_cache[symbol] = prev_day
-            
-            first_candle = stock_data.get(stock)
-            if not first_candle:
-                scan_results['no_first_candle'] += 1
-                continue
-            
-            # Check conditions
-            ce_qualified = self.check_entry_conditions(stock, first_candle, prev_day, side='CE')
-            pe_qualified = self.check_entry_conditions(stock, first_candle, prev_day, side='PE')
-            
-            if ce_qualified or pe_qualified:
-                side = 'CE' if ce_qualified else 'PE'
-                spot_price = first_candle['close']
-                atm_strike = self.get_atm_strike(spot_price)
-                
-                option_symbol = self.get_ce_option_symbol(stock, atm_strike) if side == 'CE' else \
-                               self.get_pe_option_symbol(stock, atm_strike)
-                
-                potential_entries.append({
-                    'stock': stock,
-                    'symbol': symbol,
-                    'side': side,
-                    'spot_price': spot_price,
-                    'atm_strike': atm_strike,
-                    'option_symbol': option_symbol
-                })
+        with self._phase('prev_day_fill'):
+            self._fill_missing_prev_day()
+        with self._phase('screen'):
+            potential_entries = self._screen_stocks(stock_data, scan_results)
 
         if not potential_entries:
-            print("No stocks met OHLC entry conditions.")
-            return
-
-        # Step 3: Fetch all required option quotes in ONE batch
-        print(f"Fetching quotes for {len(potential_entries)} potential entries...")
-        option_symbols = [e['option_symbol'] for e in potential_entries]
-        option_quotes = self.get_multiple_prices(option_symbols)
+            log.info("No stocks met OHLC entry conditions.")
+            return scan_results
 
-        # Step 4: Execute orders for qualified stocks
-        for entry in potential_entries:
-            stock = entry['stock']
-            option_symbol = entry['option_symbol']
-            side = entry['side']
-            
-            option_quote = option_quotes.get(option_symbol)
-            if option_quote:
-                option_price = option_quote.get('lp')
-                # Use CSV-based lot size
-                lot_size = self.get_lot_size(option_symbol, fallback_lot_size=option_quote.get('ls', 1))
-                
-                if option_price:
-                    self.qualified_stocks[stock] = {
-                        'spot_symbol': entry['symbol'],
-                        'option_symbol': option_symbol,
-                        'type': side,
-                        'strike': entry['atm_strike'],
-                        'entry_time': datetime.now(),
-                        'entry_price': option_price,
-                        'spot_price': entry['spot_price'],
-                        'lot_size': lot_size,
-                        'status': 'RUNNING'
-                    }
-                    
-                    if side == 'CE': scan_results['qualified_ce'] += 1
-                    else: scan_results['qualified_pe'] += 1
-                    
-                    print(f"  ✅ {side} QUALIFIED: {stock} at ₹{option_price:.2f}")
-
-                    # PLACING ORDER
-                    order_data = {
-                        "symbol": option_symbol,
-                        "qty": int(lot_size),
-                        "type": 1, "side": 1, "productType": "INTRADAY",
-                        "limitPrice": float(option_price), "stopPrice": 0, "validity": "DAY",
-                        "disclosedQty": 0, "offlineOrder": False, "orderTag": "AutoEntryScanFast"
-                    }
-                    
-                    try:
-                        if self.virtual_trading:
-                            print(f"    📝 VIRTUAL ORDER (SIMULATED): {option_symbol} qty {lot_size}")
-                            self.log_activity(f"📝 Virtual Order: {stock} {side} at ₹{option_price:.2f}")
-                        else:
-                            resp = self.rate_limiter.make_call(self.fyers.place_order, order_data)
-                            if resp['s'] == 'ok':
-                                print(f"    🚀 ORDER PLACED: {resp.get('id')}")
-                                self.log_activity(f"🚀 Live Order: {stock} {side} at ₹{option_price:.2f}")
-                            else:
-                                print(f"    ❌ ORDER FAILED: {resp.get('message')}")
-                                self.log_activity(f"❌ Order Failed: {stock} {side} - {resp.get('message')}")
-                    except Exception as e:
-                        print(f"    ❌ ERROR: {e}")
+        # Steps 3-4: option quotes and orders
+        self._execute_entries(potential_entries, scan_results)
         
         # Print summary
-        print(f"\n{'='*60}")
-        print(f"SCAN SUMMARY")
-        print(f"{'='*60}")
-        print(f"Total stocks scanned: {scan_results['total']}")
-        print(f"✅ Qualified CE: {scan_results['qualified_ce']}")
-        print(f"✅ Qualified PE: {scan_results['qualified_pe']}")
-        print(f"❌ No previous day data: {scan_results['no_prev_day']}")
-        print(f"❌ No first candle: {scan_results['no_first_candle']}")
-        print(f"❌ Failed conditions: {scan_results['failed_conditions']}")
-        print(f"{'='*60}\n")
+        self._print_scan_summary(scan_results)
+        return scan_results
+
+    def _execute_entries(self, potential_entries, scan_results):
+        """
+        Quote the option of every potential entry in one batch, then record
+        and place the entry orders
+        
+        Args:
+            potential_entries: Entries from _screen_stock
+            scan_results: Summary counters, updated in place
+        """
+        # Step 3: Quote the ATM±N chain of every entry in ONE batch and pick the contracts
+        log.info(f"Fetching option chains for {len(potential_entries)} potential entries...")
+        with self._phase('option_quotes'):
+            symbols = self.option_chain.plan(self._chain_wants(potential_entries))
+            option_quotes = self._select_contracts(potential_entries, self.get_multiple_prices(symbols) if symbols else {})
+
+        # Step 4: Execute orders for qualified stocks
+        with self._phase('orders'):
+            for entry in potential_entries:
+                order_data = self._qualify_entry(entry, option_quotes.get(entry['option_symbol']), scan_results)
+                if not order_data:
+                    continue
+                try:
+                    if self.virtual_trading:
+                        self._log_entry_order(entry, order_data, None)
+                    else:
+                        resp = self._place_order(order_data, 'entry')
+                        self._log_entry_order(entry, order_data, resp)
+                except Exception as e:
+                    log.error(f"    ❌ ERROR: {e}")
+                    if not self.virtual_trading:
+                        self.fills.rejected(entry['stock'], 'entry', str(e))
+
+    @staticmethod
+    def _chain_wants(potential_entries):
+        """Option chain lookups for a batch of entries"""
+        return [(e['stock'], e['spot_price'], e['side']) for e in potential_entries]
+
+    def _select_contracts(self, potential_entries, chain_quotes):
+        """
+        Move each entry onto the contract the option chain selects
         
+        Args:
+            potential_entries: Entries from _screen_stock (updated in place)
+            chain_quotes: Quotes for the symbols option_chain.plan() asked for
+            
+        Returns:
+            dict: option symbol -> quote for the selected contracts
+        """
+        self.option_chain.ingest(chain_quotes)
+        option_quotes = {}
+        for entry in potential_entries:
+            contract = self.option_chain.select(entry['stock'], entry['spot_price'], entry['side'])
+            if contract is None:
+                log.warning(f"  ⚠️ No tradable {entry['side']} contract near {entry['spot_price']} for {entry['stock']}")
+                continue
+            if contract['symbol'] != entry['option_symbol']:
+                log.info(f"  🔁 {entry['stock']}: {entry['option_symbol']} → {contract['symbol']} (liquidity)")
+            entry['atm_strike'] = contract['strike']
+            entry['option_symbol'] = contract['symbol']
+            option_quotes[contract['symbol']] = contract['quote']
+        return option_quotes
+
+    def _place_order(self, order_data, kind):
+        """Rate-limited place_order, recording the round trip (kind: entry / exit)"""
+        with ORDER_RTT.time(kind=kind):
+            return self.rate_limiter.make_call(self.fyers.place_order, order_data)
+
+    def _cancel_order(self, order_id):
+        """Rate-limited cancel_order, recording the round trip"""
+        with ORDER_RTT.time(kind='cancel'):
+            return self.rate_limiter.make_call(self.fyers.cancel_order, {'id': order_id})
+
     def calculate_pnl(self, entry_price, current_price, lot_size):
         """
         Calculate PnL with lot size
         """
-        # Calculate per share P&L
-        pnl_per_share = current_price - entry_price
-        
-        # Calculate total P&L (per share * lot size)
-        total_pnl = pnl_per_share * lot_size
-        
-        # Calculate percentage
-        pnl_percent = ((current_price - entry_price) / entry_price) * 100
-        
-        # Calculate total investment
-        total_investment = entry_price * lot_size
-        
-        # Calculate current value
-        current_value = current_price * lot_size
+        total_pnl, pnl_percent, total_investment, current_value = position_pnl(entry_price, current_price, lot_size)
         
         return {
-            'pnl_per_share': pnl_per_share,
+            'pnl_per_share': current_price - entry_price,
             'total_pnl': total_pnl,
             'pnl_percent': pnl_percent,
             'entry_price': entry_price,
@@ -590,150 +980,229 @@ class FnOTradingStrategy:
             'current_value': current_value
         }
     
-    def monitor_pnl(self):
+    def monitor_pnl(self, prices=None):
         """
         Monitor PnL for all qualified stocks every minute
         Optimized to use batch API calls
+        
+        Args:
+            prices: Optional pre-fetched symbol -> quote map (skips the batch fetch)
         """
         if not self.qualified_stocks:
-            print("No stocks to monitor")
+            log.info("No stocks to monitor")
             return
         
-        print(f"\n{'='*80}")
-        print(f"PnL Update at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"{'='*80}")
-        
-        # Get all option symbols to fetch
-        symbols = [details['option_symbol'] for details in self.qualified_stocks.values()]
+        log.info(f"\n{'='*80}")
+        log.info(f"PnL Update at {self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        log.info(f"{'='*80}")
         
         # Fetch all prices in batch
-        try:
-            prices = self.get_multiple_prices(symbols)
-        except Exception as e:
-            print(f"Error fetching batch prices: {e}")
-            prices = {}
+        if prices is None:
+            try:
+                prices = self.get_multiple_prices(self.monitored_symbols())
+            except Exception as e:
+                log.error(f"Error fetching batch prices: {e}")
+                prices = {}
         
-        totals = {
-            'CE': {'invested': 0, 'value': 0, 'count': 0},
-            'PE': {'invested': 0, 'value': 0, 'count': 0}
-        }
+        # Only positions whose price moved are recomputed
+        self.portfolio.update_prices(prices)
+        if self.greeks is not None:
+            self.greeks.update(prices)
+            self.greeks.check_limits()
         
-        for stock, details in self.qualified_stocks.items():
-            opt_symbol = details['option_symbol']
-            side = details['type']
-            
-            # Get price from batch result
-            current_price = prices.get(opt_symbol, {}).get('lp')
-            
-            if current_price:
-                pnl_data = self.calculate_pnl(
-                    details['entry_price'], 
-                    current_price,
-                    details['lot_size']
-                )
-                
-                # Update totals
-                totals[side]['invested'] += pnl_data['total_investment']
-                totals[side]['value'] += pnl_data['current_value']
-                totals[side]['count'] += 1
-                
-                # Color coding for PnL
-                pnl_symbol = "🟢" if pnl_data['total_pnl'] >= 0 else "🔴"
-                
-                print(f"\n{stock} ({details['strike']} {side}) - Lot: {details['lot_size']}")
-                print(f"  Entry: ₹{details['entry_price']:.2f} at {details['entry_time'].strftime('%H:%M:%S')}")
-                print(f"  LTP: ₹{current_price:.2f} ({pnl_symbol} P&L: ₹{pnl_data['total_pnl']:,.2f} / {pnl_data['pnl_percent']:+.2f}%)")
-            else:
-                print(f"\n{stock}: Could not fetch LTP for {opt_symbol}")
+        # Per-position lines every tick: DEBUG (the summary below stays at INFO)
+        if log.isEnabledFor(logging.DEBUG):
+            for stock in self.qualified_stocks:
+                row = self.portfolio.row(stock)
+                if row is None or row['is_stale']:
+                    log.debug(f"\n{stock}: Could not fetch LTP for {row['option_symbol'] if row else '?'}")
+                    continue
+                pnl_symbol = "🟢" if row['total_pnl'] >= 0 else "🔴"
+                log.debug(f"\n{stock} ({row['strike']} {row['type']}) - Lot: {row['lot_size']}")
+                log.debug(f"  Entry: ₹{row['entry_price']:.2f} at {row['entry_time']}")
+                log.debug(f"  LTP: ₹{row['current_price']:.2f} ({pnl_symbol} P&L: ₹{row['total_pnl']:,.2f} / {row['pnl_percent']:+.2f}%)")
         
         # Print summary
-        total_inv = totals['CE']['invested'] + totals['PE']['invested']
-        total_val = totals['CE']['value'] + totals['PE']['value']
+        summary = self.portfolio.summary()
+        totals = summary['sides']
         
-        if total_inv > 0:
-            overall_pnl = total_val - total_inv
-            overall_pnl_pct = (overall_pnl / total_inv) * 100
+        if summary['invested'] > 0:
+            overall_pnl = summary['pnl']
+            overall_pnl_pct = summary['pnl_percent']
             
-            print(f"\n{'='*80}")
-            print(f"SUMMARY")
-            print(f"  CE Positions: {totals['CE']['count']} (Invested: ₹{totals['CE']['invested']:,.2f})")
-            print(f"  PE Positions: {totals['PE']['count']} (Invested: ₹{totals['PE']['invested']:,.2f})")
-            print(f"  {'🟢' if overall_pnl >= 0 else '🔴'} Total P&L: ₹{overall_pnl:,.2f} ({overall_pnl_pct:+.2f}%)")
+            log.info(f"\n{'='*80}")
+            log.info(f"SUMMARY")
+            log.info(f"  CE Positions: {totals['CE']['count']} (Invested: ₹{totals['CE']['invested']:,.2f})")
+            log.info(f"  PE Positions: {totals['PE']['count']} (Invested: ₹{totals['PE']['invested']:,.2f})")
+            log.info(f"  {'🟢' if overall_pnl >= 0 else '🔴'} Total P&L: ₹{overall_pnl:,.2f} ({overall_pnl_pct:+.2f}%)")
+            if self.greeks is not None:
+                g = self.greeks.latest['portfolio']
+                log.info(f"  Greeks: Δ {g['delta']:,.0f} (₹{g['delta_value']:,.0f}) | Γ {g['gamma']:,.2f} | "
+                         f"Θ ₹{g['theta']:,.0f}/day | V ₹{g['vega']:,.0f}/vol pt")
             
             # Show API usage stats
             stats = self.rate_limiter.get_stats()
-            print(f"\n📊 API Calls: Today: {stats['calls_today']} | Min: {stats['calls_last_minute']} | Sec: {stats['calls_last_second']}")
-            print(f"{'='*80}")
+            log.info(f"\n📊 API Calls: Today: {stats['calls_today']} | Min: {stats['calls_last_minute']} | Sec: {stats['calls_last_second']}")
+            log.info(f"{'='*80}")
     
-    def exit_position(self, stock):
+    def _exit_order(self, stock, ltp):
+        """Limit SELL order squaring off a position at LTP"""
+        details = self.qualified_stocks[stock]
+        return {
+            "symbol": details['option_symbol'],
+            "qty": int(details['lot_size']),
+            "type": 1,        # 1: Limit Order
+            "side": -1,       # -1: Sell (since we are squaring off a BUY position)
+            "productType": "INTRADAY",
+            "limitPrice": float(ltp),
+            "stopPrice": 0,
+            "validity": "DAY",
+            "disclosedQty": 0,
+            "offlineOrder": False,
+            "orderTag": "ExitDashboard"
+        }
+
+    def _finish_exit(self, stock, ltp, response):
         """
-        Square off an open position at LTP
+        Apply an exit order response (None for virtual exits) to the position
         
-        Args:
-            stock: Stock symbol (e.g., 'SBIN')
-            
         Returns:
             dict: Success/Failure status and message
         """
+        self._journal('order', stock, {'kind': 'exit', 'order': self._exit_order(stock, ltp), 'response': response})
+        if response is None:
+            log.info(f"    📝 VIRTUAL EXIT (SIMULATED): {self.qualified_stocks[stock]['option_symbol']} at {ltp}")
+            self.log_activity(f"✅ Virtual Exit: {stock} at ₹{ltp:.2f}")
+            # Mark as EXITED
+            self.qualified_stocks[stock]['status'] = 'EXITED'
+            self.qualified_stocks[stock]['exit_price'] = ltp
+            self.qualified_stocks[stock]['exit_time'] = self.clock.now()
+            self._record_exit(stock)
+            return {"success": True, "message": f"Virtual Exit {stock} at ₹{ltp:.2f}"}
+        
+        if response['s'] == 'ok':
+            # EXITED (at the traded price) once the SELL fills - FillTracker
+            self.log_activity(f"🚀 Live Exit: {stock} at ₹{ltp:.2f}")
+            self.fills.acknowledged(stock, 'exit', response.get('id'), self._exit_order(stock, ltp)['qty'], ltp)
+            return {"success": True, "message": f"Exit order placed for {stock} at ₹{ltp:.2f}",
+                    "order_id": response.get('id')}
+        else:
+            self.fills.rejected(stock, 'exit', response.get('message'))
+            self.log_activity(f"❌ Exit Failed: {stock} - {response.get('message', 'Unknown error')}")
+            return {"success": False, "message": f"Fyers Error: {response.get('message', 'Unknown error')}"}
+
+    def _exit_blocked(self, stock):
+        """
+        Why a position cannot be squared off now (None if it can)
+        
+        Returns:
+            dict: Failure result, or None
+        """
         if stock not in self.qualified_stocks:
             return {"success": False, "message": f"No open position for {stock}"}
+        status = self.qualified_stocks[stock].get('status')
+        if status not in OPEN_STATUSES:
+            return {"success": False, "message": f"{stock} is already {status}"}
+        if self.fills.pending_order(stock, 'exit'):
+            return {"success": False, "message": f"Exit order for {stock} is already pending"}
+        return None
+
+    def _cancel_entry(self, stock):
+        """
+        Cancel the unfilled part of a position's entry order
+        
+        Returns:
+            dict: Failure result, or None if the order was cancelled (or was not open)
+        """
+        order_id = self.fills.pending_order(stock, 'entry')
+        if not order_id:
+            return None
+        response = self._cancel_order(order_id)
+        self._journal('order', stock, {'kind': 'cancel', 'order': {'id': order_id}, 'response': response})
+        if not isinstance(response, dict) or response.get('s') != 'ok':
+            message = response.get('message', 'Unknown error') if isinstance(response, dict) else response
+            self.log_activity(f"❌ Cancel Failed: {stock} - {message}")
+            return {"success": False, "message": f"Fyers Error: {message}"}
+        # Size the SELL only once the broker confirms the cancel: a fill can still land before it
+        from config import ORDER_STREAM_CONFIG
+        if not self.fills.wait_settled(order_id, ORDER_STREAM_CONFIG.get('CANCEL_CONFIRM_SECONDS', 5)):
+            self.log_activity(f"⚠️ Cancel of the {stock} entry order not confirmed yet")
+            return {"success": False, "message": f"Cancel of the {stock} entry order is not confirmed yet - retry the exit"}
+        self.log_activity(f"🚫 Entry order cancelled: {stock}")
+        return None
+
+    def _exit_open_entry(self, stock):
+        """
+        PENDING / PARTIAL positions: cancel what is still open of the entry order
         
+        Returns:
+            dict: Result when nothing is left to sell, or None to go on with the SELL
+        """
         details = self.qualified_stocks[stock]
-        opt_symbol = details['option_symbol']
-        lot_size = details['lot_size']
-        side = -1  # Default: Sell (since we are squaring off a BUY position)
+        if details.get('status') not in ('PENDING', 'PARTIAL'):
+            return None
+        failed = self._cancel_entry(stock)
+        if failed:
+            return failed
+        if not details.get('lot_size'):
+            return {"success": True, "message": f"Entry order for {stock} cancelled (nothing filled)"}
+        return None
+
+    def _record_exit(self, stock):
+        """Journal an exit and freeze the position's P&L at the exit price"""
+        details = self.qualified_stocks[stock]
+        self.portfolio.upsert(stock, details)
+        self._journal('exit', stock, {key: details[key] for key in ('status', 'exit_price', 'exit_time')})
+
+    def exit_position(self, stock):
+        """
+        Square off an open position at LTP
         
-        # Get current LTP for limit order
-        ltp = self.get_current_price(opt_symbol)
-        if not ltp:
-            return {"success": False, "message": f"Could not get LTP for {opt_symbol}"}
+        Args:
+            stock: Stock symbol (e.g., 'SBIN')
+            
+        Returns:
+            dict: Success/Failure status and message
+        """
+        blocked = self._exit_blocked(stock)
+        if blocked:
+            return blocked
         
-        data = {
-            "symbol": opt_symbol,
-            "qty": int(lot_size),
-            "type": 1,        # 1: Limit Order
-            "side": side,     # -1: Sell
-            "productType": "INTRADAY",
-            "limitPrice": float(ltp),
-            "stopPrice": 0,
-            "validity": "DAY",
-            "disclosedQty": 0,
-            "offlineOrder": False,
-            "orderTag": "ExitDashboard"
-        }
+        opt_symbol = self.qualified_stocks[stock]['option_symbol']
         
         try:
-            print(f"SQUARING OFF {stock}: {opt_symbol} at {ltp}...")
+            if not self.virtual_trading:
+                self.fills.signal(stock, 'exit')
+                done = self._exit_open_entry(stock)
+                if done:
+                    return done
             
-            if self.virtual_trading:
-                print(f"    📝 VIRTUAL EXIT (SIMULATED): {opt_symbol} at {ltp}")
-                self.log_activity(f"✅ Virtual Exit: {stock} at ₹{ltp:.2f}")
-                # Mark as EXITED
-                self.qualified_stocks[stock]['status'] = 'EXITED'
-                self.qualified_stocks[stock]['exit_price'] = ltp
-                self.qualified_stocks[stock]['exit_time'] = datetime.now()
-                return {"success": True, "message": f"Virtual Exit {stock} at ₹{ltp:.2f}"}
+            # Get current LTP for limit order
+            ltp = self.get_current_price(opt_symbol)
+            if not ltp:
+                return {"success": False, "message": f"Could not get LTP for {opt_symbol}"}
             
-            response = self.rate_limiter.make_call(self.fyers.place_order, data)
+            data = self._exit_order(stock, ltp)
+            log.info(f"SQUARING OFF {stock}: {opt_symbol} at {ltp}...")
             
-            if response['s'] == 'ok':
-                # Mark as EXITED instead of deleting
-                self.qualified_stocks[stock]['status'] = 'EXITED'
-                self.qualified_stocks[stock]['exit_price'] = ltp
-                self.qualified_stocks[stock]['exit_time'] = datetime.now()
-                self.log_activity(f"✅ Live Exit: {stock} at ₹{ltp:.2f}")
-                return {"success": True, "message": f"Exited {stock} at ₹{ltp:.2f}", "order_id": response.get('id')}
-            else:
-                self.log_activity(f"❌ Exit Failed: {stock} - {response.get('message', 'Unknown error')}")
-                return {"success": False, "message": f"Fyers Error: {response.get('message', 'Unknown error')}"}
+            if self.virtual_trading:
+                return self._finish_exit(stock, ltp, None)
+            
+            response = self._place_order(data, 'exit')
+            return self._finish_exit(stock, ltp, response)
         except Exception as e:
-            print(f"Error exiting position for {stock}: {e}")
+            log.error(f"Error exiting position for {stock}: {e}")
             return {"success": False, "message": str(e)}
 
+    def open_positions(self):
+        """Positions that hold (or may still get) a quantity and have no exit order pending"""
+        return [s for s, d in self.qualified_stocks.items()
+                if d.get('status') in OPEN_STATUSES and not self.fills.pending_order(s, 'exit')]
+
     def exit_all_positions(self):
-        """Exit all currently running positions immediately"""
+        """Exit all open positions immediately (unfilled entry orders are cancelled)"""
         results = []
-        running_stocks = [s for s, d in self.qualified_stocks.items() if d.get('status') == 'RUNNING']
+        running_stocks = self.open_positions()
         
         if not running_stocks:
             return {"success": True, "message": "No running positions to exit"}
@@ -752,59 +1221,102 @@ class FnOTradingStrategy:
     
     def run(self):
         """
-        Main execution loop - Scans ONCE at 9:18:10 AM, then monitors P&L
+        Main execution loop - Scans ONCE at SCAN_TIME (9:18:10 AM), then monitors P&L
         """
-        print("Starting FnO Trading Strategy...")
-        print(f"Monitoring stocks: {', '.join(self.stock_list)}")
-        print("\n⚠️  Entry conditions will be checked ONCE at 9:18:10 AM")
-        print("After that, only P&L monitoring will continue")
+        from config import TRADING_CONFIG
+        from scheduler import format_scan_time
         
-        # Wait until 9:18:10 AM to scan
-        now = datetime.now()
-        target_time = now.replace(hour=9, minute=18, second=10, microsecond=0)
+        scan_time = TRADING_CONFIG['SCAN_TIME']
+        scan_label = format_scan_time(scan_time)
+        warmup_seconds = TRADING_CONFIG.get('WARMUP_SECONDS', 30)
         
-        # If already past 9:18:10, scan immediately
-        if now >= target_time:
-            print(f"\n⚠️  Already past 9:18:10 AM - scanning now...")
-        else:
-            wait_seconds = (target_time - now).total_seconds()
-            print(f"\nWaiting until 9:18:10 AM ({wait_seconds:.0f} seconds)...")
-            time.sleep(wait_seconds)
+        log.info("Starting FnO Trading Strategy...")
+        log.info(f"Monitoring stocks: {', '.join(self.stock_list)}")
+        log.info(f"\n⚠️  Entry conditions will be checked ONCE at {scan_label}")
+        log.info("After that, only P&L monitoring will continue")
         
-        # Scan stocks at 9:18:10 (ONLY ONCE)
-        print("\n🔍 Starting ENTRY SCAN...")
-        self.scan_stocks_at_918()
+        self.start_order_stream()
+        if self.resume_from_journal():
+            # Restart after a crash: today's scan already ran
+            log.info("\n♻️  Today's scan already ran - resuming P&L monitoring from the journal")
+            if self.qualified_stocks:
+                self.monitor_pnl()  # First tick straight away, then check against the broker
+                self.reconcile_with_broker()
+        elif not self._wait_and_scan(scan_time, scan_label, warmup_seconds):
+            return
         
         if not self.qualified_stocks:
-            print("\n✗ No stocks qualified for trading today")
-            print("Strategy will remain idle. You can stop it.")
+            log.info("\n✗ No stocks qualified for trading today")
+            log.info("Strategy will remain idle. You can stop it.")
             return
         
-        print(f"\n✓ Tracking {len(self.qualified_stocks)} stock(s)")
-        print("📊 Starting P&L monitoring (every 2 seconds)...")
-        print("Entry scan complete - will NOT scan again until you restart")
+        log.info(f"\n✓ Tracking {len(self.qualified_stocks)} stock(s)")
+        log.info("📊 Starting P&L monitoring (every 2 seconds)...")
+        log.info("Entry scan complete - will NOT scan again until you restart")
         
         # Monitor P&L continuously (every 2 seconds)
-        last_monitor = time.time()
+        last_monitor = self.clock.time()
         monitor_interval = 2  # 2 seconds
         
-        while True:
+        while not self.stop_event.is_set():
             try:
-                current_time = time.time()
+                current_time = self.clock.time()
                 
                 # Update P&L every 2 seconds
                 if current_time - last_monitor >= monitor_interval:
                     self.monitor_pnl()
                     last_monitor = current_time
                 
-                time.sleep(0.5)  # Small sleep to prevent CPU spinning
+                self._pause(0.5)  # Small sleep to prevent CPU spinning
                 
             except KeyboardInterrupt:
-                print("\n\nStopping strategy...")
+                log.info("\n\nStopping strategy...")
                 break
             except Exception as e:
-                print(f"\nError in monitoring loop: {e}")
-                time.sleep(2)
+                log.error(f"\nError in monitoring loop: {e}")
+                self._pause(2)
+        
+        log.info("Strategy stopped")
+
+    def _wait_and_scan(self, scan_time, scan_label, warmup_seconds):
+        """
+        Wait for SCAN_TIME (warming up shortly before) and run the entry scan
+        
+        Returns:
+            bool: False if the strategy was stopped before the scan
+        """
+        from config import TRADING_CONFIG
+        from scheduler import wait_until, scan_target
+        
+        now = self.clock.now()
+        target_time = scan_target(self.clock, scan_time)
+        
+        # If already past the scan time, scan immediately
+        if now >= target_time:
+            log.info(f"\n⚠️  Already past {scan_label} - scanning now...")
+        else:
+            wait_seconds = (target_time - now).total_seconds()
+            log.info(f"\nWaiting until {scan_label} ({wait_seconds:.0f} seconds)...")
+            
+            # Coarse wait until the warm-up window, warm up, then fire precisely
+            warmup_time = target_time - timedelta(seconds=warmup_seconds)
+            if now < warmup_time:
+                if wait_until(self.clock, warmup_time, spin_seconds=0, stop_event=self.stop_event) is None:
+                    log.info("Strategy stopped before the scan")
+                    return False
+            self.warm_up()
+            
+            skew = wait_until(self.clock, target_time, spin_seconds=TRADING_CONFIG.get('SPIN_WAIT_MS', 5) / 1000.0,
+                              stop_event=self.stop_event)
+            if skew is None:
+                log.info("Strategy stopped before the scan")
+                return False
+            self.log_activity(f"⏱️ Scan trigger fired {skew * 1000:+.2f} ms from {scan_label}")
+        
+        # Scan stocks at 9:18:10 (ONLY ONCE)
+        log.info("\n🔍 Starting ENTRY SCAN...")
+        self.scan_stocks_at_918()
+        return True
 
 def main():
     """
@@ -0,0 +1,123 @@
+"""
+Shared Fyers REST client factory with a pre-sized HTTP connection pool
+Every FyersModel built through create_fyers_client() shares one keep-alive
+requests.Session, sized to the scan / pre-fetch thread-pool widths, so
+parallel calls reuse warm sockets instead of doing fresh TCP/TLS handshakes.
+"""
+
+import threading
+import concurrent.futures
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from fyers_apiv3 import fyersModel
+
+from config import HTTP_POOL_CONFIG, TRADING_CONFIG
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default (connect, read) timeout to every request"""
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def pool_size():
+    """Connections kept per host: the widest worker pool plus headroom for the dashboard"""
+    widest = max(TRADING_CONFIG.get('SCAN_WORKERS', 15), TRADING_CONFIG.get('PREFETCH_WORKERS', 10))
+    return widest + HTTP_POOL_CONFIG.get('EXTRA_CONNECTIONS', 4)
+
+
+def build_http_session():
+    """
+    Create a keep-alive session with per-host connection limits and retry policy
+
+    Retries only cover idempotent reads (GET/HEAD) that failed to connect,
+    i.e. requests the server never received. Responses (5xx included) are
+    never re-sent: a retry would be an API call the rate limiter never
+    counted, so a 5xx burst could push past the per-second / per-minute
+    caps. Order POSTs are never retried (a retry could duplicate an order).
+    """
+    retry = Retry(
+        total=HTTP_POOL_CONFIG.get('RETRIES', 2),
+        connect=HTTP_POOL_CONFIG.get('RETRIES', 2),
+        read=0,
+        status=0,
+        other=0,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        backoff_factor=HTTP_POOL_CONFIG.get('BACKOFF_FACTOR', 0.2),
+        raise_on_status=False
+    )
+    adapter = PooledHTTPAdapter(
+        timeout=(HTTP_POOL_CONFIG.get('CONNECT_TIMEOUT', 3.05), HTTP_POOL_CONFIG.get('READ_TIMEOUT', 10)),
+        pool_connections=HTTP_POOL_CONFIG.get('POOL_HOSTS', 4),
+        pool_maxsize=pool_size(),
+        pool_block=HTTP_POOL_CONFIG.get('POOL_BLOCK', False),
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Get the process-wide shared HTTP session (created on first use)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_http_session()
+    return _session
+
+
+def create_fyers_client(client_id, access_token, **kwargs):
+    """
+    Create a FyersModel that uses the shared, pre-sized HTTP session
+
+    Args:
+        client_id: Fyers client ID
+        access_token: Fyers access token
+        **kwargs: Passed through to fyersModel.FyersModel (e.g. log_path)
+    """
+    client = fyersModel.FyersModel(client_id=client_id, token=access_token, **kwargs)
+    if not client.is_async:
+        client.service.session = get_http_session()
+    return client
+
+
+def warm_connections(count=None):
+    """
+    Open `count` keep-alive connections to the Fyers API host
+
+    Uses plain HEAD requests on the API host root, which are not API calls
+    and do not use any rate-limit budget.
+
+    Returns:
+        int: Number of connections that answered
+    """
+    count = count or pool_size()
+    session = get_http_session()
+    url = fyersModel.Config.DATA_API
+
+    def touch(_):
+        try:
+            session.head(url)
+            return 1
+        except Exception:
+            return 0
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=count, thread_name_prefix='warm') as executor:
+        return sum(executor.map(touch, range(count)))
@@ -0,0 +1,761 @@
+"""
+Deterministic Session Replay for the FnO Trading Strategy
+Drop-in fake of fyersModel.FyersModel that serves quotes, history,
+orders and funds from a recorded session file (plus a stand-in for the
+order-update socket), driven by a session clock that can run at 1x or
+100x speed.
+
+Usage:
+    python fyers_replay.py --generate sessions/demo.json        # build a synthetic session
+    python fyers_replay.py sessions/demo.json --speed 100       # replay a full day offline
+"""
+
+import json
+import os
+import sys
+import time
+import random
+import bisect
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from clock import SimulatedClock
+from request_guard import HISTORY_RESOLUTIONS
+
+
+# Fyers order status codes
+ORDER_STATUS_CANCELLED = 1
+ORDER_STATUS_FILLED = 2
+ORDER_STATUS_REJECTED = 5
+ORDER_STATUS_PENDING = 6
+
+
+
+class ReplaySession:
+    """
+    In-memory representation of a recorded trading session.
+
+    Session file format (JSON):
+        {
+            "date": "2026-01-07",
+            "funds": 100000.0,
+            "history": {"NSE:SBIN-EQ": {"D": [[ts, o, h, l, c, v], ...], "3": [...]}},
+            "quotes":  {"NSE:SBIN26JAN800CE": [[ts, {"lp": 12.5, "ls": 750, ...}], ...]}
+        }
+    Timestamps are epoch seconds. Quotes for symbols that only have intraday
+    candles are derived from the latest candle close.
+    """
+
+    def __init__(self, data):
+        self.date = data.get('date')
+        self.path = None  # Set by load()
+        self.funds = float(data.get('funds', 0))
+        self.history = data.get('history', {})
+        self.quotes = {}
+        self._quote_times = {}
+
+        for symbol, timeline in data.get('quotes', {}).items():
+            timeline = sorted(timeline, key=lambda point: point[0])
+            self.quotes[symbol] = timeline
+            self._quote_times[symbol] = [point[0] for point in timeline]
+
+        # Intraday candles sorted by time, per symbol (finest resolution first)
+        self._intraday = {}
+        for symbol, by_resolution in self.history.items():
+            for resolution in ('1', '3', '5'):
+                if resolution in by_resolution:
+                    candles = sorted(by_resolution[resolution], key=lambda c: c[0])
+                    self._intraday[symbol] = (int(resolution), candles, [c[0] for c in candles])
+                    break
+
+    @classmethod
+    def load(cls, path):
+        """Load a session from a JSON file"""
+        with open(path, 'r') as f:
+            session = cls(json.load(f))
+        session.path = path
+        return session
+
+    def start_datetime(self, hhmmss="09:14:00"):
+        """Datetime on the session day at the given wall time"""
+        return datetime.strptime(f"{self.date} {hhmmss}", "%Y-%m-%d %H:%M:%S")
+
+    def has_symbol(self, symbol):
+        return symbol in self.quotes or symbol in self.history
+
+    def quote_at(self, symbol, epoch):
+        """
+        Get the quote values for a symbol as of `epoch`
+
+        Returns:
+            dict: Quote 'v' payload or None if nothing traded yet / unknown symbol
+        """
+        if symbol in self.quotes:
+            idx = bisect.bisect_right(self._quote_times[symbol], epoch) - 1
+            if idx < 0:
+                return None
+            return dict(self.quotes[symbol][idx][1])
+
+        if symbol in self._intraday:
+            minutes, candles, times = self._intraday[symbol]
+            idx = bisect.bisect_right(times, epoch) - 1
+            if idx < 0:
+                return None
+            day_open = candles[0][1]
+            candle = candles[idx]
+            return {
+                'lp': candle[4],
+                'open_price': day_open,
+                'high_price': max(c[2] for c in candles[:idx + 1]),
+                'low_price': min(c[3] for c in candles[:idx + 1]),
+                'volume': sum(c[5] for c in candles[:idx + 1] if len(c) > 5),
+                'ch': round(candle[4] - day_open, 2),
+                'chp': round((candle[4] - day_open) / day_open * 100, 2) if day_open else 0,
+                'pc': round((candle[4] - day_open) / day_open * 100, 2) if day_open else 0,
+            }
+        return None
+
+    def candles(self, symbol, resolution, range_from, range_to, now_epoch):
+        """Candles for a symbol within [range_from, range_to] that have started by now_epoch"""
+        by_resolution = self.history.get(symbol, {})
+        key = 'D' if resolution in ('D', '1D') else resolution
+        candles = by_resolution.get(key, [])
+        return [c for c in candles if range_from <= c[0] <= range_to and c[0] <= now_epoch]
+
+
+class SimulatedFyersModel:
+    """
+    Drop-in replacement for fyersModel.FyersModel backed by a ReplaySession.
+
+    Responses mirror the live API shapes ('s', 'code', 'd', 'candles',
+    'orderBook', 'fund_limit'), including the -50 error for badly formatted
+    history ranges and 'Invalid symbol provided' for unknown symbols, so the
+    strategy exercises the same code paths it does in production.
+    """
+
+    def __init__(self, session, clock, latency_ms=0, client_id="SIM-100"):
+        """
+        Args:
+            session: ReplaySession instance
+            clock: SimulatedClock (or any clock with now()/time()/sleep())
+            latency_ms: Simulated round-trip latency per call, in session milliseconds
+            client_id: Fake client id reported by get_profile
+        """
+        self.session = session
+        self.clock = clock
+        self.latency = latency_ms / 1000.0
+        self.client_id = client_id
+
+        self.lock = threading.Lock()
+        self.orders = []
+        self._order_seq = 0
+        self._order_sockets = []   # Connected ReplayOrderSocket stand-ins
+
+        # Measurements
+        self.call_counts = {}
+        self.call_durations = {}
+        self.order_times = []
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+
+    def _begin(self, endpoint):
+        with self.lock:
+            self.call_counts[endpoint] = self.call_counts.get(endpoint, 0) + 1
+        if self.latency:
+            self.clock.sleep(self.latency)
+        return time.perf_counter()
+
+    def _end(self, endpoint, started):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.call_durations.setdefault(endpoint, []).append(elapsed)
+
+    def get_call_stats(self):
+        """
+        Get API call counts and wall-clock durations per endpoint
+
+        Returns:
+            dict: endpoint -> {'count', 'avg_ms', 'max_ms'}
+        """
+        with self.lock:
+            stats = {}
+            for endpoint, count in self.call_counts.items():
+                durations = self.call_durations.get(endpoint, [])
+                stats[endpoint] = {
+                    'count': count,
+                    'avg_ms': (sum(durations) / len(durations) * 1000) if durations else 0,
+                    'max_ms': (max(durations) * 1000) if durations else 0
+                }
+            return stats
+
+    @staticmethod
+    def _invalid_symbol(symbol):
+        return {"s": "error", "code": -300, "message": f"Invalid symbol provided: {symbol}"}
+
+    # ------------------------------------------------------------------
+    # Market data
+    # ------------------------------------------------------------------
+
+    def get_profile(self):
+        started = self._begin('get_profile')
+        try:
+            return {"s": "ok", "code": 200, "data": {"name": "Replay Session", "fy_id": self.client_id}}
+        finally:
+            self._end('get_profile', started)
+
+    def quotes(self, data=None):
+        started = self._begin('quotes')
+        try:
+            symbols = [s for s in (data or {}).get('symbols', '').split(',') if s]
+            if not symbols:
+                return {"s": "error", "code": -50, "message": "Invalid input"}
+            if len(symbols) > 50:
+                return {"s": "error", "code": -50, "message": "Maximum 50 symbols allowed"}
+
+            now_epoch = self.clock.time()
+            result = []
+            for symbol in symbols:
+                quote = self.session.quote_at(symbol, now_epoch)
+                if quote is None:
+                    result.append({"n": symbol, "s": "error", "v": {"errmsg": "Invalid symbol provided"}})
+                else:
+                    result.append({"n": symbol, "s": "ok", "v": quote})
+
+            if all(item['s'] == 'error' for item in result):
+                return self._invalid_symbol(",".join(symbols))
+            return {"s": "ok", "code": 200, "d": result}
+        finally:
+            self._end('quotes', started)
+
+    def history(self, data=None):
+        started = self._begin('history')
+        try:
+            data = data or {}
+            symbol = data.get('symbol', '')
+            resolution = str(data.get('resolution', ''))
+            if resolution not in HISTORY_RESOLUTIONS:
+                return {"s": "error", "code": -50, "message": "Invalid input",
+                        "data": {"resolution": "invalid resolution"}}
+
+            range_from, range_to = self._parse_range(data)
+            if range_from is None:
+                return {"s": "error", "code": -50, "message": "Invalid input",
+                        "data": {"date_format": "date timestamps (YYYY-MM-DD) needed for range_from and range_to since date_format is 1"}}
+
+            if not self.session.has_symbol(symbol):
+                return self._invalid_symbol(symbol)
+
+            candles = self.session.candles(symbol, resolution, range_from, range_to, self.clock.time())
+            if not candles:
+                return {"s": "no_data", "code": 200, "candles": []}
+            return {"s": "ok", "code": 200, "candles": [list(c) for c in candles]}
+        finally:
+            self._end('history', started)
+
+    @staticmethod
+    def _parse_range(data):
+        """Parse range_from/range_to the way the live API does (epoch or YYYY-MM-DD only)"""
+        date_format = str(data.get('date_format', '0'))
+        try:
+            if date_format == '1':
+                start = datetime.strptime(str(data.get('range_from')), "%Y-%m-%d")
+                end = datetime.strptime(str(data.get('range_to')), "%Y-%m-%d") + timedelta(days=1)
+                return start.timestamp(), end.timestamp() - 1
+            return float(data.get('range_from')), float(data.get('range_to'))
+        except (TypeError, ValueError):
+            return None, None
+
+    # ------------------------------------------------------------------
+    # Orders and funds
+    # ------------------------------------------------------------------
+
+    def place_order(self, data=None):
+        started = self._begin('place_order')
+        try:
+            data = data or {}
+            symbol = data.get('symbol', '')
+            if not self.session.has_symbol(symbol):
+                return self._invalid_symbol(symbol)
+            if int(data.get('qty', 0)) <= 0:
+                return {"s": "error", "code": -50, "message": "Invalid quantity"}
+
+            now = self.clock.now()
+            with self.lock:
+                self._order_seq += 1
+                order_id = f"SIM{now.strftime('%y%m%d')}{self._order_seq:06d}"
+                order = {
+                    'id': order_id,
+                    'symbol': symbol,
+                    'qty': int(data['qty']),
+                    'filledQty': 0,
+                    'side': int(data.get('side', 1)),
+                    'type': int(data.get('type', 1)),
+                    'productType': data.get('productType', 'INTRADAY'),
+                    'limitPrice': float(data.get('limitPrice', 0)),
+                    'tradedPrice': 0,
+                    'status': ORDER_STATUS_PENDING,
+                    'orderTag': data.get('orderTag', ''),
+                    'orderDateTime': now.strftime('%d-%b-%Y %H:%M:%S'),
+                    'message': 'Order submitted'
+                }
+                self.orders.append(order)
+                self.order_times.append(self.clock.time())
+            self._emit(order)
+            self._try_fill(order)
+            return {"s": "ok", "code": 1101, "id": order_id, "message": "Order submitted successfully"}
+        finally:
+            self._end('place_order', started)
+
+    def _try_fill(self, order):
+        """Fill a pending order if the current quote crosses its limit"""
+        if order['status'] != ORDER_STATUS_PENDING:
+            return
+        quote = self.session.quote_at(order['symbol'], self.clock.time())
+        if not quote:
+            return
+        ltp = quote.get('lp')
+        marketable = order['type'] == 2 or \
+            (order['side'] == 1 and ltp <= order['limitPrice']) or \
+            (order['side'] == -1 and ltp >= order['limitPrice'])
+        if not marketable:
+            return
+        with self.lock:
+            if order['status'] != ORDER_STATUS_PENDING:
+                return  # Filled by another thread meanwhile
+            order['status'] = ORDER_STATUS_FILLED
+            order['filledQty'] = order['qty']
+            order['tradedPrice'] = ltp if order['type'] == 2 else order['limitPrice']
+            order['message'] = 'TRADE CONFIRMED'
+        self._emit(order)
+
+    def cancel_order(self, data=None):
+        started = self._begin('cancel_order')
+        try:
+            order_id = (data or {}).get('id')
+            with self.lock:
+                order = next((o for o in self.orders if o['id'] == order_id), None)
+                if order is None:
+                    return {"s": "error", "code": -52, "message": "Order not found"}
+                if order['status'] != ORDER_STATUS_PENDING:
+                    return {"s": "error", "code": -52, "message": "Order is not pending"}
+                order['status'] = ORDER_STATUS_CANCELLED
+                order['message'] = 'Cancelled by user'
+            self._emit(order)
+            return {"s": "ok", "code": 1103, "id": order_id, "message": "Order cancelled"}
+        finally:
+            self._end('cancel_order', started)
+
+    def fill_pending(self):
+        """Fill every pending order the current quotes cross (the stand-in socket calls this)"""
+        with self.lock:
+            pending = [o for o in self.orders if o['status'] == ORDER_STATUS_PENDING]
+        for order in pending:
+            self._try_fill(order)
+
+    def _emit(self, order):
+        """Send an order event to the connected stand-in sockets"""
+        with self.lock:
+            sockets = list(self._order_sockets)
+            event = {"s": "ok", "orders": dict(order)}
+        for socket in sockets:
+            socket.deliver(event)
+
+    def order_socket(self, **callbacks):
+        """Stand-in for fyers_apiv3's FyersOrderSocket fed by this simulator"""
+        return ReplayOrderSocket(self, **callbacks)
+
+    def orderbook(self, data=None):
+        started = self._begin('orderbook')
+        try:
+            with self.lock:
+                orders = list(self.orders)
+            for order in orders:
+                self._try_fill(order)
+            with self.lock:
+                return {"s": "ok", "code": 200, "orderBook": [dict(o) for o in orders]}
+        finally:
+            self._end('orderbook', started)
+
+    def funds(self):
+        started = self._begin('funds')
+        try:
+            return {"s": "ok", "code": 200, "fund_limit": [
+                {"id": 1, "title": "Total Balance", "equityAmount": self.session.funds, "commodityAmount": 0}
+            ]}
+        finally:
+            self._end('funds', started)
+
+
+class ReplayOrderSocket:
+    """
+    Local stand-in for the Fyers order-update socket
+
+    Same interface as fyers_apiv3's FyersOrderSocket (connect, subscribe,
+    close_connection, is_connected and the on_* callbacks). While connected
+    it emits an event for every order the simulator accepts or fills, and
+    fills resting orders as the session quotes cross their limits. Tests
+    can inject events with deliver() and simulate a dropped connection
+    with drop().
+    """
+
+    def __init__(self, model, on_orders=None, on_connect=None, on_close=None, on_error=None,
+                 fill_interval=0.5, **_):
+        """
+        Args:
+            model: SimulatedFyersModel whose orders are streamed
+            on_orders / on_connect / on_close / on_error: FyersOrderSocket callbacks
+            fill_interval: Session seconds between checks of resting orders
+        """
+        self.model = model
+        self.on_orders = on_orders
+        self.on_connect = on_connect
+        self.on_close = on_close
+        self.on_error = on_error
+        self.fill_interval = fill_interval
+        self.subscribed = False
+        self._connected = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def connect(self):
+        with self.model.lock:
+            self.model._order_sockets.append(self)
+        self._connected = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='replay-order-socket', daemon=True)
+        self._thread.start()
+        if self.on_connect:
+            self.on_connect()
+
+    def subscribe(self, data_type="OnOrders"):
+        self.subscribed = "OnOrders" in data_type.split(",")
+
+    def is_connected(self):
+        return self._connected
+
+    def _run(self):
+        speed = getattr(self.model.clock, 'speed', 1.0)
+        while not self._stop.wait(self.fill_interval / speed):
+            try:
+                self.model.fill_pending()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(str(e))
+
+    def deliver(self, event):
+        """Hand an order event ({'s': 'ok', 'orders': {...}}) to the subscriber"""
+        if self._connected and self.subscribed and self.on_orders:
+            self.on_orders(event)
+
+    def _disconnect(self, message):
+        with self.model.lock:
+            if self in self.model._order_sockets:
+                self.model._order_sockets.remove(self)
+        was_connected, self._connected = self._connected, False
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(2)
+        if was_connected and self.on_close:
+            self.on_close(message)
+
+    def drop(self):
+        """Simulate the connection going away (no more events)"""
+        self._disconnect({"code": 1006, "message": "Connection dropped"})
+
+    def close_connection(self):
+        self._disconnect({"code": 1000, "message": "Connection Closed"})
+
+
+class SessionRecorder:
+    """
+    Wraps a live FyersModel and records every quotes/history/funds response
+    so the day can be replayed later with SimulatedFyersModel.
+    """
+
+    def __init__(self, fyers):
+        self.fyers = fyers
+        self.lock = threading.Lock()
+        self.data = {
+            'date': datetime.now().strftime('%Y-%m-%d'),
+            'funds': 0,
+            'history': {},
+            'quotes': {}
+        }
+
+    def __getattr__(self, name):
+        # Anything not recorded is passed straight through
+        return getattr(self.fyers, name)
+
+    def quotes(self, data=None):
+        response = self.fyers.quotes(data)
+        if isinstance(response, dict) and response.get('s') == 'ok':
+            now = time.time()
+            with self.lock:
+                for item in response.get('d', []):
+                    if item.get('s', 'ok') == 'ok':
+                        self.data['quotes'].setdefault(item['n'], []).append([now, item['v']])
+        return response
+
+    def history(self, data=None):
+        response = self.fyers.history(data)
+        if isinstance(response, dict) and response.get('s') == 'ok':
+            resolution = str(data.get('resolution'))
+            resolution = 'D' if resolution in ('D', '1D') else resolution
+            with self.lock:
+                stored = self.data['history'].setdefault(data['symbol'], {}).setdefault(resolution, [])
+                known = {c[0] for c in stored}
+                stored.extend(c for c in response.get('candles', []) if c[0] not in known)
+        return response
+
+    def funds(self):
+        response = self.fyers.funds()
+        if isinstance(response, dict) and response.get('s') == 'ok':
+            total = next((item for item in response.get('fund_limit', []) if item.get('title') == 'Total Balance'), None)
+            if total:
+                self.data['funds'] = total.get('equityAmount', 0)
+        return response
+
+    def save(self, path):
+        """Write the recorded session to a JSON file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            with open(path, 'w') as f:
+                json.dump(self.data, f)
+        print(f"Saved replay session to {path}")
+
+
+def generate_session(stock_list, date=None, seed=7, strike_difference=50, qualify_every=5):
+    """
+    Build a synthetic but realistic session for offline runs and benchmarks.
+
+    Every `qualify_every`-th stock is shaped to pass the CE (or PE) entry
+    conditions on the first 3-minute candle; ATM option quotes are generated
+    for those so the strategy can enter and monitor them.
+
+    Args:
+        stock_list: Stock names (e.g. ['SBIN', 'TCS'])
+        date: Session date 'YYYY-MM-DD' (defaults to the most recent weekday)
+        seed: Random seed, so the same arguments always give the same session
+        strike_difference: Strike step used to derive the ATM option symbols
+        qualify_every: Make every N-th stock a qualifier (0 disables)
+
+    Returns:
+        dict: Session data in ReplaySession format
+    """
+    rng = random.Random(seed)
+
+    if date is None:
+        day = datetime.now()
+        while day.weekday() >= 5:
+            day -= timedelta(days=1)
+        date = day.strftime('%Y-%m-%d')
+    day = datetime.strptime(date, '%Y-%m-%d')
+    expiry = f"{day.strftime('%y')}{day.strftime('%b').upper()}"
+
+    open_dt = day.replace(hour=9, minute=15)
+    close_dt = day.replace(hour=15, minute=30)
+    session = {'date': date, 'funds': 500000.0, 'history': {}, 'quotes': {}}
+
+    for i, stock in enumerate(stock_list):
+        symbol = f"NSE:{stock}-EQ"
+        base = rng.uniform(100, 4000)
+
+        # Previous trading days (daily candles); the last one is "today"
+        daily = []
+        price = base
+        d = day - timedelta(days=6)
+        while d < day:
+            if d.weekday() < 5:
+                o = price
+                h = o * rng.uniform(1.002, 1.02)
+                l = o * rng.uniform(0.98, 0.998)
+                c = rng.uniform(l, h)
+                daily.append([int(d.replace(hour=9, minute=15).timestamp()), round(o, 2), round(h, 2), round(l, 2), round(c, 2), rng.randint(10000, 900000)])
+                price = c
+            d += timedelta(days=1)
+        prev_high, prev_low, prev_close = daily[-1][2], daily[-1][3], daily[-1][4]
+
+        # First 3-minute candle
+        mode = None
+        if qualify_every and i % qualify_every == 0:
+            mode = 'CE' if (i // qualify_every) % 2 == 0 else 'PE'
+        if mode == 'CE':
+            o = round(prev_high * 0.996, 2)
+            first = [o, round(prev_high * 1.012, 2), o, round(prev_high * 1.008, 2)]
+        elif mode == 'PE':
+            o = round(prev_low * 1.004, 2)
+            first = [o, o, round(prev_low * 0.988, 2), round(prev_low * 0.992, 2)]
+        else:
+            o = round(prev_close * rng.uniform(0.995, 1.005), 2)
+            first = [o, round(o * 1.004, 2), round(o * 0.996, 2), round(o * rng.uniform(0.997, 1.003), 2)]
+
+        intraday = []
+        t = open_dt
+        last = first[3]
+        while t < close_dt:
+            if t == open_dt:
+                o, h, l, c = first
+            else:
+                o = last
+                c = round(o * rng.uniform(0.997, 1.003), 2)
+                h = round(max(o, c) * rng.uniform(1.0, 1.002), 2)
+                l = round(min(o, c) * rng.uniform(0.998, 1.0), 2)
+            intraday.append([int(t.timestamp()), o, h, l, c, rng.randint(1000, 50000)])
+            last = c
+            t += timedelta(minutes=3)
+
+        today_daily = [daily[-1][0] + 86400, intraday[0][1], max(c[2] for c in intraday),
+                       min(c[3] for c in intraday), intraday[-1][4], sum(c[5] for c in intraday)]
+        session['history'][symbol] = {'D': daily + [today_daily], '3': intraday}
+
+        if mode:
+            strike = int(round(first[3] / strike_difference) * strike_difference)
+            option_symbol = f"NSE:{stock}{expiry}{strike}{mode}"
+            lot_size = rng.choice([250, 500, 750, 1000, 1500])
+            premium = max(first[3] * 0.02, 1.0)
+            timeline = []
+            t = open_dt
+            while t <= close_dt:
+                premium = max(0.05, premium * rng.uniform(0.985, 1.017))
+                lp = round(premium, 2)
+                timeline.append([int(t.timestamp()), {
+                    'lp': lp, 'ls': lot_size, 'bid': round(lp - 0.05, 2), 'ask': round(lp + 0.05, 2),
+                    'volume': rng.randint(1000, 200000), 'ch': 0, 'chp': 0
+                }])
+                t += timedelta(seconds=30)
+            session['quotes'][option_symbol] = timeline
+
+    # Index quotes for the dashboard
+    for index_symbol, level in (('NSE:NIFTY50-INDEX', 22000.0), ('NSE:NIFTYBANK-INDEX', 48000.0)):
+        timeline = []
+        t = open_dt
+        lp = level
+        while t <= close_dt:
+            lp = round(lp * rng.uniform(0.9995, 1.0005), 2)
+            timeline.append([int(t.timestamp()), {'lp': lp, 'pc': round((lp - level) / level * 100, 2)}])
+            t += timedelta(minutes=1)
+        session['quotes'][index_symbol] = timeline
+
+    return session
+
+
+def create_replay_client(session_file, speed=1.0, start_time="09:14:00", latency_ms=0):
+    """
+    Build a (SimulatedFyersModel, SimulatedClock) pair for a session file
+
+    Args:
+        session_file: Path to the recorded session JSON
+        speed: Clock speed multiplier
+        start_time: Session wall time the clock starts at (HH:MM:SS)
+        latency_ms: Simulated per-call latency in session milliseconds
+    """
+    session = ReplaySession.load(session_file)
+    clock = SimulatedClock(session.start_datetime(start_time), speed=speed)
+    return SimulatedFyersModel(session, clock, latency_ms=latency_ms), clock
+
+
+def run_replay(session_file, speed=100.0, stock_list=None, start_time="09:14:00",
+               square_off_time="15:15:00", latency_ms=0):
+    """
+    Run the strategy through a full recorded day offline and print
+    API usage and order latency measurements.
+
+    Returns:
+        dict: Replay report
+    """
+    from fno_trading_strategy import FnOTradingStrategy
+    from rate_limiter import FyersRateLimiter
+
+    fyers, clock = create_replay_client(session_file, speed, start_time, latency_ms)
+    # Keep replayed trades out of the live journal (REPLAY_CONFIG["JOURNAL_PATH"] opts in)
+    from config import REPLAY_CONFIG
+    journal = False
+    if REPLAY_CONFIG.get("JOURNAL_PATH"):
+        from journal import get_journal
+        journal = get_journal(REPLAY_CONFIG["JOURNAL_PATH"])
+    if stock_list is None:
+        stock_list = [s.split(':')[1].rsplit('-EQ', 1)[0] for s in fyers.session.history if s.endswith('-EQ')]
+
+    strategy = FnOTradingStrategy(
+        client_id=fyers.client_id,
+        access_token="replay",
+        stock_list=stock_list,
+        rate_limiter=FyersRateLimiter(clock=clock),
+        fyers_client=fyers,
+        clock=clock,
+        journal=journal
+    )
+    # Orders go to the simulator, never to the broker
+    strategy.virtual_trading = False
+    strategy.pre_fetch_prev_day_data()
+
+    worker = threading.Thread(target=strategy.run, daemon=True)
+    worker.start()
+
+    square_off = fyers.session.start_datetime(square_off_time)
+    while clock.now() < square_off:
+        clock.sleep(5)
+    strategy.exit_all_positions()
+    strategy.stop()
+
+    scan_dt = fyers.session.start_datetime("09:18:10").timestamp()
+    entry_offsets = [t - scan_dt for t, order in zip(fyers.order_times, fyers.orders)
+                     if order['orderTag'].startswith('AutoEntry')]
+    report = {
+        'session': session_file,
+        'speed': speed,
+        'stocks': len(stock_list),
+        'positions': len(strategy.qualified_stocks),
+        'orders': len(fyers.orders),
+        'api_calls': fyers.get_call_stats(),
+        'fills': strategy.fills.get_stats(),
+        'first_order_after_trigger_s': min(entry_offsets) if entry_offsets else None,
+        'last_order_after_trigger_s': max(entry_offsets) if entry_offsets else None
+    }
+
+    print(f"\n{'='*60}")
+    print("REPLAY SUMMARY")
+    print(f"{'='*60}")
+    print(f"Stocks: {report['stocks']} | Positions: {report['positions']} | Orders: {report['orders']}")
+    for endpoint, stats in sorted(report['api_calls'].items()):
+        print(f"  {endpoint:12s} calls={stats['count']:5d}  avg={stats['avg_ms']:.2f}ms  max={stats['max_ms']:.2f}ms")
+    if report['first_order_after_trigger_s'] is not None:
+        print(f"First entry order: {report['first_order_after_trigger_s']:.2f}s after 9:18:10 (session time)")
+        print(f"Last entry order:  {report['last_order_after_trigger_s']:.2f}s after 9:18:10 (session time)")
+    for kind in ('entry', 'exit'):
+        latency = report['fills'].get(f'{kind}_signal_to_fill_ms')
+        if latency:
+            print(f"{kind.capitalize()} signal -> fill: p50 {latency['p50']:.0f}ms  p95 {latency['p95']:.0f}ms "
+                  f"({latency['count']} filled, session time)")
+    print(f"{'='*60}\n")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a recorded trading session offline")
+    parser.add_argument("session", help="Session JSON file")
+    parser.add_argument("--speed", type=float, default=100.0, help="Clock speed multiplier (default 100)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated per-call latency")
+    parser.add_argument("--generate", action="store_true", help="Generate a synthetic session instead of replaying")
+    parser.add_argument("--date", help="Session date for --generate (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if args.generate:
+        from config import STOCK_LIST
+        data = generate_session(STOCK_LIST, date=args.date)
+        directory = os.path.dirname(args.session)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.session, 'w') as f:
+            json.dump(data, f)
+        print(f"Generated session for {len(STOCK_LIST)} stocks on {data['date']}: {args.session}")
+    else:
+        run_replay(args.session, speed=args.speed, latency_ms=args.latency_ms)
@@ -0,0 +1,497 @@
+"""
+Vectorized Black-Scholes Implied Volatility and Greeks
+NumPy over whole arrays of contracts, so every open position (straight from
+the PositionBook columns) or a whole option-chain snapshot is priced in a
+handful of array operations per price tick.
+
+- implied_vol(): Halley iterations from a Corrado-Miller start, bisection
+  when a step leaves the bracket; all contracts are solved together and
+  each iteration only touches the ones not yet converged
+- greeks(): delta, gamma, theta (per calendar day) and vega (per 1 vol point)
+- GreeksEngine: per-position and portfolio Greeks for the strategy, plus
+  the RISK_CONFIG Greek limits used for alerts and to hold back entries
+
+The normal CDF is the Abramowitz & Stegun 26.2.17 polynomial (|error| <
+7.5e-8) so no SciPy is needed; bench_greeks.py checks it against a scalar
+math.erf reference.
+"""
+
+import re
+import math
+import threading
+from datetime import datetime, date, timedelta
+
+import numpy as np
+
+from log_pipeline import get_logger
+from position_book import STATUSES
+
+log = get_logger('greeks')
+
+SQRT_2PI = math.sqrt(2 * math.pi)
+YEAR_DAYS = 365.0
+MIN_VOL, MAX_VOL = 1e-4, 5.0
+# Status code -> position holds a quantity / holds or may still get one / its entry order is still open
+OPEN_STATUS = np.isin(STATUSES, ('RUNNING', 'PARTIAL'))
+LIVE_STATUS = np.isin(STATUSES, ('RUNNING', 'PARTIAL', 'PENDING'))
+FILLING_STATUS = np.isin(STATUSES, ('PARTIAL', 'PENDING'))
+POSITION_FIELDS = ('iv', 'delta', 'gamma', 'theta', 'vega', 'spot')
+
+# Abramowitz & Stegun 26.2.17
+_P = 0.2316419
+_B = (0.319381530, -0.356563782, 1.781477937, -1.821255978, 1.330274429)
+
+MONTHS = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC')
+# NSE:SBIN25OCT800CE (monthly contracts; the underlying may contain digits)
+MONTHLY_SYMBOL = re.compile(r'^[A-Z]+:(?P<underlying>.+?)(?P<year>\d{2})(?P<month>' + '|'.join(MONTHS) +
+                            r')(?P<strike>\d+(?:\.\d+)?)(?P<side>CE|PE)$')
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def norm_cdf(x):
+    """Standard normal CDF (A&S 26.2.17, vectorized)"""
+    x = np.asarray(x, dtype=float)
+    ax = np.abs(x)
+    t = 1.0 / (1.0 + _P * ax)
+    poly = t * (_B[0] + t * (_B[1] + t * (_B[2] + t * (_B[3] + t * _B[4]))))
+    upper = 1.0 - norm_pdf(ax) * poly
+    return np.where(x >= 0, upper, 1.0 - upper)
+
+
+def _d1_d2(S, K, T, r, sigma, q):
+    vol_t = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r - q + 0.5 * sigma * sigma) * T) / vol_t
+    return d1, d1 - vol_t
+
+
+def bs_price(S, K, T, r, sigma, is_call, q=0.0):
+    """Black-Scholes premium (arrays broadcast; is_call is a bool array)"""
+    d1, d2 = _d1_d2(S, K, T, r, sigma, q)
+    disc_s = S * np.exp(-q * T)
+    disc_k = K * np.exp(-r * T)
+    call = disc_s * norm_cdf(d1) - disc_k * norm_cdf(d2)
+    put = disc_k * norm_cdf(-d2) - disc_s * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def implied_vol(price, S, K, T, r, is_call, q=0.0, tol=1e-6, vol_tol=1e-6, max_iter=20, guess=None):
+    """
+    Implied volatility of every contract
+
+    Args:
+        price: Option premiums
+        S, K, T: Spot, strike, years to expiry
+        r, q: Risk-free rate and dividend yield (annual, continuous)
+        is_call: True for CE, False for PE
+        tol: Premium tolerance (rupees)
+        vol_tol: Stop once the next Newton step would move IV less than this
+        guess: Optional starting IVs (e.g. the last tick's); NaN = Corrado-Miller start
+
+    Returns:
+        np.ndarray: Annualized IV (NaN where the premium is outside the
+        no-arbitrage bounds or the inputs are invalid)
+    """
+    price, S, K, T, is_call = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, S, K, T, is_call)))
+    is_call = is_call.astype(bool)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        disc_s = S * np.exp(-q * T)
+        disc_k = K * np.exp(-r * T)
+        # Puts are solved as the call with the same IV (put-call parity)
+        call_price = np.where(is_call, price, price + disc_s - disc_k)
+        valid = (T > 0) & (S > 0) & (K > 0) & (call_price > np.maximum(disc_s - disc_k, 0.0)) \
+            & (call_price < disc_s) & (price > 0)
+
+        # Corrado-Miller starting point: a few Newton steps from here for near-the-money strikes
+        sqrt_t = np.sqrt(np.where(T > 0, T, 1.0))
+        half_gap = 0.5 * (disc_s - disc_k)
+        excess = call_price - half_gap
+        root = np.sqrt(np.maximum(excess * excess - 4 * half_gap * half_gap / np.pi, 0.0))
+        sigma = np.sqrt(2 * np.pi) / (sqrt_t * (disc_s + disc_k)) * (excess + root)
+        sigma = np.clip(np.where(sigma == sigma, sigma, 0.3), 0.01, 3.0)
+        if guess is not None:
+            guess = np.asarray(guess, dtype=float)
+            sigma = np.where((guess > MIN_VOL) & (guess < MAX_VOL), guess, sigma)
+
+        # Newton with a bisection bracket, on the still-unsolved contracts only
+        sigma = np.where(valid, sigma, np.nan)
+        idx = np.flatnonzero(valid)
+        ds, dk, target, st = disc_s[idx], disc_k[idx], call_price[idx], sqrt_t[idx]
+        log_fwd = np.log(ds / dk)
+        sig = sigma[idx]
+        lo = np.full(idx.size, MIN_VOL)
+        hi = np.full(idx.size, MAX_VOL)
+        for _ in range(max_iter):
+            vol_t = sig * st
+            d1 = log_fwd / vol_t + 0.5 * vol_t
+            cdf = norm_cdf(np.concatenate((d1, d1 - vol_t)))
+            diff = ds * cdf[:idx.size] - dk * cdf[idx.size:] - target
+            vega = ds * norm_pdf(d1) * st
+            open_ = (np.abs(diff) > tol) & (np.abs(diff) > vol_tol * vega)
+            sigma[idx] = sig
+            if not open_.all():
+                idx, ds, dk, target, st, log_fwd, sig, lo, hi, diff, vega, d1 = (
+                    a[open_] for a in (idx, ds, dk, target, st, log_fwd, sig, lo, hi, diff, vega, d1))
+                if not idx.size:
+                    break
+            lo = np.where(diff < 0, sig, lo)
+            hi = np.where(diff > 0, sig, hi)
+            # Halley step (vomma = vega * d1 * d2 / sigma): cubic convergence
+            newton = diff / vega
+            step = sig - newton / (1.0 - 0.5 * newton * d1 * (d1 - sig * st) / sig)
+            sig = np.where((step > lo) & (step < hi), step, 0.5 * (lo + hi))
+        sigma[idx] = sig
+    return np.where(valid, sigma, np.nan)
+
+
+def greeks(S, K, T, r, sigma, is_call, q=0.0):
+    """
+    Per-contract Greeks (one unit of the underlying)
+
+    Returns:
+        dict: 'delta', 'gamma', 'theta' (per calendar day), 'vega' (per 1 vol point)
+    """
+    S, K, T, sigma = (np.asarray(a, dtype=float) for a in (S, K, T, sigma))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        d1, d2 = _d1_d2(S, K, T, r, sigma, q)
+        sqrt_t = np.sqrt(T)
+        disc_q = np.exp(-q * T)
+        disc_r = np.exp(-r * T)
+        pdf = norm_pdf(d1)
+        cdf_d1, cdf_d2 = norm_cdf(d1), norm_cdf(d2)
+        delta = np.where(is_call, disc_q * cdf_d1, disc_q * (cdf_d1 - 1.0))
+        gamma = disc_q * pdf / (S * sigma * sqrt_t)
+        decay = -S * disc_q * pdf * sigma / (2 * sqrt_t)
+        call_theta = decay - r * K * disc_r * cdf_d2 + q * S * disc_q * cdf_d1
+        put_theta = decay + r * K * disc_r * (1.0 - cdf_d2) - q * S * disc_q * (1.0 - cdf_d1)
+        theta = np.where(is_call, call_theta, put_theta) / YEAR_DAYS
+        vega = S * disc_q * pdf * sqrt_t / 100.0
+    return {'delta': delta, 'gamma': gamma, 'theta': theta, 'vega': vega}
+
+
+def monthly_expiry(year, month, weekday=1):
+    """Last `weekday` (0 = Monday) of a month: NSE stock option expiry"""
+    last = date(year + 1, 1, 1) - timedelta(days=1) if month == 12 else date(year, month + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def expiry_from_symbol(symbol, weekday=1):
+    """Expiry date of a monthly option symbol, or None if it does not parse"""
+    match = MONTHLY_SYMBOL.match(symbol or '')
+    if not match:
+        return None
+    return monthly_expiry(2000 + int(match['year']), MONTHS.index(match['month']) + 1, weekday)
+
+
+class GreeksEngine:
+    """
+    IV and Greeks of the strategy's open positions, recomputed per price tick
+
+    Positions are read straight from the PositionBook columns (option price,
+    strike, side, lot size); the underlying's price comes from the same quote
+    batch (spot_symbols() are added to it) and falls back to the spot at entry.
+    """
+
+    def __init__(self, strategy):
+        from config import GREEKS_CONFIG, RISK_CONFIG
+        self.strategy = strategy
+        self.book = strategy.qualified_stocks
+        self.clock = strategy.clock
+        self.rate = GREEKS_CONFIG.get('RISK_FREE_RATE', 0.065)
+        self.dividend_yield = GREEKS_CONFIG.get('DIVIDEND_YIELD', 0.0)
+        self.expiry_weekday = GREEKS_CONFIG.get('EXPIRY_WEEKDAY', 1)
+        expiry_time = GREEKS_CONFIG.get('EXPIRY_TIME', '15:30')
+        self.expiry_time = datetime.strptime(expiry_time, '%H:%M').time()
+        self.limits = {key: RISK_CONFIG.get(key) for key in
+                       ('MAX_NET_DELTA_VALUE', 'MAX_NET_VEGA', 'MAX_THETA_PER_DAY')}
+        self.lock = threading.Lock()
+        self._symbols = []     # Spot and option symbols of the book (price slots)
+        self._prices = np.full(1, np.nan)  # Last price per slot (+ an always-NaN slot for missing symbols)
+        self._layout_cache = None
+        self._expiries = {}    # option symbol -> expiry datetime
+        self._terms_cache = {}  # option symbol -> (strike, expiry timestamp)
+        self._breached = set()
+        self._rows = None
+        self.latest = self._empty()
+        # Held positions plus entry orders still open at their order size (what allows() checks)
+        self.committed = self.latest['portfolio']
+
+    @staticmethod
+    def _empty():
+        return {'portfolio': {'delta': 0.0, 'delta_value': 0.0, 'gamma': 0.0, 'theta': 0.0, 'vega': 0.0, 'count': 0}}
+
+    def spot_symbols(self):
+        """Underlyings of the open positions (quote them with the options)"""
+        return list(dict.fromkeys(symbol for symbol in self.book.objects['spot_symbol'][:len(self.book)]
+                                  if isinstance(symbol, str)))
+
+    def expiry(self, option_symbol, underlying=None):
+        """Expiry datetime of a contract (symbol master first, then the symbol's month)"""
+        expiry = self._expiries.get(option_symbol)
+        if expiry is None:
+            day = None
+            chain = getattr(self.strategy, 'option_chain', None)
+            if chain is not None and underlying:
+                day = chain.expiry(underlying, option_symbol)
+            day = day or expiry_from_symbol(option_symbol, self.expiry_weekday)
+            if day is None:
+                return None
+            expiry = self._expiries[option_symbol] = datetime.combine(day, self.expiry_time)
+        return expiry
+
+    def years_to_expiry(self, option_symbol, underlying=None, now=None):
+        expiry = self.expiry(option_symbol, underlying)
+        if expiry is None:
+            return np.nan
+        now = now or self.clock.now()
+        return max((expiry - now).total_seconds(), 0.0) / (YEAR_DAYS * 86400)
+
+    def _terms(self, option_symbol, underlying, strike):
+        """(strike, expiry timestamp) of a held contract, cached per symbol (NaN when unknown)"""
+        terms = self._terms_cache.get(option_symbol)
+        if terms is None:
+            expiry = self.expiry(option_symbol, underlying)
+            terms = self._terms_cache[option_symbol] = (
+                _as_float(strike), expiry.timestamp() if expiry is not None else np.nan)
+        return terms
+
+    def contract(self, spot, strike, option_symbol, price, side, underlying=None):
+        """
+        IV and Greeks of one contract (e.g. an entry candidate)
+
+        Returns:
+            dict: iv, delta, gamma, theta, vega (per unit)
+        """
+        T = self.years_to_expiry(option_symbol, underlying)
+        is_call = np.array([side == 'CE'])
+        iv = implied_vol([price], [spot], [float(strike)], [T], self.rate, is_call, self.dividend_yield)
+        g = greeks([spot], [float(strike)], [T], self.rate, iv, is_call, self.dividend_yield)
+        result = {'iv': float(iv[0])}
+        result.update({key: float(values[0]) for key, values in g.items()})
+        return result
+
+    def chain(self, underlying, spot):
+        """
+        IV and Greeks over an option-chain snapshot (OptionChainService cache)
+
+        Returns:
+            list: [{'symbol', 'strike', 'side', 'price', 'iv', 'delta', 'gamma', 'theta', 'vega'}, ...]
+        """
+        chain = getattr(self.strategy, 'option_chain', None)
+        contracts = chain.quoted(underlying) if chain is not None else []
+        if not contracts:
+            return []
+        strikes, sides, symbols, quotes = zip(*contracts)
+        now = self.clock.now()
+        K = np.array(strikes, dtype=float)
+        T = np.array([self.years_to_expiry(symbol, underlying, now) for symbol in symbols])
+        price = np.array([quote['lp'] for quote in quotes], dtype=float)
+        is_call = np.array([side == 'CE' for side in sides])
+        iv = implied_vol(price, spot, K, T, self.rate, is_call, self.dividend_yield)
+        g = greeks(spot, K, T, self.rate, iv, is_call, self.dividend_yield)
+        return [{'symbol': symbols[i], 'strike': strikes[i], 'side': sides[i], 'price': float(price[i]),
+                 'iv': _round(iv[i] * 100, 2), 'delta': _round(g['delta'][i], 4), 'gamma': _round(g['gamma'][i], 6),
+                 'theta': _round(g['theta'][i], 4), 'vega': _round(g['vega'][i], 4)}
+                for i in range(len(symbols))]
+
+    def _layout(self, book, n):
+        """
+        Per-row contract arrays of the book, rebuilt only when its rows or
+        contracts change (PositionBook.version): strike, expiry, side, the
+        slots of the row's spot / option symbol in the price array and the
+        last solved IV
+        """
+        layout = self._layout_cache
+        version = book.version
+        if layout is not None and layout['version'] == version and layout['n'] == n:
+            return layout
+        stocks = book.stocks()[:n]
+        spot_symbols = book.objects['spot_symbol'][:n]
+        option_symbols = book.option_symbols()[:n]
+        symbols = list(dict.fromkeys(symbol for symbol in spot_symbols + option_symbols if isinstance(symbol, str)))
+        slots = {symbol: i for i, symbol in enumerate(symbols)}
+        missing = len(symbols)   # Last slot: never quoted (NaN)
+        terms = np.array([self._terms(symbol, stock, strike) for symbol, stock, strike
+                          in zip(option_symbols, stocks, book.objects['strike'][:n])]).reshape(n, 2)
+
+        # Carry the last prices (and IVs, the next solve's starting point) over to the new rows
+        last = dict(zip(self._symbols, self._prices.tolist()))
+        self._symbols = symbols
+        self._prices = np.array([last.get(symbol, np.nan) for symbol in symbols] + [np.nan])
+        last = dict(zip(layout['stocks'], layout['iv'].tolist())) if layout is not None else {}
+
+        layout = self._layout_cache = {
+            'version': version, 'n': n, 'stocks': stocks, 'symbols': symbols,
+            'spot_slot': np.array([slots.get(symbol, missing) for symbol in spot_symbols], dtype=np.intp),
+            'option_slot': np.array([slots.get(symbol, missing) for symbol in option_symbols], dtype=np.intp),
+            'strike': terms[:, 0], 'expiry': terms[:, 1], 'is_call': book.side[:n] == 0,
+            'iv': np.array([last.get(stock, np.nan) for stock in stocks]),
+            'order_qty': np.array([book.get(stock, {}).get('order_qty', 0) for stock in stocks], dtype=float)
+        }
+        return layout
+
+    def _store_quotes(self, quotes, symbols):
+        """Latest 'lp' of every symbol in a quote batch (symbols without one keep their last price)"""
+        fresh = np.array([quote.get('lp') if isinstance(quote, dict) else None
+                          for quote in map(quotes.get, symbols)], dtype=float)
+        prices = self._prices[:-1]
+        np.copyto(prices, fresh, where=fresh > 0)
+
+    def update(self, quotes=None):
+        """
+        Recompute IV and Greeks over every open position, plus the
+        committed totals that also count unfilled entry orders (allows())
+
+        Args:
+            quotes: Latest quote batch (option and spot prices are taken from it)
+
+        Returns:
+            dict: {'portfolio': {'delta', 'delta_value', 'gamma', 'theta', 'vega', 'count'}}
+        """
+        book = self.book
+        with self.lock:
+            n = len(book.stocks())
+            if n == 0:
+                self._rows = None
+                self.latest = self._empty()
+                self.committed = self.latest['portfolio']
+                return self.latest
+            layout = self._layout(book, n)
+            if quotes:
+                self._store_quotes(quotes, layout['symbols'])
+
+            rows = np.flatnonzero(LIVE_STATUS[book.status[:n]])
+            status = book.status[rows]
+            prices = self._prices
+            S = prices[layout['spot_slot'][rows]]
+            S = np.where(S == S, S, book.floats['spot_price'][rows])
+            # Open positions at their last quote, else the entry price
+            price = prices[layout['option_slot'][rows]]
+            price = np.where(price == price, price, book.floats['entry_price'][rows])
+            K = layout['strike'][rows]
+            T = np.maximum(layout['expiry'][rows] - self.clock.time(), 0.0) / (YEAR_DAYS * 86400)
+            is_call = layout['is_call'][rows]
+            lots = book.lot_size[rows].astype(float)
+
+            iv = implied_vol(price, S, K, T, self.rate, is_call, self.dividend_yield, guess=layout['iv'][rows])
+            layout['iv'][rows] = iv
+            g = greeks(S, K, T, self.rate, iv, is_call, self.dividend_yield)
+
+            solved = iv == iv
+            open_rows = OPEN_STATUS[status]
+            # An open entry order can still fill up to its order size
+            ordered = np.where(FILLING_STATUS[status], np.maximum(lots, layout['order_qty'][rows]), lots)
+            portfolio = _totals(g, S, np.where(solved & open_rows, lots, 0.0))
+            self.committed = _totals(g, S, np.where(solved, ordered, 0.0))
+            # Per-position rows are only built when the dashboard asks (positions())
+            self._rows = ([layout['stocks'][i] for i in rows[open_rows].tolist()], iv[open_rows],
+                          {key: values[open_rows] for key, values in g.items()}, lots[open_rows], S[open_rows])
+            self.latest = {'portfolio': portfolio}
+        return self.latest
+
+    def positions(self):
+        """
+        Per-position IV and Greeks from the last update()
+
+        Returns:
+            dict: stock -> {'iv', 'delta', 'gamma', 'theta', 'vega', 'spot'}
+            (theta and vega for the whole position; None when IV is unsolved)
+        """
+        with self.lock:
+            if self._rows is None:
+                return {}
+            stocks, iv, g, lots, S = self._rows
+            rows = np.column_stack((np.round(iv * 100, 2), np.round(g['delta'], 4), np.round(g['gamma'], 6),
+                                    np.round(g['theta'] * lots, 2), np.round(g['vega'] * lots, 2), np.round(S, 2)))
+            positions = {}
+            for stock, row in zip(stocks, rows.tolist()):
+                if row[0] != row[0]:
+                    row = [None] * 5 + [row[5]]
+                positions[stock] = dict(zip(POSITION_FIELDS, row))
+            return positions
+
+    def breaches(self, portfolio=None):
+        """
+        RISK_CONFIG Greek limits the portfolio is over
+
+        Returns:
+            list: Human-readable breach descriptions (empty = within limits)
+        """
+        portfolio = portfolio or self.latest['portfolio']
+        breaches = []
+        limit = self.limits.get('MAX_NET_DELTA_VALUE')
+        if limit is not None and abs(portfolio['delta_value']) > limit:
+            breaches.append(f"net delta ₹{portfolio['delta_value']:,.0f} beyond ±₹{limit:,.0f}")
+        limit = self.limits.get('MAX_NET_VEGA')
+        if limit is not None and abs(portfolio['vega']) > limit:
+            breaches.append(f"vega ₹{portfolio['vega']:,.0f}/vol pt beyond ±₹{limit:,.0f}")
+        limit = self.limits.get('MAX_THETA_PER_DAY')
+        if limit is not None and portfolio['theta'] < -abs(limit):
+            breaches.append(f"theta ₹{portfolio['theta']:,.0f}/day beyond -₹{abs(limit):,.0f}")
+        return breaches
+
+    def check_limits(self):
+        """Log newly breached limits once (edge-triggered); returns the current breaches"""
+        breaches = self.breaches()
+        current = {b.split(' ')[0] for b in breaches}
+        for breach in breaches:
+            if breach.split(' ')[0] not in self._breached:
+                log.warning(f"⚠️ Greek limit: {breach}")
+                self.strategy.log_activity(f"⚠️ Risk: {breach}")
+        self._breached = current
+        return breaches
+
+    def allows(self, candidate, lot_size, spot):
+        """
+        Whether adding a contract keeps the portfolio inside the Greek limits
+        (entries still waiting for a fill count at their order size)
+
+        Args:
+            candidate: contract() result
+            lot_size: Quantity
+            spot: Underlying price
+        """
+        if candidate['iv'] != candidate['iv']:
+            return True   # No IV (bad quote): the price checks decide
+        projected = dict(self.committed)
+        projected['delta'] += candidate['delta'] * lot_size
+        projected['delta_value'] += candidate['delta'] * lot_size * spot
+        projected['gamma'] += candidate['gamma'] * lot_size
+        projected['theta'] += candidate['theta'] * lot_size
+        projected['vega'] += candidate['vega'] * lot_size
+        return not self.breaches(projected)
+
+    def dashboard_fields(self):
+        """Greeks section of the dashboard state"""
+        portfolio = self.latest['portfolio']
+        return {
+            'greeks': {key: round(value, 2) if isinstance(value, float) else value for key, value in portfolio.items()},
+            'position_greeks': self.positions()
+        }
+
+
+def _totals(g, S, weights):
+    """Portfolio Greeks for per-row quantities (rows with a zero quantity are left out)"""
+    position_delta = g['delta'] * weights
+    return {
+        'delta': float(np.nansum(position_delta)),
+        'delta_value': float(np.nansum(position_delta * S)),
+        'gamma': float(np.nansum(g['gamma'] * weights)),
+        'theta': float(np.nansum(g['theta'] * weights)),
+        'vega': float(np.nansum(g['vega'] * weights)),
+        'count': int(np.count_nonzero(weights))
+    }
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _round(value, digits):
+    value = float(value)
+    return round(value, digits) if value == value else None
@@ -0,0 +1,258 @@
+"""
+Crash-Safe Trade Journal (SQLite, WAL mode)
+Append-only record of the day's scan, entries, orders and exits, so a
+restarted app.py (e.g. after Termux kills it mid-session) rebuilds
+qualified_stocks instead of re-scanning.
+
+Writes never touch the disk on the calling thread: record() queues the
+event and a single 'journal-writer' thread commits whatever has queued up
+in one transaction. WAL with synchronous=NORMAL survives the process being
+killed; at most the last few milliseconds of a power loss can be lost.
+
+Event kinds:
+    scan   - the 9:18 scan finished (scan summary)
+    entry  - a position was opened (the qualified_stocks record)
+    order  - an order was sent (payload + broker response)
+    exit   - a position was closed (exit price / time)
+    fill   - an order update changed a position (status / fill qty / avg price)
+"""
+
+import os
+import json
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+from log_pipeline import get_logger
+
+log = get_logger('journal')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    day TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    stock TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_day ON events (day, id);
+"""
+
+# Position fields stored as ISO strings
+DATETIME_FIELDS = ('entry_time', 'exit_time')
+
+
+def _encode(data):
+    return json.dumps(data, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
+
+class TradeJournal:
+    """
+    Append-only trade journal with a background writer
+
+    Usage:
+        journal = TradeJournal('journal/trading_journal.db')
+        journal.record('entry', 'SBIN', position, day=now.date())
+        state = journal.load_day(now.date())
+    """
+
+    def __init__(self, path, synchronous='NORMAL', batch_size=500):
+        """
+        Args:
+            path: SQLite database file
+            synchronous: SQLite synchronous pragma (NORMAL is crash-safe in WAL mode)
+            batch_size: Max events committed per transaction
+        """
+        self.path = path
+        self.synchronous = synchronous
+        self.batch_size = batch_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self.written = 0
+        self.errors = 0
+        self._writer = threading.Thread(target=self._write_loop, name='journal-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        return conn
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def record(self, kind, stock, data, day, ts=None):
+        """
+        Queue an event (returns immediately)
+
+        Args:
+            kind: 'scan' / 'entry' / 'order' / 'exit' / 'fill'
+            stock: Underlying (None for scan events)
+            data: JSON-serializable dict (datetimes are stored as ISO strings)
+            day: Trading day (date) the event belongs to
+            ts: Event time (defaults to now)
+        """
+        if self._closed:
+            return
+        ts = ts or datetime.now()
+        self._queue.put((day.isoformat(), ts.isoformat(), kind, stock, _encode(data)))
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                batch, waiters, stop = [], [], False
+                while True:
+                    if item is None:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+                    if stop or len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if batch:
+                    try:
+                        with conn:
+                            conn.executemany(
+                                'INSERT INTO events (day, ts, kind, stock, data) VALUES (?, ?, ?, ?, ?)', batch)
+                        self.written += len(batch)
+                    except sqlite3.Error as e:
+                        self.errors += 1
+                        log.error(f"⚠️ Journal write failed ({len(batch)} events): {e}")
+                for waiter in waiters:
+                    waiter.set()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def flush(self, timeout=5):
+        """
+        Wait until everything queued so far is committed
+
+        Returns:
+            bool: True if flushed within the timeout
+        """
+        if self._closed or not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=5):
+        """Commit pending events and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def events(self, day):
+        """All events of a day in write order: [(kind, stock, ts, data), ...]"""
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT kind, stock, ts, data FROM events WHERE day = ? ORDER BY id',
+                                (day.isoformat(),)).fetchall()
+        finally:
+            conn.close()
+        return [(kind, stock, ts, json.loads(data)) for kind, stock, ts, data in rows]
+
+    def load_day(self, day):
+        """
+        Rebuild the day's state by replaying its events
+
+        Args:
+            day: Trading day (date)
+
+        Returns:
+            dict: {
+                'scanned': bool,             # the 9:18 scan already ran
+                'positions': {stock: record},  # qualified_stocks with datetimes restored
+                'orders': {stock: [order events]},
+                'events': int
+            }
+        """
+        events = self.events(day)
+        positions, orders, scanned = {}, {}, False
+        for kind, stock, ts, data in events:
+            if kind == 'scan':
+                scanned = True
+            elif kind == 'entry':
+                positions[stock] = dict(data)
+            elif kind in ('exit', 'fill') and stock in positions:
+                positions[stock].update(data)
+            elif kind == 'order':
+                orders.setdefault(stock, []).append(data)
+
+        for record in positions.values():
+            for field in DATETIME_FIELDS:
+                if isinstance(record.get(field), str):
+                    try:
+                        record[field] = datetime.fromisoformat(record[field])
+                    except ValueError:
+                        pass
+        return {'scanned': scanned, 'positions': positions, 'orders': orders, 'events': len(events)}
+
+    def stats(self):
+        return {'path': self.path, 'written': self.written, 'errors': self.errors,
+                'queued': self._queue.qsize(), 'writer_alive': self._writer.is_alive()}
+
+
+# Journal instances by path (one writer thread per database file)
+_journals = {}
+_journal_lock = threading.Lock()
+
+
+def get_journal(path=None):
+    """
+    Get or create a journal
+
+    Args:
+        path: Database file (default JOURNAL_CONFIG["PATH"])
+
+    Returns:
+        TradeJournal, or None when the default journal is disabled in JOURNAL_CONFIG
+    """
+    from config import JOURNAL_CONFIG
+    if path is None:
+        if not JOURNAL_CONFIG.get('ENABLED', True):
+            return None
+        path = JOURNAL_CONFIG.get('PATH', 'journal/trading_journal.db')
+        if not os.path.isabs(path):
+            # Same database whatever directory a script is started from
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    with _journal_lock:
+        journal = _journals.get(path)
+        if journal is None:
+            journal = _journals[path] = TradeJournal(path, synchronous=JOURNAL_CONFIG.get('SYNCHRONOUS', 'NORMAL'))
+    return journal
+
+
+def close_journal(timeout=5):
+    """Commit pending events and stop every journal writer (shutdown)"""
+    with _journal_lock:
+        journals = list(_journals.values())
+        _journals.clear()
+    for journal in journals:
+        journal.close(timeout)
@@ -0,0 +1,160 @@
+"""
+Strategy Lifecycle Manager
+Owns the single active strategy instance and its thread (pre-fetch
+workers included): start refuses while a previous run is still alive,
+stop cancels through the strategy's stop event and joins with a timeout,
+and stats() reports live thread / worker counts so leaks are visible.
+"""
+
+import threading
+from collections import Counter
+from datetime import datetime
+
+from log_pipeline import get_logger
+
+log = get_logger('lifecycle')
+
+# Thread name prefixes of the workers started by the strategy and dashboard
+WORKER_PREFIXES = ('strategy', 'prefetch', 'scan', 'warm', 'dashboard-updater', 'asyncio', 'log-writer', 'journal-writer',
+                   'order-stream', 'replay-order-socket')
+
+
+class StrategyLifecycle:
+    """
+    Start / stop one strategy at a time
+
+    Usage:
+        lifecycle = get_lifecycle()
+        ok, message = lifecycle.start(lambda: FnOTradingStrategy(...))
+        ...
+        lifecycle.stop(timeout=10)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.strategy = None
+        self.thread = None
+        self.generation = 0       # Incremented on every start
+        self.state = 'idle'       # idle / running / stopping / stopped / error
+        self.error = None
+        self.started_at = None
+        self.stopped_at = None
+
+    def is_active(self):
+        """True while a strategy thread is alive (including while stopping)"""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, factory, prefetch=True):
+        """
+        Create and start a strategy unless one is already active
+
+        Args:
+            factory: Callable returning a new strategy (called under the lock)
+            prefetch: Pre-fetch previous-day data on the strategy thread before run()
+
+        Returns:
+            tuple: (success, message)
+        """
+        with self._lock:
+            if self.is_active():
+                if self.state == 'stopping':
+                    return False, 'Previous strategy is still stopping'
+                return False, 'Strategy already running'
+
+            strategy = factory()
+            self.generation += 1
+            self.strategy = strategy
+            self.state = 'running'
+            self.error = None
+            self.started_at = datetime.now()
+            self.stopped_at = None
+            self.thread = threading.Thread(
+                target=self._run,
+                args=(strategy, self.generation, prefetch),
+                name=f'strategy-{self.generation}',
+                daemon=True
+            )
+            self.thread.start()
+            return True, 'Strategy started successfully'
+
+    def _run(self, strategy, generation, prefetch):
+        """Strategy thread body"""
+        error = None
+        try:
+            if prefetch and not strategy.stop_event.is_set():
+                try:
+                    strategy.pre_fetch_prev_day_data()
+                except Exception as e:
+                    log.error(f"Error pre-fetching data: {e}")
+            if not strategy.stop_event.is_set():
+                strategy.run()
+        except Exception as e:
+            error = str(e)
+            log.exception(f"Strategy error: {e}")
+        finally:
+            with self._lock:
+                # A newer start() owns the state now
+                if generation == self.generation:
+                    self.state = 'error' if error else 'stopped'
+                    self.error = error
+                    self.stopped_at = datetime.now()
+
+    def stop(self, timeout=10):
+        """
+        Cancel the active strategy and wait for its thread
+
+        Open positions are left as they are.
+
+        Args:
+            timeout: Seconds to wait for the thread
+
+        Returns:
+            bool: True if no strategy thread is left running
+        """
+        with self._lock:
+            strategy, thread = self.strategy, self.thread
+            if thread is None or not thread.is_alive():
+                return True
+            self.state = 'stopping'
+            strategy.stop()
+
+        thread.join(timeout)
+        if thread.is_alive():
+            log.warning(f"Strategy thread still busy after {timeout}s (it will exit at its next check)")
+            return False
+        return True
+
+    def stats(self):
+        """Live thread and worker counts"""
+        names = [t.name for t in threading.enumerate()]
+        workers = Counter()
+        for name in names:
+            for prefix in WORKER_PREFIXES:
+                if name.startswith(prefix):
+                    workers[prefix] += 1
+                    break
+        return {
+            'state': self.state,
+            'generation': self.generation,
+            'strategy_alive': self.is_active(),
+            'error': self.error,
+            'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+            'stopped_at': self.stopped_at.isoformat(timespec='seconds') if self.stopped_at else None,
+            'threads_total': len(names),
+            'workers': dict(workers)
+        }
+
+
+# Global lifecycle instance
+_lifecycle = None
+_lifecycle_lock = threading.Lock()
+
+
+def get_lifecycle():
+    """Get or create the global strategy lifecycle"""
+    global _lifecycle
+    if _lifecycle is None:
+        with _lifecycle_lock:
+            if _lifecycle is None:
+                _lifecycle = StrategyLifecycle()
+    return _lifecycle
@@ -0,0 +1,218 @@
+"""
+Non-blocking Logging Pipeline
+Strategy threads only enqueue log records (O(1), no formatting, no I/O).
+A single background listener thread formats them and writes:
+
+- the console (stdout, i.e. termux_log.txt under nohup) as plain messages
+- LOGGING_CONFIG["LOG_FILE"] as JSON lines with size-based rotation
+
+Verbosity follows LOGGING_CONFIG["LOG_LEVEL"]; records below it are
+discarded by the logger before they are even queued.
+
+Usage:
+    from log_pipeline import get_logger, setup_logging
+    log = get_logger(__name__)
+    setup_logging()   # once, at startup
+    log.info(f"ORDER PLACED: {order_id}")
+    log.debug("candle detail", extra={'fields': {'symbol': symbol}})
+"""
+
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime
+
+ROOT_LOGGER = 'fno'
+
+_lock = threading.Lock()
+_listener = None
+_handler = None
+
+
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, thread, msg (+ fields)"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage().strip('\n')
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks and never formats on the calling thread
+
+    The stock QueueHandler.prepare() renders the message and traceback so
+    records can be pickled; the listener lives in this process, so the raw
+    record is queued as is and formatting happens on the listener thread.
+    Beyond `max_size` queued records new ones are dropped and counted.
+    """
+
+    def __init__(self, log_queue, max_size):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+def _no_caller(*args, **kwargs):
+    """findCaller replacement: nothing here logs file/line, so skip the stack walk"""
+    return '(unknown file)', 0, '(unknown function)', None
+
+
+def _is_activity(record):
+    fields = getattr(record, 'fields', None)
+    return bool(fields and fields.get('activity'))
+
+
+def activity_spill(logger):
+    """
+    RingBuffer spill callback: write an activity entry through the pipeline
+
+    The record goes to the console and the main log like any other, and to
+    the per-day activity file (LOGGING_CONFIG["ACTIVITY_FILE"]).
+    """
+    def spill(entry):
+        logger.info(f"[{entry['time']}] {entry['message']}",
+                    extra={'fields': {'activity': True, 'seq': entry['seq']}})
+    return spill
+
+
+def _level(name):
+    return getattr(logging, str(name).upper(), logging.INFO)
+
+
+def setup_logging(config=None):
+    """
+    Install the queue handler and start the listener thread (idempotent)
+
+    Args:
+        config: Overrides for LOGGING_CONFIG (defaults to config.py)
+
+    Returns:
+        logging.Logger: The application root logger
+    """
+    global _listener, _handler
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    with _lock:
+        if _listener is not None:
+            return logger
+
+        if config is None:
+            from config import LOGGING_CONFIG
+            config = LOGGING_CONFIG
+
+        handlers = []
+        if config.get('CONSOLE', True):
+            console = logging.StreamHandler(sys.stdout)
+            console.setFormatter(logging.Formatter('%(message)s'))
+            handlers.append(console)
+
+        log_file = config.get('LOG_FILE')
+        if config.get('ENABLE_LOGGING', True) and log_file:
+            os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file,
+                maxBytes=config.get('MAX_BYTES', 5 * 1024 * 1024),
+                backupCount=config.get('BACKUP_COUNT', 5),
+                encoding='utf-8'
+            )
+            file_handler.setFormatter(JsonLineFormatter())
+            handlers.append(file_handler)
+
+        activity_file = config.get('ACTIVITY_FILE')
+        if config.get('ENABLE_LOGGING', True) and activity_file:
+            # Full-day activity log (the in-memory ring buffers keep only the newest entries)
+            os.makedirs(os.path.dirname(activity_file) or '.', exist_ok=True)
+            activity_handler = logging.handlers.TimedRotatingFileHandler(
+                activity_file, when='midnight',
+                backupCount=config.get('ACTIVITY_DAYS', 7), encoding='utf-8'
+            )
+            activity_handler.addFilter(_is_activity)
+            activity_handler.setFormatter(JsonLineFormatter())
+            handlers.append(activity_handler)
+
+        # SimpleQueue: lock-free C put/get; the size bound is enforced by the handler
+        _handler = DroppingQueueHandler(queue.SimpleQueue(), config.get('QUEUE_SIZE', 10000))
+        logger.findCaller = _no_caller
+        logger.addHandler(_handler)
+        logger.setLevel(_level(config.get('LOG_LEVEL', 'INFO')))
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        thread = getattr(_listener, '_thread', None)
+        if thread is not None:
+            thread.name = 'log-writer'
+        atexit.register(stop_logging)
+    return logger
+
+
+def get_logger(name=None):
+    """
+    Logger under the pipeline's root
+
+    Safe to call at import time: nothing is started until setup_logging()
+    (called by the strategy and the dashboard on startup).
+
+    Args:
+        name: Module name, e.g. __name__
+
+    Returns:
+        logging.Logger
+    """
+    if not name or name == ROOT_LOGGER:
+        return logging.getLogger(ROOT_LOGGER)
+    logger = logging.getLogger(f'{ROOT_LOGGER}.{name}')
+    logger.findCaller = _no_caller
+    return logger
+
+
+def set_level(level):
+    """Change verbosity at runtime ('DEBUG', 'INFO', ...)"""
+    logging.getLogger(ROOT_LOGGER).setLevel(_level(level))
+
+
+def stop_logging():
+    """Drain the queue, stop the listener and close the files"""
+    global _listener, _handler
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()  # Processes everything already queued
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+        _listener = None
+        _handler = None
+
+
+def stats():
+    """Queue depth and dropped-record count"""
+    if _handler is None:
+        return {'running': False, 'queued': 0, 'dropped': 0}
+    return {'running': True, 'queued': _handler.queue.qsize(), 'dropped': _handler.dropped}
@@ -58,13 +58,24 @@ class FnOBotApp(App):
             Logger.error(f"WebView: Failed to create: {e}")
 
     def start_flask(self):
+        # Single-process mode: server threads live inside the Kivy process
         try:
-            from app import app
+            import app as dashboard
+            from server import start_background
+            from config import SERVER_CONFIG
             Logger.info("Flask: Starting server on 127.0.0.1:5000")
-            app.run(host='127.0.0.1', port=5000, debug=False, threaded=True)
+            self.server, self.stop_server = start_background(
+                dashboard, host='127.0.0.1', port=5000,
+                threads=SERVER_CONFIG.get('ANDROID_THREADS', 6)
+            )
         except Exception as e:
             Logger.error(f"Flask: Failed to start: {e}")
 
+    def on_stop(self):
+        # Stop the strategy and server cleanly when Android closes the app
+        if getattr(self, 'stop_server', None):
+            self.stop_server()
+
 if __name__ == '__main__':
     FnOBotApp().run()
 
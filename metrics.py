@@ -0,0 +1,223 @@
+"""
+In-Process Metrics with Prometheus Text Exposition
+Counters and histograms for the hot paths (Fyers calls, rate-limiter waits,
+scan phases, quote cache, dashboard loop, order round trips), served by
+app.py at /metrics for a local Prometheus to scrape.
+
+Recording never takes a lock: every thread writes only to its own shard
+(a plain dict reached through threading.local), and a scrape sums the
+shards. Locks are only taken when a thread records its first value and
+when a scrape folds the shards of finished threads together. A scrape
+copies each live shard in one step and histogram cells are replaced, not
+updated in place, so an observation is never seen half-recorded.
+"""
+
+import abc
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SCAN_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+_registry = []
+
+
+class _ShardedMetric(abc.ABC):
+    """Base for metrics whose values live in per-thread shards"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []        # [(thread, shard dict)]
+        self._retired = {}       # Merged shards of finished threads
+        _registry.append(self)
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def _merge(self, into, shard):
+        """Add a shard's values into `into` (in place)"""
+
+    def _collect(self):
+        """Sum all shards (folding finished threads into the retired shard)"""
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # A finished thread can't write any more; fold it in for good
+                    self._merge(self._retired, shard)
+            self._shards = live
+            total = {}
+            self._merge(total, self._retired)
+            for _, shard in live:
+                self._merge(total, dict(shard))
+        return total
+
+    def _labels_text(self, key, extra=None):
+        pairs = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter(_ShardedMetric):
+    """Monotonic counter"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge(self, into, shard):
+        for key, value in list(shard.items()):
+            into[key] = into.get(key, 0) + value
+
+    def value(self, **labels):
+        return self._collect().get(self._key(labels), 0)
+
+    def render(self):
+        return [f'{self.name}{self._labels_text(key)} {value}' for key, value in sorted(self._collect().items())]
+
+
+class Histogram(_ShardedMetric):
+    """Cumulative-bucket histogram (seconds)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        cell = shard.get(key)
+        # Per-bucket counts (+Inf last), then sum and count. A published cell is
+        # never written again: the update goes into a copy that replaces it in
+        # one store, so a scrape sees a bucket, the sum and the count together
+        cell = list(cell) if cell is not None else [0] * (len(self.buckets) + 1) + [0.0, 0]
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+        shard[key] = cell
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _merge(self, into, shard):
+        for key, cell in list(shard.items()):
+            target = into.get(key)
+            if target is None:
+                into[key] = list(cell)
+            else:
+                for i, value in enumerate(cell):
+                    target[i] += value
+
+    def render(self):
+        lines = []
+        for key, cell in sorted(self._collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), cell):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                le_label = f'le="{le}"'
+                lines.append(f'{self.name}_bucket{self._labels_text(key, le_label)} {cumulative}')
+            lines.append(f'{self.name}_sum{self._labels_text(key)} {cell[-2]}')
+            lines.append(f'{self.name}_count{self._labels_text(key)} {cell[-1]}')
+        return lines
+
+
+class GaugeFunc:
+    """Gauge read from a callback at scrape time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, func):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        _registry.append(self)
+
+    def render(self):
+        try:
+            return [f'{self.name} {float(self.func())}']
+        except Exception:
+            return []
+
+
+def gauge_func(name, help_text, func):
+    """Register (or replace) a callback gauge"""
+    for metric in list(_registry):
+        if metric.name == name:
+            _registry.remove(metric)
+    return GaugeFunc(name, help_text, func)
+
+
+def render():
+    """All metrics in Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for metric in list(_registry):
+        samples = metric.render()
+        if not samples and metric.kind == 'gauge':
+            continue
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+
+def endpoint_name(api_function):
+    """Fyers endpoint label for a (bound) client method"""
+    return getattr(api_function, '__name__', 'call')
+
+
+def response_status(response):
+    """'ok' / 'error' label from a Fyers response dict"""
+    return 'ok' if isinstance(response, dict) and response.get('s') == 'ok' else 'error'
+
+
+# ============================================================================
+# INSTRUMENTS
+# ============================================================================
+
+API_LATENCY = Histogram('fyers_api_latency_seconds', 'Fyers API call latency (after rate limiting)', ('endpoint',))
+API_CALLS = Counter('fyers_api_calls_total', 'Fyers API calls by endpoint and outcome', ('endpoint', 'status'))
+RATE_LIMIT_WAIT = Histogram('rate_limiter_wait_seconds', 'Time spent waiting for a rate-limit slot',
+                            buckets=(0.0005, 0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 30.0, 60.0))
+SCAN_PHASE = Histogram('scan_phase_seconds', 'Duration of each 9:18 scan phase', ('phase',), buckets=SCAN_BUCKETS)
+QUOTE_CACHE = Counter('quote_cache_requests_total', 'Cached quote lookups by result (hit / miss)', ('result',))
+DASHBOARD_CYCLE = Histogram('dashboard_cycle_seconds', 'Dashboard updater build + publish time')
+REQUEST_GUARD = Counter('fyers_request_guard_total', 'Requests answered locally without an API call',
+                        ('endpoint', 'reason'))
+ORDER_RTT = Histogram('order_round_trip_seconds', 'Order placement round trip (including rate-limit wait)', ('kind',))
+ORDER_EVENTS = Counter('order_updates_total', 'Order records merged into the local order index',
+                       ('source', 'result'))
+ORDER_LATENCY = Histogram('order_latency_seconds', 'Order signal -> ack -> fill latency (session seconds)',
+                          ('kind', 'stage'), buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
@@ -0,0 +1,306 @@
+"""
+Option Chain Snapshots
+Finds a tradable contract for every qualifier in one batched /quotes call
+instead of guessing a single ATM symbol that may not exist.
+
+- Contracts come from the NSE_FO symbol master (universe.load_master): the
+  nearest expiry that has not passed and its listed strikes, so the strike
+  step and expiry code are never guessed. Underlyings missing from the
+  master (and replays, which have no master) fall back to the strategy's
+  symbol format with a fixed strike step.
+- plan() lists ATM±N CE/PE symbols for a set of underlyings; the strategy
+  quotes them in 50-symbol batches and hands them to ingest(). Chains are
+  cached for OPTION_CHAIN_CONFIG["TTL_SECONDS"] so repeat lookups are free.
+- select() picks the nearest strike with an acceptable spread and volume,
+  else the most liquid strike in the window.
+
+Usage:
+    chain = OptionChainService(strategy)
+    symbols = chain.plan([('SBIN', 812.4, 'CE')])
+    chain.ingest(strategy.get_multiple_prices(symbols))
+    contract = chain.select('SBIN', 812.4, 'CE')
+"""
+
+import threading
+from datetime import datetime, time as dt_time
+
+from log_pipeline import get_logger
+
+log = get_logger('option_chain')
+
+SIDES = ('CE', 'PE')
+
+# Fyers NSE_FO.csv columns used here (see universe.py for the others)
+EXPIRY_COLUMN = 8
+STRIKE_COLUMN = 15
+OPTION_TYPE_COLUMN = 16
+
+
+def build_contract_index(master, today):
+    """
+    Nearest live expiry per underlying from the symbol master
+
+    Args:
+        master: Parsed NSE_FO master (DataFrame)
+        today: Session date (expiries before it are skipped)
+
+    Returns:
+        dict: underlying -> {'expiry': date, 'strikes': sorted list,
+                             'symbols': {(strike, side): symbol}}
+    """
+    from universe import SYMBOL_COLUMN, UNDERLYING_COLUMN
+    options = master[master[OPTION_TYPE_COLUMN].isin(SIDES)]
+    cutoff = datetime.combine(today, dt_time()).timestamp()
+    options = options[options[EXPIRY_COLUMN].astype(float) >= cutoff]
+
+    index = {}
+    for underlying, rows in options.groupby(UNDERLYING_COLUMN, sort=False):
+        expiry = rows[EXPIRY_COLUMN].astype(float).min()
+        rows = rows[rows[EXPIRY_COLUMN].astype(float) == expiry]
+        symbols = {}
+        for strike, side, symbol in zip(rows[STRIKE_COLUMN], rows[OPTION_TYPE_COLUMN], rows[SYMBOL_COLUMN]):
+            strike = float(strike)
+            symbols[(int(strike) if strike.is_integer() else strike, side)] = symbol
+        index[str(underlying)] = {
+            'expiry': datetime.fromtimestamp(expiry).date(),
+            'strikes': sorted({strike for strike, _ in symbols}),
+            'symbols': symbols,
+            'listed': set(symbols.values())
+        }
+    return index
+
+
+class OptionChainService:
+    """
+    Batched ATM±N option chain snapshots with a short-TTL cache
+    """
+
+    def __init__(self, strategy, use_master=True):
+        """
+        Args:
+            strategy: FnOTradingStrategy (clock, symbol format and fallback strike step)
+            use_master: Resolve contracts from the NSE_FO master (False for replays)
+        """
+        from config import OPTION_CHAIN_CONFIG
+        self.strategy = strategy
+        self.clock = strategy.clock
+        self.strikes_each_side = OPTION_CHAIN_CONFIG.get('STRIKES_EACH_SIDE', 2)
+        self.ttl = OPTION_CHAIN_CONFIG.get('TTL_SECONDS', 5)
+        self.max_spread_pct = OPTION_CHAIN_CONFIG.get('MAX_SPREAD_PCT', 5.0)
+        self.min_volume = OPTION_CHAIN_CONFIG.get('MIN_VOLUME', 0)
+        self.strike_step = OPTION_CHAIN_CONFIG.get('FALLBACK_STRIKE_STEP', 50)
+        self.use_master = use_master
+        self.lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._index = None
+        self._index_day = None
+        self._chains = {}   # underlying -> {'fetched', 'contracts': {symbol: (strike, side)}, 'quotes'}
+
+    # ------------------------------------------------------------------
+    # Contracts
+    # ------------------------------------------------------------------
+
+    def _contract_index(self):
+        today = self.clock.now().date()
+        with self._index_lock:
+            if self._index is None or self._index_day != today:
+                index = {}
+                if self.use_master:
+                    from universe import load_master
+                    try:
+                        master = load_master()
+                        if master is not None:
+                            index = build_contract_index(master, today)
+                            log.info(f"Option chain: {len(index)} underlyings indexed from the symbol master")
+                    except Exception as e:
+                        log.warning(f"Option chain: could not index the symbol master ({e}) - using derived symbols")
+                self._index, self._index_day = index, today
+            return self._index
+
+    def warm(self):
+        """Build the contract index ahead of the scan (it is rebuilt once a day)"""
+        self._contract_index()
+
+    def expiry(self, underlying, option_symbol=None):
+        """
+        Nearest live expiry from the master, or None when the symbols are
+        derived (or `option_symbol` is not one of that expiry's contracts)
+        """
+        listed = self._contract_index().get(underlying)
+        if not listed or (option_symbol is not None and option_symbol not in listed['listed']):
+            return None
+        return listed['expiry']
+
+    def nearest_strike(self, underlying, spot):
+        """Listed strike closest to spot (fixed-step rounding when not in the master)"""
+        listed = self._contract_index().get(underlying)
+        if not listed or not listed['strikes']:
+            return self.strategy.get_atm_strike(spot, self.strike_step)
+        return min(listed['strikes'], key=lambda strike: (abs(strike - spot), strike))
+
+    def window(self, underlying, spot, side, strikes_each_side=None):
+        """
+        ATM±N contracts for one side, nearest strike first
+
+        Returns:
+            list: [(strike, symbol), ...]
+        """
+        n = self.strikes_each_side if strikes_each_side is None else strikes_each_side
+        listed = self._contract_index().get(underlying)
+        if listed and listed['strikes']:
+            strikes = listed['strikes']
+            atm = strikes.index(self.nearest_strike(underlying, spot))
+            candidates = strikes[max(0, atm - n):atm + n + 1]
+            contracts = [(strike, listed['symbols'][(strike, side)]) for strike in candidates
+                         if (strike, side) in listed['symbols']]
+        else:
+            atm = self.strategy.get_atm_strike(spot, self.strike_step)
+            make_symbol = self.strategy.get_ce_option_symbol if side == 'CE' else self.strategy.get_pe_option_symbol
+            contracts = [(atm + k * self.strike_step, make_symbol(underlying, atm + k * self.strike_step))
+                         for k in range(-n, n + 1) if atm + k * self.strike_step > 0]
+        return sorted(contracts, key=lambda contract: (abs(contract[0] - spot), contract[0]))
+
+    def contract_symbol(self, underlying, spot, side):
+        """(strike, symbol) of the nearest listed contract (derived when none is listed)"""
+        contracts = self.window(underlying, spot, side)
+        if contracts:
+            return contracts[0]
+        strike = self.strategy.get_atm_strike(spot, self.strike_step)
+        make_symbol = self.strategy.get_ce_option_symbol if side == 'CE' else self.strategy.get_pe_option_symbol
+        return strike, make_symbol(underlying, strike)
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def _fresh(self, underlying, symbols, now):
+        chain = self._chains.get(underlying)
+        return (chain is not None and now - chain['fetched'] < self.ttl
+                and all(symbol in chain['quotes'] for symbol in symbols))
+
+    def plan(self, wants):
+        """
+        Symbols to quote for a set of (underlying, spot, side) lookups,
+        skipping chains that are still fresh
+
+        Args:
+            wants: Iterable of (underlying, spot, side); side None = CE and PE
+
+        Returns:
+            list: Option symbols for one batched quotes request (50 per call)
+        """
+        now = self.clock.time()
+        symbols = []
+        with self.lock:
+            for underlying, spot, side in wants:
+                contracts = []
+                for s in ((side,) if side else SIDES):
+                    contracts.extend((strike, s, symbol) for strike, symbol in self.window(underlying, spot, s))
+                if self._fresh(underlying, [symbol for _, _, symbol in contracts], now):
+                    continue
+                chain = self._chains.setdefault(underlying, {'fetched': 0, 'contracts': {}, 'quotes': {}})
+                for strike, s, symbol in contracts:
+                    chain['contracts'][symbol] = (strike, s)
+                    symbols.append(symbol)
+        return list(dict.fromkeys(symbols))
+
+    def ingest(self, quotes):
+        """
+        Store quotes for planned symbols
+
+        Args:
+            quotes: symbol -> quote data ('v' of the quotes response)
+        """
+        now = self.clock.time()
+        with self.lock:
+            for chain in self._chains.values():
+                fetched = False
+                for symbol in chain['contracts']:
+                    if symbol in quotes:
+                        chain['quotes'][symbol] = quotes[symbol]
+                        fetched = True
+                if fetched:
+                    chain['fetched'] = now
+
+    def snapshot(self, wants, fetch):
+        """
+        plan() + fetch + ingest() in one go
+
+        Args:
+            wants: Iterable of (underlying, spot, side)
+            fetch: Callable(symbols) -> {symbol: quote} (e.g. strategy.get_multiple_prices)
+        """
+        symbols = self.plan(wants)
+        if symbols:
+            self.ingest(fetch(symbols))
+
+    def quoted(self, underlying):
+        """
+        Cached snapshot of one underlying's chain
+
+        Returns:
+            list: [(strike, side, symbol, quote), ...] for contracts with a price
+        """
+        with self.lock:
+            chain = self._chains.get(underlying)
+            if chain is None:
+                return []
+            return [(strike, side, symbol, chain['quotes'][symbol])
+                    for symbol, (strike, side) in chain['contracts'].items()
+                    if chain['quotes'].get(symbol, {}).get('lp')]
+
+    # ------------------------------------------------------------------
+    # Selection
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def spread_pct(quote):
+        """Bid/ask spread as % of LTP (None when the quote has no book)"""
+        bid, ask, lp = quote.get('bid'), quote.get('ask'), quote.get('lp')
+        if not bid or not ask or not lp:
+            return None
+        return (ask - bid) / lp * 100
+
+    def _tradable(self, underlying, spot, side):
+        """Quoted contracts of the window, nearest strike first: [(strike, symbol, quote)]"""
+        chain = self._chains.get(underlying)
+        if chain is None:
+            return []
+        tradable = []
+        for strike, symbol in self.window(underlying, spot, side):
+            quote = chain['quotes'].get(symbol)
+            if quote and quote.get('lp'):
+                tradable.append((strike, symbol, quote))
+        return tradable
+
+    def best_liquidity(self, underlying, spot, side):
+        """Most liquid quoted contract in the window (tightest spread, then volume)"""
+        tradable = self._tradable(underlying, spot, side)
+        if not tradable:
+            return None
+        strike, symbol, quote = min(tradable, key=lambda t: (
+            self.spread_pct(t[2]) if self.spread_pct(t[2]) is not None else float('inf'),
+            -(t[2].get('volume') or 0)))
+        return self._contract(underlying, strike, side, symbol, quote)
+
+    def select(self, underlying, spot, side):
+        """
+        Contract to trade: the nearest strike whose spread and volume pass
+        OPTION_CHAIN_CONFIG, else the most liquid strike in the window
+
+        Returns:
+            dict: {'symbol', 'strike', 'side', 'expiry', 'quote'} or None if nothing is quoted
+        """
+        for strike, symbol, quote in self._tradable(underlying, spot, side):
+            spread = self.spread_pct(quote)
+            if (spread is None or spread <= self.max_spread_pct) and (quote.get('volume') or 0) >= self.min_volume:
+                return self._contract(underlying, strike, side, symbol, quote)
+        return self.best_liquidity(underlying, spot, side)
+
+    def _contract(self, underlying, strike, side, symbol, quote):
+        return {'symbol': symbol, 'strike': strike, 'side': side,
+                'expiry': self.expiry(underlying), 'quote': quote}
+
+    def clear(self):
+        with self.lock:
+            self._chains.clear()
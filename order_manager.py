@@ -5,13 +5,15 @@ Places LIMIT orders at current LTP
 
 import sys
 import os
-from fyers_apiv3 import fyersModel
 from datetime import datetime
 import time
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from fyers_client import create_fyers_client
+from rate_limiter import RateLimitedClient
+
 try:
     from config import FYERS_CONFIG
 except ImportError:
@@ -74,7 +76,7 @@ def main():
         print("Error: Missing credentials in config.py")
         return
 
-    fyers = fyersModel.FyersModel(client_id=client_id, token=access_token)
+    fyers = RateLimitedClient(create_fyers_client(client_id, access_token))  # Shares the account's call budget
     
     print("\n--- Standalone Order Placement ---")
     symbol = input("Enter symbol (e.g., NSE:SBIN-EQ): ").strip()
@@ -0,0 +1,307 @@
+"""
+Order-Update Stream and Local Order Index
+Keeps today's orders in a local index keyed by order ID, fed by the
+broker's order-update socket instead of pulling the whole orderbook on a
+timer:
+
+- OrderIndex merges order records (full orderbook rows or socket updates)
+  and reports only the orders that actually changed; the dashboard reads
+  its cached list, which is rebuilt only when the version moves.
+- OrderStream seeds the index with one orderbook call, then listens on
+  FyersOrderSocket (fyers_apiv3) for order events. While the socket is down
+  it polls the orderbook every ORDER_STREAM_CONFIG["POLL_SECONDS"]; while it
+  is up, a slow reconciliation poll catches any missed event.
+- Replays use SimulatedFyersModel.order_socket() (fyers_replay.py), a local
+  stand-in that emits the same events as the simulator accepts and fills
+  orders.
+
+Usage:
+    stream = OrderStream(fyers, rate_limiter, clock, client_id, access_token)
+    stream.subscribe(lambda changes: print(changes))
+    stream.start()
+    stream.orders()      # Newest index snapshot, no API call
+"""
+
+import threading
+
+from log_pipeline import get_logger
+from metrics import ORDER_EVENTS
+
+log = get_logger('order_stream')
+
+# Fyers order status codes
+ORDER_STATUS_NAMES = {1: 'CANCELLED', 2: 'FILLED', 4: 'TRANSIT', 5: 'REJECTED', 6: 'PENDING', 7: 'EXPIRED'}
+TERMINAL_STATUSES = frozenset({1, 2, 5, 7})
+
+try:
+    from fyers_apiv3.FyersWebsocket.order_ws import FyersOrderSocket
+except ImportError:  # Older SDKs without the order socket: polling only
+    FyersOrderSocket = None
+
+
+class OrderIndex:
+    """
+    Today's orders keyed by order ID
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._orders = {}      # id -> order dict (first-seen order)
+        self.version = 0       # Incremented whenever an order changes
+        self._snapshot = ([], 0)
+
+    def apply(self, orders):
+        """
+        Merge order records into the index
+
+        Args:
+            orders: Iterable of order dicts (orderbook rows or socket updates;
+                    partial updates are merged into the known order)
+
+        Returns:
+            list: Copies of the orders that are new or changed
+        """
+        changed = []
+        with self.lock:
+            for update in orders:
+                order_id = update.get('id') if isinstance(update, dict) else None
+                if not order_id:
+                    continue
+                current = self._orders.get(order_id)
+                merged = dict(current, **update) if current else dict(update)
+                if merged != current:
+                    self._orders[order_id] = merged
+                    changed.append(dict(merged))
+            if changed:
+                self.version += 1
+        return changed
+
+    def orders(self):
+        """All orders (copies), rebuilt only when something changed since the last call"""
+        with self.lock:
+            cached, version = self._snapshot
+            if version != self.version:
+                cached = [dict(order) for order in self._orders.values()]
+                self._snapshot = (cached, self.version)
+            return cached
+
+    def get(self, order_id):
+        with self.lock:
+            order = self._orders.get(order_id)
+            return dict(order) if order else None
+
+    def open_orders(self):
+        """Orders that can still change (pending / in transit)"""
+        with self.lock:
+            return [dict(o) for o in self._orders.values() if o.get('status') not in TERMINAL_STATUSES]
+
+    def clear(self):
+        with self.lock:
+            self._orders.clear()
+            self.version += 1
+
+    def __len__(self):
+        return len(self._orders)
+
+
+class OrderStream:
+    """
+    Order-update socket with an orderbook-polling fallback, feeding an OrderIndex
+    """
+
+    def __init__(self, fyers, rate_limiter, clock, client_id=None, access_token=None,
+                 use_socket=True, poll_seconds=10, reconcile_seconds=60):
+        """
+        Args:
+            fyers: Fyers client (SimulatedFyersModel brings its own stand-in socket)
+            rate_limiter: Limiter the orderbook polls go through
+            clock: Session clock (poll intervals are session seconds)
+            client_id, access_token: Credentials for the live order socket
+            use_socket: False = poll only
+            poll_seconds: Orderbook poll interval while the socket is down
+            reconcile_seconds: Safety-net poll interval while the socket is up
+        """
+        self.fyers = fyers
+        self.rate_limiter = rate_limiter
+        self.clock = clock
+        self.client_id = client_id
+        self.access_token = access_token
+        self.use_socket = use_socket
+        self.poll_seconds = poll_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self.index = OrderIndex()
+        self.lock = threading.Lock()
+        self._listeners = []
+        self._socket = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.connected = False
+        self.started = False
+        self.events = 0
+        self.polls = 0
+        self.last_event = None
+
+    # ------------------------------------------------------------------
+    # Listeners
+    # ------------------------------------------------------------------
+
+    def subscribe(self, callback):
+        """
+        Call `callback(changes)` with the orders that changed (never with an empty list)
+        """
+        with self.lock:
+            self._listeners.append(callback)
+
+    def _publish(self, orders, source):
+        changes = self.index.apply(orders)
+        if changes:
+            ORDER_EVENTS.inc(len(changes), source=source, result='changed')
+        if len(orders) > len(changes):
+            ORDER_EVENTS.inc(len(orders) - len(changes), source=source, result='unchanged')
+        if not changes:
+            return changes
+        with self.lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(changes)
+            except Exception as e:
+                log.error(f"Order listener failed: {e}")
+        return changes
+
+    # ------------------------------------------------------------------
+    # Sources
+    # ------------------------------------------------------------------
+
+    def poll(self):
+        """
+        Pull the full orderbook once and merge it
+
+        Returns:
+            list: Orders that changed (None if the call failed)
+        """
+        try:
+            response = self.rate_limiter.make_call(self.fyers.orderbook)
+        except Exception as e:
+            log.error(f"Error getting orderbook: {e}")
+            return None
+        if not isinstance(response, dict) or response.get('s') != 'ok':
+            return None
+        self.polls += 1
+        return self._publish(response.get('orderBook') or [], 'poll')
+
+    def _on_orders(self, message):
+        """Order event from the socket: {'s': 'ok', 'orders': {...}}"""
+        order = message.get('orders') if isinstance(message, dict) else None
+        if not isinstance(order, dict) or message.get('s', 'ok') != 'ok':
+            return
+        self.events += 1
+        self.last_event = self.clock.now()
+        self._publish([order], 'socket')
+
+    def _on_connect(self):
+        self._socket.subscribe(data_type="OnOrders")
+        if not self.connected:
+            self.connected = True
+            log.info("📡 Order-update socket connected - orderbook polling paused")
+
+    def _on_close(self, message=None):
+        if self.connected:
+            self.connected = False
+            log.warning(f"📡 Order-update socket closed ({message}) - polling the orderbook "
+                        f"every {self.poll_seconds}s")
+
+    def _on_error(self, message):
+        log.warning(f"📡 Order-update socket error: {message}")
+
+    def _make_socket(self):
+        """The replay stand-in, the live FyersOrderSocket, or None (poll only)"""
+        callbacks = dict(on_orders=self._on_orders, on_connect=self._on_connect,
+                         on_close=self._on_close, on_error=self._on_error)
+        factory = getattr(self.fyers, 'order_socket', None)
+        if callable(factory):
+            return factory(**callbacks)
+        if FyersOrderSocket is None or not self.access_token:
+            return None
+        return FyersOrderSocket(access_token=f"{self.client_id}:{self.access_token}", write_to_file=False,
+                                reconnect=True, **callbacks)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Seed the index from the orderbook, then follow the socket (or poll)"""
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+            self._stop.clear()
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name='order-stream', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        if self.use_socket:
+            try:
+                self._socket = self._make_socket()
+                if self._socket is not None:
+                    self._socket.connect()
+            except Exception as e:
+                log.warning(f"📡 Order-update socket unavailable ({e}) - polling the orderbook")
+                self._socket = None
+        if self._socket is None:
+            log.info(f"📡 Polling the orderbook every {self.poll_seconds}s (no order-update socket)")
+
+        speed = getattr(self.clock, 'speed', 1.0)
+        last_poll = self.clock.time()
+        while not self._stop.wait(0.5 / speed):
+            interval = self.reconcile_seconds if self.connected else self.poll_seconds
+            if self.clock.time() - last_poll >= interval:
+                self.poll()
+                last_poll = self.clock.time()
+
+    def stop(self, timeout=5):
+        """Close the socket and end the poll thread"""
+        with self.lock:
+            if not self.started:
+                return
+            self.started = False
+        self._stop.set()
+        self.connected = False   # Closing on purpose: no fallback warning
+        socket, self._socket = self._socket, None
+        if socket is not None:
+            try:
+                socket.close_connection()
+            except Exception as e:
+                log.warning(f"Error closing the order-update socket: {e}")
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def orders(self):
+        """Newest orderbook view from the index (no API call)"""
+        return self.index.orders()
+
+    def get_stats(self):
+        return {
+            'mode': 'socket' if self.connected else ('polling' if self.started else 'stopped'),
+            'orders': len(self.index),
+            'version': self.index.version,
+            'events': self.events,
+            'polls': self.polls,
+            'last_event': self.last_event.isoformat(timespec='seconds') if self.last_event else None
+        }
+
+
+def create_order_stream(strategy):
+    """An OrderStream for a strategy, configured from ORDER_STREAM_CONFIG (None when disabled)"""
+    from config import ORDER_STREAM_CONFIG
+    if not ORDER_STREAM_CONFIG.get('ENABLED', True):
+        return None
+    return OrderStream(
+        strategy.fyers, strategy.rate_limiter, strategy.clock,
+        client_id=strategy.client_id, access_token=strategy.access_token,
+        use_socket=ORDER_STREAM_CONFIG.get('USE_SOCKET', True),
+        poll_seconds=ORDER_STREAM_CONFIG.get('POLL_SECONDS', 10),
+        reconcile_seconds=ORDER_STREAM_CONFIG.get('RECONCILE_SECONDS', 60)
+    )
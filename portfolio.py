@@ -0,0 +1,254 @@
+"""
+Incremental Portfolio P&L Aggregator
+Keeps per-position P&L and running CE/PE totals up to date as quotes
+arrive. A price tick only does work for the positions whose price actually
+changed: their old contribution is subtracted from the totals and the new
+one added, so per-tick CPU stays flat as the book grows.
+
+The strategy (monitor_pnl) and the dashboard updater both feed quotes into
+the strategy's aggregator and read the same numbers back.
+"""
+
+import threading
+
+SIDES = ('CE', 'PE')
+
+
+def position_pnl(entry_price, current_price, lot_size):
+    """
+    P&L of one position
+
+    Returns:
+        tuple: (total_pnl, pnl_percent, investment, current_value)
+    """
+    investment = entry_price * lot_size
+    value = current_price * lot_size
+    pnl_percent = ((current_price - entry_price) / entry_price) * 100 if entry_price else 0
+    return value - investment, pnl_percent, investment, value
+
+
+class PortfolioAggregator:
+    """
+    Running totals over the strategy's positions
+
+    Usage:
+        portfolio = PortfolioAggregator()
+        portfolio.upsert('SBIN', qualified_stocks['SBIN'])
+        portfolio.update_prices(quotes)          # {option_symbol: {'lp': ...}}
+        fields = portfolio.dashboard_fields()
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._positions = {}     # stock -> position record (strategy's dict)
+        self._rows = {}          # stock -> dashboard row (replaced, never mutated)
+        self._by_symbol = {}     # option_symbol -> [stock, ...]
+        self._prices = {}        # stock -> price used for the row
+        self._symbols = None     # Cached list of option symbols to quote
+        self.totals = {side: {'count': 0, 'invested': 0.0, 'value': 0.0} for side in SIDES}
+        self.version = 0         # Bumped on every change
+        self._fields = (None, None)  # (version, dashboard_fields())
+
+    def __len__(self):
+        return len(self._positions)
+
+    def symbols(self):
+        """Option symbols of all positions (cached until the book changes)"""
+        symbols = self._symbols
+        if symbols is None:
+            with self._lock:
+                symbols = self._symbols = list(self._by_symbol)
+        return symbols
+
+    # ------------------------------------------------------------------
+    # Book changes (entries, exits, restores)
+    # ------------------------------------------------------------------
+
+    def upsert(self, stock, details, price=None):
+        """
+        Add a position or re-read an existing one after its record changed
+        (e.g. status EXITED with an exit price)
+
+        Args:
+            stock: Underlying
+            details: The strategy's qualified_stocks record
+            price: Current price (default: keep the last one, or the entry price)
+        """
+        with self._lock:
+            old = self._rows.get(stock)
+            if old is not None:
+                self._untotal(old)
+                if old['option_symbol'] != details['option_symbol']:
+                    self._unindex(stock, old['option_symbol'])
+                    self._index(stock, details['option_symbol'])
+            else:
+                self._index(stock, details['option_symbol'])
+            self._positions[stock] = details
+            if price is None:
+                price = self._prices.get(stock)
+            self._set_locked(stock, details, price, stale=price is None)
+
+    def remove(self, stock):
+        """Drop a position from the book"""
+        with self._lock:
+            row = self._rows.pop(stock, None)
+            if row is None:
+                return
+            self._untotal(row)
+            self._unindex(stock, row['option_symbol'])
+            del self._positions[stock]
+            self._prices.pop(stock, None)
+            self.version += 1
+
+    def _index(self, stock, symbol):
+        self._by_symbol.setdefault(symbol, []).append(stock)
+        self._symbols = None
+
+    def _unindex(self, stock, symbol):
+        stocks = self._by_symbol.get(symbol, [])
+        if stock in stocks:
+            stocks.remove(stock)
+        if not stocks:
+            self._by_symbol.pop(symbol, None)
+        self._symbols = None
+
+    def _untotal(self, row):
+        """Take a position's contribution out of the totals"""
+        totals = self.totals[row['type']]
+        totals['count'] -= 1
+        totals['invested'] -= row['investment']
+        totals['value'] -= row['investment'] + row['total_pnl']
+
+    def _set_locked(self, stock, details, price, stale):
+        """(Re)compute one position's row and add it to the totals"""
+        entry_price = details['entry_price']
+        lot_size = details.get('lot_size', 1)
+        if details.get('status') == 'EXITED' and details.get('exit_price') is not None:
+            price, stale = details['exit_price'], False  # Closed: frozen at the exit price
+        elif price is None:
+            price = entry_price
+        pnl, pnl_percent, investment, value = position_pnl(entry_price, price, lot_size)
+        side = details.get('type', 'CE')
+
+        totals = self.totals[side]
+        totals['count'] += 1
+        totals['invested'] += investment
+        totals['value'] += value
+
+        entry_time = details.get('entry_time')
+        self._prices[stock] = price
+        self._rows[stock] = {
+            'symbol': stock,
+            'option_symbol': details['option_symbol'],
+            'type': side,
+            'strike': details.get('strike'),
+            'status': details.get('status', 'RUNNING'),
+            'entry_price': entry_price,
+            'current_price': price,
+            'total_pnl': pnl,
+            'pnl_percent': pnl_percent,
+            'lot_size': lot_size,
+            'investment': investment,
+            'entry_time': entry_time.strftime('%H:%M:%S') if hasattr(entry_time, 'strftime') else entry_time,
+            'is_stale': stale
+        }
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    # Price ticks
+    # ------------------------------------------------------------------
+
+    def update_prices(self, quotes):
+        """
+        Apply a batch of quotes; only positions whose price changed are recomputed
+
+        Args:
+            quotes: {option_symbol: {'lp': price, ...}} (symbols not held are ignored)
+
+        Returns:
+            int: Number of positions updated
+        """
+        changed = 0
+        with self._lock:
+            quoted = 0
+            for symbol, quote in quotes.items():
+                stocks = self._by_symbol.get(symbol)
+                if not stocks:
+                    continue
+                price = quote.get('lp') if isinstance(quote, dict) else None
+                if price is None:
+                    continue
+                quoted += 1
+                for stock in stocks:
+                    row = self._rows[stock]
+                    if row['current_price'] == price and not row['is_stale']:
+                        continue
+                    details = self._positions[stock]
+                    if row['status'] == 'EXITED':
+                        continue  # Frozen at the exit price
+                    self._untotal(row)
+                    self._set_locked(stock, details, price, stale=False)
+                    changed += 1
+
+            if quoted < len(self._by_symbol):
+                # Some symbols got no quote: flag them stale (keeping the last price)
+                for symbol, stocks in self._by_symbol.items():
+                    quote = quotes.get(symbol)
+                    if isinstance(quote, dict) and quote.get('lp') is not None:
+                        continue
+                    for stock in stocks:
+                        row = self._rows[stock]
+                        if not row['is_stale'] and row['status'] != 'EXITED':
+                            self._rows[stock] = dict(row, is_stale=True)
+                            self.version += 1
+        return changed
+
+    # ------------------------------------------------------------------
+    # Readers
+    # ------------------------------------------------------------------
+
+    def row(self, stock):
+        """Dashboard row of one position (read-only)"""
+        return self._rows.get(stock)
+
+    def summary(self):
+        """Overall totals: invested, value, pnl, pnl_percent plus per-side totals"""
+        with self._lock:
+            sides = {side: dict(values) for side, values in self.totals.items()}
+        invested = sides['CE']['invested'] + sides['PE']['invested']
+        value = sides['CE']['value'] + sides['PE']['value']
+        pnl = value - invested
+        return {
+            'sides': sides,
+            'invested': invested,
+            'value': value,
+            'pnl': pnl,
+            'pnl_percent': (pnl / invested) * 100 if invested > 0 else 0
+        }
+
+    def dashboard_fields(self):
+        """
+        Position section of the dashboard state (rebuilt only after a change)
+
+        Returns:
+            dict: qualified_stocks rows plus CE/PE and overall totals
+        """
+        version, fields = self._fields
+        if version == self.version and fields is not None:
+            return fields
+        with self._lock:
+            version = self.version
+            rows = dict(self._rows)
+        summary = self.summary()
+        fields = {
+            'qualified_stocks': rows,
+            'total_positions_ce': summary['sides']['CE']['count'],
+            'total_positions_pe': summary['sides']['PE']['count'],
+            'total_capital_ce': summary['sides']['CE']['invested'],
+            'total_capital_pe': summary['sides']['PE']['invested'],
+            'total_pnl': summary['pnl'],
+            'total_pnl_percent': summary['pnl_percent'],
+            'total_invested': summary['invested']
+        }
+        self._fields = (version, fields)
+        return fields
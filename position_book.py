@@ -0,0 +1,264 @@
+"""
+Array-Backed Position Book
+Stores the strategy's positions (qualified_stocks) as columns indexed by
+an integer row instead of one dict per position: NumPy arrays for entry /
+exit / spot price, lot size, side, status and the option's symbol ID, and
+plain lists for the few object fields (spot symbol, strike, entry / exit
+time). Readers that work on every position at once (greeks.py) take the
+columns directly; P&L is kept by PortfolioAggregator (portfolio.py).
+
+Existing callers keep working: the book is a MutableMapping of
+stock -> PositionView, and a view reads and writes the columns through
+the familiar keys (details['status'] = 'EXITED', details.get('exit_price')).
+Any other key lands in a per-row overflow dict.
+"""
+
+import threading
+from collections.abc import MutableMapping
+
+import numpy as np
+
+SIDES = ('CE', 'PE')
+STATUSES = ('RUNNING', 'EXITED', 'PENDING', 'PARTIAL', 'REJECTED', 'CANCELLED')
+
+# Float columns (NaN = key not set); type / status are stored as codes into SIDES / STATUSES
+FLOAT_COLUMNS = ('entry_price', 'exit_price', 'spot_price')
+# Object columns (plain lists)
+OBJECT_COLUMNS = ('spot_symbol', 'strike', 'entry_time', 'exit_time')
+# Keys every position has
+BASE_KEYS = ('option_symbol', 'type', 'status', 'lot_size')
+# Keys whose change bumps PositionBook.version (what readers cache per row)
+CONTRACT_KEYS = frozenset({'option_symbol', 'type', 'spot_symbol', 'strike', 'order_qty'})
+
+_MISSING = object()
+
+
+class PositionView(MutableMapping):
+    """Dict-like view of one position (reads / writes the book's columns)"""
+
+    __slots__ = ('_book', '_stock')
+
+    def __init__(self, book, stock):
+        self._book = book
+        self._stock = stock
+
+    def __getitem__(self, key):
+        return self._book._get(self._stock, key)
+
+    def __setitem__(self, key, value):
+        self._book._set(self._stock, key, value)
+
+    def __delitem__(self, key):
+        self._book._set(self._stock, key, None)
+
+    def __iter__(self):
+        return iter(self._book._keys(self._stock))
+
+    def __len__(self):
+        return len(self._book._keys(self._stock))
+
+    def __repr__(self):
+        return f"PositionView({self._stock!r}, {dict(self)!r})"
+
+
+class PositionBook(MutableMapping):
+    """
+    Struct-of-arrays position store with a dict-compatible interface
+
+    Usage:
+        book = PositionBook()
+        book['SBIN'] = {'option_symbol': 'NSE:SBIN...CE', 'type': 'CE', 'entry_price': 12.5,
+                        'lot_size': 750, 'status': 'RUNNING', 'entry_time': now}
+        book['SBIN']['status'] = 'EXITED'
+        book.rows_with_status('RUNNING')    # row indices into the columns
+    """
+
+    def __init__(self, capacity=16):
+        self._lock = threading.Lock()
+        self._n = 0
+        self.capacity = 0
+        self.floats = {key: np.empty(0) for key in FLOAT_COLUMNS}
+        self.lot_size = np.empty(0, dtype=np.int64)
+        self.side = np.empty(0, dtype=np.int8)
+        self.status = np.empty(0, dtype=np.int8)
+        self.symbol_id = np.empty(0, dtype=np.int32)
+        self._grow(capacity)
+        self.objects = {key: [] for key in OBJECT_COLUMNS}
+        self._rows = {}          # stock -> row
+        self._stocks = []        # row -> stock
+        self._overflow = {}      # row -> {key: value} for keys without a column
+        self._symbol_ids = {}    # option_symbol -> symbol id
+        self._symbols = []       # symbol id -> option_symbol
+        self.version = 0         # Bumped when rows are added / removed or a row's contract changes
+
+    def _grow(self, capacity):
+        """Reallocate the arrays with room for `capacity` rows (keeps the first n)"""
+        n = self._n
+        for key, column in self.floats.items():
+            grown = np.full(capacity, np.nan)
+            grown[:n] = column[:n]
+            self.floats[key] = grown
+        for name in ('lot_size', 'side', 'status', 'symbol_id'):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:n] = column[:n]
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    # ------------------------------------------------------------------
+    # Mapping interface (stock -> PositionView)
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, stock):
+        if stock not in self._rows:
+            raise KeyError(stock)
+        return PositionView(self, stock)
+
+    def __setitem__(self, stock, record):
+        record = dict(record)
+        with self._lock:
+            row = self._rows.get(stock)
+            if row is None:
+                if self._n == self.capacity:
+                    self._grow(self.capacity * 2)
+                row = self._n
+                self._stocks.append(stock)
+                for column in self.objects.values():
+                    column.append(_MISSING)
+                for column in (self.lot_size, self.side, self.status, self.symbol_id):
+                    column[row] = 0
+            else:
+                self._overflow.pop(row, None)
+                for column in self.floats.values():
+                    column[row] = np.nan
+                for column in self.objects.values():
+                    column[row] = _MISSING
+            for key, value in record.items():
+                self._set_row(row, key, value)
+            # Published last: neither the [:n] array readers nor _rows lookups see a half-written row
+            if row == self._n:
+                self._n += 1
+            self._rows[stock] = row
+            self.version += 1
+
+    def __delitem__(self, stock):
+        with self._lock:
+            row = self._rows.pop(stock)
+            last = self._n - 1
+            if row != last:
+                # Move the last row into the hole
+                moved = self._stocks[last]
+                for column in self.floats.values():
+                    column[row] = column[last]
+                for column in (self.lot_size, self.side, self.status, self.symbol_id):
+                    column[row] = column[last]
+                for column in self.objects.values():
+                    column[row] = column[last]
+                self._stocks[row] = moved
+                overflow = self._overflow.pop(last, None)
+                if overflow is None:
+                    self._overflow.pop(row, None)
+                else:
+                    self._overflow[row] = overflow
+                self._rows[moved] = row
+            else:
+                self._overflow.pop(row, None)
+            self._stocks.pop()
+            for column in self.objects.values():
+                column.pop()
+            for column in self.floats.values():
+                column[last] = np.nan
+            self._n -= 1
+            self.version += 1
+
+    def __iter__(self):
+        return iter(list(self._rows))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, stock):
+        return stock in self._rows
+
+    def to_dict(self, stock):
+        """Plain dict copy of one position (for the journal / JSON)"""
+        return dict(PositionView(self, stock))
+
+    # ------------------------------------------------------------------
+    # Column access
+    # ------------------------------------------------------------------
+
+    def _set_row(self, row, key, value):
+        if key in self.floats:
+            self.floats[key][row] = np.nan if value is None else float(value)
+        elif key in self.objects:
+            self.objects[key][row] = _MISSING if value is None else value
+        elif key == 'lot_size':
+            self.lot_size[row] = int(value or 0)
+        elif key == 'type':
+            self.side[row] = SIDES.index(value)
+        elif key == 'status':
+            self.status[row] = STATUSES.index(value)
+        elif key == 'option_symbol':
+            sid = self._symbol_ids.get(value)
+            if sid is None:
+                sid = self._symbol_ids[value] = len(self._symbols)
+                self._symbols.append(value)
+            self.symbol_id[row] = sid
+        elif value is None:
+            self._overflow.get(row, {}).pop(key, None)
+        else:
+            self._overflow.setdefault(row, {})[key] = value
+
+    def _get(self, stock, key):
+        row = self._rows[stock]
+        if key in self.floats:
+            value = self.floats[key][row]
+            if value != value:  # NaN
+                raise KeyError(key)
+            return float(value)
+        if key in self.objects:
+            value = self.objects[key][row]
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if key == 'lot_size':
+            return int(self.lot_size[row])
+        if key == 'type':
+            return SIDES[self.side[row]]
+        if key == 'status':
+            return STATUSES[self.status[row]]
+        if key == 'option_symbol':
+            return self._symbols[self.symbol_id[row]]
+        return self._overflow.get(row, {})[key]
+
+    def _set(self, stock, key, value):
+        with self._lock:
+            self._set_row(self._rows[stock], key, value)
+            if key in CONTRACT_KEYS:
+                self.version += 1
+
+    def _keys(self, stock):
+        row = self._rows[stock]
+        keys = list(BASE_KEYS)
+        keys.extend(key for key, column in self.floats.items() if column[row] == column[row])
+        keys.extend(key for key, column in self.objects.items() if column[row] is not _MISSING)
+        keys.extend(self._overflow.get(row, ()))
+        return keys
+
+    # ------------------------------------------------------------------
+    # Vectorized views
+    # ------------------------------------------------------------------
+
+    def stocks(self):
+        """Stocks in row order (matches the column arrays)"""
+        return self._stocks[:self._n]
+
+    def option_symbols(self):
+        """Option symbols in row order"""
+        symbols = self._symbols
+        return [symbols[sid] for sid in self.symbol_id[:self._n]]
+
+    def rows_with_status(self, status):
+        """Row indices of positions in a status (e.g. 'RUNNING')"""
+        return np.flatnonzero(self.status[:self._n] == STATUSES.index(status))
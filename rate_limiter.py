@@ -1,13 +1,35 @@
 """
 Rate Limiter for Fyers API
 Manages API call limits: 10/sec, 200/min, 100,000/day
+
+The budget belongs to the account, not the process: SharedRateLimiter keeps
+the call history in a memory-mapped file so the dashboard, the strategy and
+every diagnostic script draw from one budget (RATE_LIMIT_CONFIG).
 """
 
+import os
 import time
+import mmap
+import struct
+import asyncio
+import functools
+import contextlib
 from datetime import datetime, timedelta
 from collections import deque
 import threading
 
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, limiter stays per process
+    fcntl = None
+
+import tracing
+from log_pipeline import get_logger
+from metrics import API_LATENCY, API_CALLS, RATE_LIMIT_WAIT, QUOTE_CACHE, endpoint_name, response_status
+from request_guard import create_request_guard, request_data
+
+log = get_logger('rate_limiter')
+
 class FyersRateLimiter:
     """
     Rate limiter to ensure Fyers API limits are not exceeded
@@ -17,26 +39,37 @@ class FyersRateLimiter:
     - 100,000 calls per day
     """
     
-    def __init__(self):
+    def __init__(self, clock=None, limit_per_second=8, limit_per_minute=180, limit_per_day=90000):
+        """
+        Args:
+            clock: Optional clock (defaults to the wall clock; SimulatedClock for replay)
+            limit_per_second, limit_per_minute, limit_per_day: Call budgets
+                (defaults are the limits adjusted as per user request)
+        """
+        from clock import get_clock
+        self.clock = clock or get_clock()
         self.lock = threading.Lock()
         
         # Track API calls with timestamps (maxlen adjusted to limits)
-        self.calls_per_second = deque(maxlen=8)
-        self.calls_per_minute = deque(maxlen=180)
-        self.calls_per_day = deque(maxlen=90000)
+        self.calls_per_second = deque(maxlen=limit_per_second)
+        self.calls_per_minute = deque(maxlen=limit_per_minute)
+        self.calls_per_day = deque(maxlen=limit_per_day)
         
-        # Limits (Adjusted as per user request)
-        self.LIMIT_PER_SECOND = 8
-        self.LIMIT_PER_MINUTE = 180
-        self.LIMIT_PER_DAY = 90000
+        # Limits
+        self.LIMIT_PER_SECOND = limit_per_second
+        self.LIMIT_PER_MINUTE = limit_per_minute
+        self.LIMIT_PER_DAY = limit_per_day
         
         # Statistics
         self.total_calls_today = 0
-        self.last_reset = datetime.now().date()
+        self.last_reset = self.clock.now().date()
+        
+        # Answers requests that cannot succeed without spending a call
+        self.guard = create_request_guard(self.clock)
         
     def _clean_old_calls(self):
         """Remove old timestamps that are outside the time windows"""
-        now = time.time()
+        now = self.clock.time()
         
         # Clean calls older than 1 second
         while self.calls_per_second and now - self.calls_per_second[0] > 1:
@@ -52,7 +85,7 @@ class FyersRateLimiter:
     
     def _reset_daily_counter(self):
         """Reset daily counter if it's a new day"""
-        today = datetime.now().date()
+        today = self.clock.now().date()
         if today > self.last_reset:
             self.calls_per_day.clear()
             self.total_calls_today = 0
@@ -85,16 +118,46 @@ class FyersRateLimiter:
         Blocks until rate limit allows
         """
         while not self.can_make_call():
-            time.sleep(0.1)  # Wait 100ms before checking again
+            self.clock.sleep(0.1)  # Wait 100ms before checking again
+    
+    def _record_locked(self):
+        now = self.clock.time()
+        self.calls_per_second.append(now)
+        self.calls_per_minute.append(now)
+        self.calls_per_day.append(now)
+        self.total_calls_today += 1
     
     def record_call(self):
         """Record that an API call was made"""
         with self.lock:
-            now = time.time()
-            self.calls_per_second.append(now)
-            self.calls_per_minute.append(now)
-            self.calls_per_day.append(now)
-            self.total_calls_today += 1
+            self._record_locked()
+    
+    def try_acquire(self):
+        """
+        Atomically check the limits and reserve one call if they allow it
+        
+        Unlike can_make_call() + record_call(), no other thread can take the
+        slot in between, so concurrent workers never overshoot the limits.
+        
+        Returns:
+            float: 0 if the call was reserved, otherwise seconds to wait before retrying
+        """
+        with self.lock:
+            self._clean_old_calls()
+            self._reset_daily_counter()
+            wait = self._wait_time_locked()
+            if wait <= 0:
+                self._record_locked()
+                return 0
+            return wait
+    
+    def acquire(self):
+        """Block until one call has been reserved"""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            self.clock.sleep(max(wait, 0.001))
     
     def make_call(self, api_function, *args, **kwargs):
         """
@@ -107,9 +170,29 @@ class FyersRateLimiter:
         Returns:
             Result of the API call
         """
-        self.wait_if_needed()
-        self.record_call()
-        return api_function(*args, **kwargs)
+        endpoint = endpoint_name(api_function)
+        if self.guard is not None:
+            data = request_data(args, kwargs)
+            blocked = self.guard.check(endpoint, data)
+            if blocked is not None:
+                return blocked
+        started = time.perf_counter()
+        with tracing.span('rate_limit_wait', cat='limiter'):
+            self.acquire()
+        sent = time.perf_counter()
+        RATE_LIMIT_WAIT.observe(sent - started)
+        try:
+            with tracing.span(endpoint, cat='api', symbol=tracing.request_symbol(args)):
+                response = api_function(*args, **kwargs)
+        except Exception:
+            API_CALLS.inc(endpoint=endpoint, status='exception')
+            raise
+        finally:
+            API_LATENCY.observe(time.perf_counter() - sent, endpoint=endpoint)
+        API_CALLS.inc(endpoint=endpoint, status=response_status(response))
+        if self.guard is not None:
+            self.guard.observe(endpoint, data, response)
+        return response
     
     def get_stats(self):
         """
@@ -135,7 +218,8 @@ class FyersRateLimiter:
                 'percent_used_second': (len(self.calls_per_second) / self.LIMIT_PER_SECOND) * 100,
                 'percent_used_minute': (len(self.calls_per_minute) / self.LIMIT_PER_MINUTE) * 100,
                 'percent_used_day': (len(self.calls_per_day) / self.LIMIT_PER_DAY) * 100,
-                'last_reset': self.last_reset.isoformat()
+                'last_reset': self.last_reset.isoformat(),
+                'guard': self.guard.get_stats() if self.guard is not None else None
             }
     
     def get_wait_time(self):
@@ -147,25 +231,208 @@ class FyersRateLimiter:
         """
         with self.lock:
             self._clean_old_calls()
-            
-            wait_times = []
-            
-            # Check second limit
-            if len(self.calls_per_second) >= self.LIMIT_PER_SECOND:
-                oldest = self.calls_per_second[0]
-                wait_times.append(1 - (time.time() - oldest))
-            
-            # Check minute limit
-            if len(self.calls_per_minute) >= self.LIMIT_PER_MINUTE:
-                oldest = self.calls_per_minute[0]
-                wait_times.append(60 - (time.time() - oldest))
-            
-            # Check day limit
-            if len(self.calls_per_day) >= self.LIMIT_PER_DAY:
-                oldest = self.calls_per_day[0]
-                wait_times.append(86400 - (time.time() - oldest))
-            
-            return max(wait_times) if wait_times else 0
+            return self._wait_time_locked()
+    
+    def _wait_time_locked(self):
+        wait_times = []
+        now = self.clock.time()
+        
+        # Check second limit
+        if len(self.calls_per_second) >= self.LIMIT_PER_SECOND:
+            oldest = self.calls_per_second[0]
+            wait_times.append(1 - (now - oldest))
+        
+        # Check minute limit
+        if len(self.calls_per_minute) >= self.LIMIT_PER_MINUTE:
+            oldest = self.calls_per_minute[0]
+            wait_times.append(60 - (now - oldest))
+        
+        # Check day limit
+        if len(self.calls_per_day) >= self.LIMIT_PER_DAY:
+            oldest = self.calls_per_day[0]
+            wait_times.append(86400 - (now - oldest))
+        
+        # A full window whose oldest call just expired still needs a tiny wait
+        return max(max(wait_times), 0.001) if wait_times else 0
+
+
+class SharedRateLimiter(FyersRateLimiter):
+    """
+    FyersRateLimiter whose call history is shared by every process on the
+    machine (strategy, dashboard, order_manager.py, test scripts...)
+
+    The state lives in a small memory-mapped file: a ring of the last
+    LIMIT_PER_SECOND call times, a ring of the last LIMIT_PER_MINUTE call
+    times and the day's call count. Each check-and-reserve holds an
+    exclusive flock on the file, so reservations are atomic across
+    processes. Times are wall-clock epoch seconds (live trading only;
+    replays keep a private FyersRateLimiter on their session clock).
+    """
+
+    MAGIC = b'FYRL0001'
+    # magic, per-second limit, per-minute limit, day (YYYYMMDD), day count, second head, minute head
+    HEADER = struct.Struct('<8sIIIQII')
+
+    def __init__(self, path, clock=None, limit_per_second=8, limit_per_minute=180, limit_per_day=90000):
+        """
+        Args:
+            path: State file (created if missing; reset if its limits differ)
+            clock, limit_per_second, limit_per_minute, limit_per_day: As FyersRateLimiter
+        """
+        super().__init__(clock=clock, limit_per_second=limit_per_second,
+                         limit_per_minute=limit_per_minute, limit_per_day=limit_per_day)
+        self.path = path
+        self._seconds_at = self.HEADER.size
+        self._minutes_at = self._seconds_at + 8 * limit_per_second
+        size = self._minutes_at + 8 * limit_per_minute
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._flock():
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+            magic, per_second, per_minute = self.HEADER.unpack_from(self._map, 0)[:3]
+            if (magic, per_second, per_minute) != (self.MAGIC, limit_per_second, limit_per_minute):
+                self._map[:] = bytes(size)
+                self.HEADER.pack_into(self._map, 0, self.MAGIC, limit_per_second, limit_per_minute,
+                                      self._day_key(), 0, 0, 0)
+
+    @contextlib.contextmanager
+    def _flock(self):
+        """Exclusive lock across processes (threads of this process also hold self.lock)"""
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _day_key(self):
+        today = self.clock.now().date()
+        return today.year * 10000 + today.month * 100 + today.day
+
+    def _read(self):
+        """(day count, second head, minute head) with the day rolled over if needed"""
+        _, _, _, day, count, head_s, head_m = self.HEADER.unpack_from(self._map, 0)
+        today = self._day_key()
+        if day != today:
+            count = 0
+            self.HEADER.pack_into(self._map, 0, self.MAGIC, self.LIMIT_PER_SECOND, self.LIMIT_PER_MINUTE,
+                                  today, 0, head_s, head_m)
+        if self.last_reset != self.clock.now().date():
+            self.last_reset = self.clock.now().date()
+            self.total_calls_today = 0
+        return count, head_s, head_m
+
+    def _slot(self, offset, index):
+        return struct.unpack_from('<d', self._map, offset + 8 * index)[0]
+
+    def _wait_shared(self, now, count, head_s, head_m):
+        """Seconds until a call is allowed (0 = now); the oldest call in each ring sits at its head"""
+        waits = []
+        oldest = self._slot(self._seconds_at, head_s)
+        if now - oldest <= 1:
+            waits.append(1 - (now - oldest))
+        oldest = self._slot(self._minutes_at, head_m)
+        if now - oldest <= 60:
+            waits.append(60 - (now - oldest))
+        if count >= self.LIMIT_PER_DAY:
+            tomorrow = datetime.combine(self.clock.now().date() + timedelta(days=1), datetime.min.time())
+            waits.append((tomorrow - self.clock.now()).total_seconds())
+        return max(max(waits), 0.001) if waits else 0
+
+    def _record_shared(self, now, count, head_s, head_m):
+        struct.pack_into('<d', self._map, self._seconds_at + 8 * head_s, now)
+        struct.pack_into('<d', self._map, self._minutes_at + 8 * head_m, now)
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, self.LIMIT_PER_SECOND, self.LIMIT_PER_MINUTE,
+                              self._day_key(), count + 1,
+                              (head_s + 1) % self.LIMIT_PER_SECOND, (head_m + 1) % self.LIMIT_PER_MINUTE)
+        self.total_calls_today += 1
+
+    def try_acquire(self):
+        """
+        Atomically (across processes) check the limits and reserve one call
+
+        Returns:
+            float: 0 if the call was reserved, otherwise seconds to wait before retrying
+        """
+        with self.lock, self._flock():
+            now = self.clock.time()
+            state = self._read()
+            wait = self._wait_shared(now, *state)
+            if wait <= 0:
+                self._record_shared(now, *state)
+                return 0
+            return wait
+
+    def can_make_call(self):
+        return self.get_wait_time() <= 0
+
+    def record_call(self):
+        """Record a call made without try_acquire (counts against the shared budget)"""
+        with self.lock, self._flock():
+            self._record_shared(self.clock.time(), *self._read())
+
+    def get_wait_time(self):
+        with self.lock, self._flock():
+            return self._wait_shared(self.clock.time(), *self._read())
+
+    def get_stats(self):
+        """Usage across all processes (calls_this_process: this process's share today)"""
+        with self.lock, self._flock():
+            now = self.clock.time()
+            count, _, _ = self._read()
+            seconds = [self._slot(self._seconds_at, i) for i in range(self.LIMIT_PER_SECOND)]
+            minutes = [self._slot(self._minutes_at, i) for i in range(self.LIMIT_PER_MINUTE)]
+        last_second = sum(1 for t in seconds if now - t <= 1)
+        last_minute = sum(1 for t in minutes if now - t <= 60)
+        return {
+            'calls_last_second': last_second,
+            'calls_last_minute': last_minute,
+            'calls_today': count,
+            'calls_this_process': self.total_calls_today,
+            'limit_per_second': self.LIMIT_PER_SECOND,
+            'limit_per_minute': self.LIMIT_PER_MINUTE,
+            'limit_per_day': self.LIMIT_PER_DAY,
+            'remaining_second': self.LIMIT_PER_SECOND - last_second,
+            'remaining_minute': self.LIMIT_PER_MINUTE - last_minute,
+            'remaining_day': self.LIMIT_PER_DAY - count,
+            'percent_used_second': (last_second / self.LIMIT_PER_SECOND) * 100,
+            'percent_used_minute': (last_minute / self.LIMIT_PER_MINUTE) * 100,
+            'percent_used_day': (count / self.LIMIT_PER_DAY) * 100,
+            'last_reset': self.last_reset.isoformat(),
+            'guard': self.guard.get_stats() if self.guard is not None else None,
+            'shared': self.path
+        }
+
+
+class RateLimitedClient:
+    """
+    Wraps a Fyers client so every API method goes through a rate limiter
+    (for scripts and one-off calls; the strategy calls make_call itself)
+
+    Usage:
+        fyers = RateLimitedClient(create_fyers_client(client_id, access_token))
+        fyers.quotes({"symbols": "NSE:SBIN-EQ"})
+    """
+
+    API_METHODS = frozenset({
+        'get_profile', 'funds', 'holdings', 'positions', 'orderbook', 'tradebook',
+        'quotes', 'depth', 'history', 'market_status',
+        'place_order', 'modify_order', 'cancel_order', 'exit_positions'
+    })
+
+    def __init__(self, fyers, rate_limiter=None):
+        self.fyers = fyers
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+
+    def __getattr__(self, name):
+        attr = getattr(self.fyers, name)
+        if name in self.API_METHODS and callable(attr):
+            return functools.partial(self.rate_limiter.make_call, attr)
+        return attr
 
 
 class BatchAPIManager:
@@ -190,15 +457,17 @@ class BatchAPIManager:
         Returns:
             Cached or fresh data
         """
-        now = time.time()
+        now = self.rate_limiter.clock.time()
         
         # Check cache
         if key in self.cache:
             cached_data, timestamp = self.cache[key]
             if now - timestamp < self.cache_duration:
+                QUOTE_CACHE.inc(result='hit')
                 return cached_data
         
         # Fetch fresh data
+        QUOTE_CACHE.inc(result='miss')
         data = self.rate_limiter.make_call(fetch_function, *args, **kwargs)
         self.cache[key] = (data, now)
         return data
@@ -238,24 +507,124 @@ class BatchAPIManager:
                         quotes[symbol] = quote_data['v']
                 
                 # Small delay between batches
-                time.sleep(0.2)
+                self.rate_limiter.clock.sleep(0.2)
                 
             except Exception as e:
-                print(f"Error fetching batch quotes: {e}")
+                log.error(f"Error fetching batch quotes: {e}")
         
         return quotes
 
 
-# Global rate limiter instance
-global_rate_limiter = FyersRateLimiter()
-global_batch_manager = BatchAPIManager(global_rate_limiter)
+class AsyncRateLimiter:
+    """
+    asyncio front-end for FyersRateLimiter
+    Shares the same call budget as the threaded limiter it wraps, so async
+    and threaded callers in one process can never exceed the limits together.
+    Waiting is done with asyncio.sleep, never by blocking the event loop.
+    """
+    
+    def __init__(self, rate_limiter=None):
+        """
+        Args:
+            rate_limiter: FyersRateLimiter whose budget is shared (defaults to the global one)
+        """
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+    
+    async def acquire(self):
+        """Wait (without blocking the loop) until one call has been reserved"""
+        speed = getattr(self.rate_limiter.clock, 'speed', 1.0)
+        while True:
+            wait = self.rate_limiter.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(max(wait, 0.001) / speed)
+    
+    async def make_call(self, api_coroutine_function, *args, **kwargs):
+        """
+        Execute an async API call with rate limiting
+        
+        Args:
+            api_coroutine_function: Coroutine function to call
+            *args, **kwargs: Arguments to pass to the function
+            
+        Returns:
+            Result of the API call
+        """
+        endpoint = endpoint_name(api_coroutine_function)
+        guard = self.rate_limiter.guard
+        if guard is not None:
+            data = request_data(args, kwargs)
+            blocked = guard.check(endpoint, data)
+            if blocked is not None:
+                return blocked
+        started = time.perf_counter()
+        with tracing.span('rate_limit_wait', cat='limiter'):
+            await self.acquire()
+        sent = time.perf_counter()
+        RATE_LIMIT_WAIT.observe(sent - started)
+        try:
+            with tracing.span(endpoint, cat='api', symbol=tracing.request_symbol(args)):
+                response = await api_coroutine_function(*args, **kwargs)
+        except Exception:
+            API_CALLS.inc(endpoint=endpoint, status='exception')
+            raise
+        finally:
+            API_LATENCY.observe(time.perf_counter() - sent, endpoint=endpoint)
+        API_CALLS.inc(endpoint=endpoint, status=response_status(response))
+        if guard is not None:
+            guard.observe(endpoint, data, response)
+        return response
+    
+    def get_stats(self):
+        """Get current API usage statistics (shared with the threaded limiter)"""
+        return self.rate_limiter.get_stats()
+
+
+def create_rate_limiter():
+    """
+    The live limiter: shared across processes when RATE_LIMIT_CONFIG["SHARED"]
+    is on and the platform has flock, otherwise per process
+    """
+    from config import RATE_LIMIT_CONFIG
+    if RATE_LIMIT_CONFIG.get('SHARED', True):
+        path = RATE_LIMIT_CONFIG.get('STATE_FILE', 'state/fyers_rate_limit.bin')
+        if not os.path.isabs(path):
+            # Same file whatever directory a script is started from
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        if fcntl is None:
+            log.warning("⚠️ Shared rate limiter needs fcntl.flock - limiting per process only")
+        else:
+            try:
+                return SharedRateLimiter(path)
+            except OSError as e:
+                log.warning(f"⚠️ Shared rate limiter unavailable ({e}) - limiting per process only")
+    return FyersRateLimiter()
+
+
+# Global instances, created on first use so importing this module does not
+# create or map the shared state file
+_rate_limiter = None
+_batch_manager = None
+_global_lock = threading.Lock()
 
 
 def get_rate_limiter():
-    """Get the global rate limiter instance"""
-    return global_rate_limiter
+    """Get the global rate limiter instance (created on first use)"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _global_lock:
+            if _rate_limiter is None:
+                _rate_limiter = create_rate_limiter()
+    return _rate_limiter
 
 
 def get_batch_manager():
-    """Get the global batch manager instance"""
-    return global_batch_manager
+    """Get the global batch manager instance (created on first use)"""
+    global _batch_manager
+    if _batch_manager is None:
+        limiter = get_rate_limiter()
+        with _global_lock:
+            if _batch_manager is None:
+                _batch_manager = BatchAPIManager(limiter)
+    return _batch_manager
+
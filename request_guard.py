@@ -0,0 +1,240 @@
+"""
+Request Guard for Fyers Market-Data Calls
+Keeps requests that can only fail from spending rate-limited API calls:
+
+1. Pre-flight validation: history / quotes parameters are checked locally
+   (symbol format, resolution, date_format vs range_from/range_to, range
+   span, symbols per request) and a malformed request is answered with the
+   same -50 "Invalid input" response the API would have returned.
+2. Negative cache: deterministic failures the API does return (-50 invalid
+   input, -300 invalid symbol) are remembered per request signature until
+   the end of the trading day, so repeats cost no call and no latency.
+
+Rate-limit (429), auth (-16) and network errors are never cached - they can
+succeed on retry. Orders are never guarded.
+
+Usage (wired into FyersRateLimiter.make_call):
+    response = limiter.guard.check('history', data)   # None = go ahead
+    ...
+    limiter.guard.observe('history', data, response)
+"""
+
+import re
+import json
+import threading
+from datetime import datetime
+
+from log_pipeline import get_logger
+from metrics import REQUEST_GUARD
+
+log = get_logger('request_guard')
+
+# Endpoints the guard looks at (market data only - orders always go out)
+GUARDED_ENDPOINTS = frozenset({'history', 'quotes'})
+
+# Fyers error codes that fail the same way on every retry
+DETERMINISTIC_CODES = frozenset({-50, -300})
+
+HISTORY_RESOLUTIONS = ('5S', '10S', '15S', '30S', '45S',
+                       '1', '2', '3', '5', '10', '15', '20', '30', '45', '60', '120', '180', '240',
+                       'D', '1D')
+DAILY_RESOLUTIONS = ('D', '1D')
+MAX_INTRADAY_DAYS = 100     # Longest range the API serves per intraday request
+MAX_DAILY_DAYS = 366        # ... and per daily request
+MAX_QUOTE_SYMBOLS = 50
+
+SYMBOL_PATTERN = re.compile(r'^[A-Z]+:[A-Z0-9&_\-]+$')
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def invalid_input(field, reason):
+    """The API's -50 response for a parameter that fails validation"""
+    return {"s": "error", "code": -50, "message": "Invalid input", "data": {field: reason}}
+
+
+def request_data(args, kwargs):
+    """The request dict of a client call (positional or data=)"""
+    if 'data' in kwargs:
+        return kwargs['data']
+    return args[0] if args else None
+
+
+def _epoch(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_history(data):
+    """
+    Check /history parameters the way the API does
+
+    Returns:
+        dict: The error response the API would return, or None if valid
+    """
+    if not isinstance(data, dict):
+        return invalid_input('data', 'history request must be a dict')
+    symbol = data.get('symbol')
+    if not isinstance(symbol, str) or not SYMBOL_PATTERN.match(symbol):
+        return invalid_input('symbol', f"invalid symbol format: {symbol!r}")
+    resolution = str(data.get('resolution', ''))
+    if resolution not in HISTORY_RESOLUTIONS:
+        return invalid_input('resolution', f"invalid resolution: {resolution!r}")
+
+    date_format = str(data.get('date_format', '0'))
+    range_from, range_to = data.get('range_from'), data.get('range_to')
+    if date_format == '1':
+        if not (isinstance(range_from, str) and DATE_PATTERN.match(range_from)
+                and isinstance(range_to, str) and DATE_PATTERN.match(range_to)):
+            return invalid_input('date_format', "date timestamps (YYYY-MM-DD) needed for range_from and "
+                                                "range_to since date_format is 1")
+        try:
+            start = datetime.strptime(range_from, "%Y-%m-%d").timestamp()
+            end = datetime.strptime(range_to, "%Y-%m-%d").timestamp()
+        except ValueError:
+            return invalid_input('date_format', f"invalid date: {range_from} / {range_to}")
+    elif date_format == '0':
+        start, end = _epoch(range_from), _epoch(range_to)
+        if start is None or end is None:
+            return invalid_input('date_format', "epoch timestamps needed for range_from and "
+                                                "range_to since date_format is 0")
+    else:
+        return invalid_input('date_format', f"date_format must be 0 or 1, got {date_format!r}")
+
+    if start > end:
+        return invalid_input('range_from', "range_from is after range_to")
+    max_days = MAX_DAILY_DAYS if resolution in DAILY_RESOLUTIONS else MAX_INTRADAY_DAYS
+    if end - start > max_days * 86400:
+        return invalid_input('range_to', f"range longer than {max_days} days for resolution {resolution}")
+    return None
+
+
+def validate_quotes(data):
+    """
+    Check /quotes parameters
+
+    Returns:
+        dict: The error response the API would return, or None if valid
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('symbols'), str):
+        return invalid_input('symbols', 'symbols must be a comma-separated string')
+    symbols = [s for s in data['symbols'].split(',') if s]
+    if not symbols:
+        return invalid_input('symbols', 'no symbols requested')
+    if len(symbols) > MAX_QUOTE_SYMBOLS:
+        return invalid_input('symbols', f"{len(symbols)} symbols requested, at most {MAX_QUOTE_SYMBOLS} allowed")
+    bad = [s for s in symbols if not SYMBOL_PATTERN.match(s)]
+    if bad:
+        return invalid_input('symbols', f"invalid symbol format: {', '.join(bad)}")
+    return None
+
+
+VALIDATORS = {
+    'history': validate_history,
+    'quotes': validate_quotes,
+}
+
+
+class RequestGuard:
+    """
+    Pre-flight validation plus a per-day negative cache of deterministic
+    failures (one per rate limiter, so replay and live never share entries)
+    """
+
+    def __init__(self, clock=None, max_entries=10000):
+        """
+        Args:
+            clock: Session clock (the negative cache is cleared when the day changes)
+            max_entries: Negative-cache size cap (oldest entries are dropped first)
+        """
+        from clock import get_clock
+        self.clock = clock or get_clock()
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._failures = {}   # signature -> error response
+        self._day = self.clock.now().date()
+        self.preflight_rejected = 0
+        self.cache_hits = 0
+
+    @staticmethod
+    def signature(endpoint, data):
+        """Stable key for a request"""
+        return endpoint + ':' + json.dumps(data, sort_keys=True, default=str)
+
+    def _roll_day(self):
+        today = self.clock.now().date()
+        if today != self._day:
+            self._failures.clear()
+            self._day = today
+
+    def check(self, endpoint, data):
+        """
+        Answer a request locally if it cannot succeed
+
+        Returns:
+            dict: Error response to return instead of calling the API, or None
+        """
+        if endpoint not in GUARDED_ENDPOINTS:
+            return None
+        key = self.signature(endpoint, data)
+        with self.lock:
+            self._roll_day()
+            cached = self._failures.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+        if cached is not None:
+            REQUEST_GUARD.inc(endpoint=endpoint, reason='cached')
+            return cached
+
+        error = VALIDATORS[endpoint](data)
+        if error is None:
+            return None
+        with self.lock:
+            self.preflight_rejected += 1
+            self._remember(key, error)
+        REQUEST_GUARD.inc(endpoint=endpoint, reason='preflight')
+        log.warning(f"🚫 Blocked invalid {endpoint} request before sending: {error['data']}")
+        return error
+
+    def _remember(self, key, response):
+        """Cache a failure (lock held)"""
+        if len(self._failures) >= self.max_entries:
+            self._failures.pop(next(iter(self._failures)))
+        self._failures[key] = response
+
+    def observe(self, endpoint, data, response):
+        """Remember a deterministic failure for the rest of the day"""
+        if endpoint not in GUARDED_ENDPOINTS or not isinstance(response, dict):
+            return
+        if response.get('s') != 'error' or response.get('code') not in DETERMINISTIC_CODES:
+            return
+        key = self.signature(endpoint, data)
+        with self.lock:
+            self._roll_day()
+            if key in self._failures:
+                return
+            self._remember(key, response)
+        log.warning(f"🚫 {endpoint} failed with {response.get('code')} ({response.get('message')}) - "
+                    f"identical requests are answered locally for the rest of the day")
+
+    def clear(self):
+        """Forget every cached failure (e.g. after fixing the symbol list)"""
+        with self.lock:
+            self._failures.clear()
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'preflight_rejected': self.preflight_rejected,
+                'negative_cache_hits': self.cache_hits,
+                'negative_cache_size': len(self._failures)
+            }
+
+
+def create_request_guard(clock=None):
+    """A guard configured from REQUEST_GUARD_CONFIG (None when disabled)"""
+    from config import REQUEST_GUARD_CONFIG
+    if not REQUEST_GUARD_CONFIG.get('ENABLED', True):
+        return None
+    return RequestGuard(clock=clock, max_entries=REQUEST_GUARD_CONFIG.get('MAX_ENTRIES', 10000))
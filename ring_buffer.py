@@ -0,0 +1,113 @@
+"""
+Fixed-Capacity Ring Buffer with Sequence Numbers
+Backs the activity logs (strategy.log_activity and the dashboard's add_log).
+Appends are O(1) and never copy the kept entries; every entry gets a
+monotonically increasing sequence number so readers can ask for just the
+entries after the last one they saw (/api/logs?since=N).
+
+Entries that fall off the end can be spilled to disk via the optional
+`spill` callback (the activity logs use the log pipeline's per-day file).
+"""
+
+import threading
+
+
+class RingBuffer:
+    """
+    Bounded, sequence-numbered log of entries (oldest overwritten first)
+
+    Usage:
+        buffer = RingBuffer(1000)
+        seq = buffer.append({'time': '09:18:00', 'message': 'Scan started'})
+        new_entries = buffer.since(seq - 10)
+        newest_first = buffer.latest(50)
+    """
+
+    def __init__(self, capacity, spill=None):
+        """
+        Args:
+            capacity: Entries kept in memory
+            spill: Optional callable(entry) run on every append (e.g. write to disk)
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.spill = spill
+        self._slots = [None] * capacity
+        self._seq = 0                # Sequence number of the newest entry
+        self._lock = threading.Lock()
+        self._latest = (0, 0, [])    # (seq, n, newest-first list) from the last latest() call
+
+    @property
+    def last_seq(self):
+        """Sequence number of the newest entry (0 when empty)"""
+        return self._seq
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest entry still kept"""
+        return max(1, self._seq - self.capacity + 1) if self._seq else 0
+
+    def __len__(self):
+        return min(self._seq, self.capacity)
+
+    def append(self, entry):
+        """
+        Add an entry (O(1))
+
+        Args:
+            entry: dict; a 'seq' key is set on it
+
+        Returns:
+            int: The entry's sequence number
+        """
+        with self._lock:
+            seq = self._seq + 1
+            entry['seq'] = seq
+            self._slots[seq % self.capacity] = entry
+            self._seq = seq
+        if self.spill is not None:
+            try:
+                self.spill(entry)
+            except Exception:
+                pass  # Spilling is best effort; the in-memory log is authoritative
+        return seq
+
+    def since(self, seq, limit=None):
+        """
+        Entries newer than `seq`, oldest first
+
+        Args:
+            seq: Last sequence number the caller has (0 for everything kept)
+            limit: Return at most this many (the newest ones)
+
+        Returns:
+            list: Entries; older ones may have been overwritten (check first_seq)
+        """
+        with self._lock:
+            last = self._seq
+            start = max(seq, last - self.capacity) + 1
+            if limit is not None:
+                start = max(start, last - limit + 1)
+            return [self._slots[s % self.capacity] for s in range(start, last + 1)]
+
+    def latest(self, n):
+        """
+        Newest `n` entries, newest first
+
+        The list is reused until something is appended, so polling an
+        unchanged buffer costs nothing. Treat it as read-only.
+        """
+        seq, size, cached = self._latest
+        if seq == self._seq and size == n:
+            return cached
+        with self._lock:
+            last = self._seq
+            stop = max(0, last - min(n, self.capacity))
+            entries = [self._slots[s % self.capacity] for s in range(last, stop, -1)]
+        self._latest = (last, n, entries)
+        return entries
+
+    def __iter__(self):
+        """Newest first (matches the old insert(0, ...) lists)"""
+        return iter(self.latest(self.capacity))
@@ -0,0 +1,89 @@
+"""
+Precise Scheduler for time-critical strategy events (e.g. the 9:18:10 scan)
+Sleeps coarsely until just before the target, then spin-waits the last few
+milliseconds against a monotonic clock so the trigger does not drift.
+"""
+
+
+def wait_until(clock, target, spin_seconds=0.005, max_chunk=30.0, stop_event=None):
+    """
+    Block until `target` (a datetime on the clock's timeline)
+
+    The remaining time is re-derived from the clock's wall time before every
+    coarse sleep (so clock adjustments during a long wait are honoured), and
+    the final `spin_seconds` are busy-waited on the monotonic clock.
+
+    Args:
+        clock: SystemClock / SimulatedClock
+        target: datetime to fire at
+        spin_seconds: Length of the final busy-wait window
+        max_chunk: Longest single coarse sleep
+        stop_event: Optional threading.Event; returning early if it gets set
+
+    Returns:
+        float: Fire-time skew in seconds (actual - target; positive = late),
+               or None if stopped early
+    """
+    while True:
+        remaining = (target - clock.now()).total_seconds()
+        if remaining <= spin_seconds:
+            break
+        chunk = min(remaining - spin_seconds, max_chunk)
+        if stop_event is not None:
+            # Event.wait is in real seconds; convert from session time
+            if stop_event.wait(chunk / getattr(clock, 'speed', 1.0)):
+                return None
+        else:
+            clock.sleep(chunk)
+
+    deadline = clock.monotonic() + (target - clock.now()).total_seconds()
+    while clock.monotonic() < deadline:
+        pass
+
+    return (clock.now() - target).total_seconds()
+
+
+def scan_target(clock, scan_time):
+    """
+    Today's scan datetime from a TRADING_CONFIG['SCAN_TIME'] dict
+
+    Args:
+        clock: Clock providing now()
+        scan_time: {'HOUR': 9, 'MINUTE': 18, 'SECOND': 10}
+    """
+    return clock.now().replace(
+        hour=scan_time['HOUR'],
+        minute=scan_time['MINUTE'],
+        second=scan_time.get('SECOND', 0),
+        microsecond=0
+    )
+
+
+def format_scan_time(scan_time):
+    """HH:MM:SS string for a TRADING_CONFIG['SCAN_TIME'] dict"""
+    return f"{scan_time['HOUR']:02d}:{scan_time['MINUTE']:02d}:{scan_time.get('SECOND', 0):02d}"
+
+
+async def wait_until_async(clock, target, spin_seconds=0.005, max_chunk=30.0, stop_event=None):
+    """
+    asyncio version of wait_until: coarse waits yield to the event loop and
+    only the final `spin_seconds` are busy-waited
+
+    Returns:
+        float: Fire-time skew in seconds (actual - target; positive = late),
+               or None if `stop_event` got set
+    """
+    import asyncio
+
+    speed = getattr(clock, 'speed', 1.0)
+    if stop_event is not None:
+        # threading.Event can't be awaited; poll it at least twice a second
+        max_chunk = min(max_chunk, 0.5 * speed)
+    while True:
+        if stop_event is not None and stop_event.is_set():
+            return None
+        remaining = (target - clock.now()).total_seconds()
+        if remaining <= spin_seconds:
+            break
+        await asyncio.sleep(min(remaining - spin_seconds, max_chunk) / speed)
+    return wait_until(clock, target, spin_seconds=spin_seconds)
@@ -0,0 +1,139 @@
+"""
+Production WSGI Serving for the Dashboard
+Serves app.py's Flask app on waitress (multi-threaded, no reloader or
+debugger) when it is installed, else on Werkzeug's threaded server with
+debug off. SIGTERM / Ctrl+C stop the strategy, end open /api/stream
+connections and then close the server.
+"""
+
+import signal
+import threading
+
+from config import SERVER_CONFIG
+
+
+class DashboardServer:
+    """
+    Thin wrapper over waitress / Werkzeug with the same start/stop interface
+
+    Usage:
+        server = DashboardServer(app, host='0.0.0.0', port=5000)
+        server.serve_forever()      # blocks until shutdown() is called
+    """
+
+    def __init__(self, app, host=None, port=None, threads=None, backend='auto'):
+        """
+        Args:
+            app: WSGI application
+            host: Interface to bind (default SERVER_CONFIG['HOST'])
+            port: Port to bind; 0 picks a free port (see .port)
+            threads: Request worker threads (waitress only)
+            backend: 'auto', 'waitress' or 'werkzeug'
+        """
+        host = host or SERVER_CONFIG.get('HOST', '0.0.0.0')
+        port = SERVER_CONFIG.get('PORT', 5000) if port is None else port
+        threads = threads or SERVER_CONFIG.get('THREADS', 16)
+        
+        self.backend = None
+        if backend in ('auto', 'waitress'):
+            try:
+                from waitress.server import create_server
+                self._server = create_server(app, host=host, port=port, threads=threads,
+                                             ident='fno-dashboard')
+                self.backend = 'waitress'
+            except ImportError:
+                if backend == 'waitress':
+                    raise
+        if self.backend is None:
+            from werkzeug.serving import make_server, WSGIRequestHandler
+            
+            class QuietHandler(WSGIRequestHandler):
+                # No access log line per request (the page polls every second)
+                def log_request(self, *args, **kwargs):
+                    pass
+            
+            self._server = make_server(host, port, app, threaded=True, request_handler=QuietHandler)
+            self.backend = 'werkzeug'
+        self.host = host
+        self.threads = threads
+
+    @property
+    def port(self):
+        """Bound port (useful with port=0)"""
+        if self.backend == 'waitress':
+            return self._server.effective_port
+        return self._server.server_port
+
+    def serve_forever(self):
+        """Serve requests until shutdown() is called"""
+        if self.backend == 'waitress':
+            self._server.run()
+        else:
+            self._server.serve_forever()
+
+    def shutdown(self):
+        """Stop accepting requests and close open connections (call from another thread)"""
+        if self.backend == 'waitress':
+            from waitress import wasyncore
+            self._server.task_dispatcher.shutdown()
+            wasyncore.close_all(self._server._map)
+        else:
+            self._server.shutdown()
+
+
+def start_background(dashboard, host=None, port=None, threads=None):
+    """
+    Start the server on a daemon thread (single-process mode, e.g. Android)
+
+    Args:
+        dashboard: The imported app module
+
+    Returns:
+        (DashboardServer, stop): stop() shuts the strategy and server down
+    """
+    server = DashboardServer(dashboard.app, host=host, port=port, threads=threads)
+    dashboard.limit_streams(server.threads)
+    threading.Thread(target=server.serve_forever, name='dashboard-server', daemon=True).start()
+    return server, _make_stop(dashboard, server)
+
+
+def serve(dashboard, host=None, port=None, threads=None):
+    """
+    Serve the dashboard in the foreground until SIGTERM / SIGINT
+
+    Args:
+        dashboard: The imported app module (pass sys.modules['__main__'] from app.py)
+    """
+    server = DashboardServer(dashboard.app, host=host, port=port, threads=threads)
+    dashboard.limit_streams(server.threads)
+    stop = _make_stop(dashboard, server)
+    
+    if threading.current_thread() is threading.main_thread():
+        # Shut down off the signal handler: Werkzeug's shutdown() waits for
+        # serve_forever(), which is running on this same thread
+        def on_signal(signum, frame):
+            threading.Thread(target=stop, name='dashboard-shutdown').start()
+        signal.signal(signal.SIGTERM, on_signal)
+        signal.signal(signal.SIGINT, on_signal)
+    
+    print(f"Serving on {server.host}:{server.port} ({server.backend}, {server.threads} threads)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        stop()
+    print("Server stopped")
+
+
+def _make_stop(dashboard, server):
+    """Idempotent shutdown: strategy first (so it stops trading), then the server"""
+    stopping = threading.Event()
+    
+    def stop():
+        if stopping.is_set():
+            return
+        stopping.set()
+        print("\nShutting down...")
+        dashboard.shutdown(SERVER_CONFIG.get('SHUTDOWN_TIMEOUT', 10))
+        server.shutdown()
+    
+    return stop
@@ -0,0 +1,265 @@
+"""
+Multi-process Sharded Scan
+Splits the 9:18 scan across worker processes so first-candle parsing and
+screening are not bound by one interpreter's GIL or one connection pool.
+
+- The coordinator (ShardedScanner, in the strategy's process) deals
+  STOCK_LIST round-robin into TRADING_CONFIG["SCAN_PROCESSES"] shards and
+  spawns one worker per shard during warm-up.
+- Workers fetch first candles for their shard and stream every qualifier
+  back the moment it screens; the coordinator quotes the options and places
+  the orders (journal, positions and order placement stay in one process).
+- Rate budget: a worker thread asks the coordinator for a token before each
+  API call. Tokens are handed out by the strategy's own FyersRateLimiter
+  (one 'scan-budget' thread), so workers and the coordinator's own order
+  calls share one budget and the account never exceeds the 8/180/90k caps.
+
+Wall time scales with processes while parsing / screening is the
+bottleneck; once the scan is waiting on tokens the API budget is the limit
+and extra processes stop helping.
+"""
+
+import queue
+import threading
+import multiprocessing
+import concurrent.futures
+
+from log_pipeline import get_logger
+
+log = get_logger('sharded_scan')
+
+# Counters workers report back (the coordinator owns the qualified_* ones)
+WORKER_COUNTERS = ('no_prev_day', 'no_first_candle', 'failed_conditions')
+
+
+def shard(stocks, count):
+    """Deal stocks round-robin into `count` shards (empty shards dropped)"""
+    return [shard for shard in (stocks[i::count] for i in range(count)) if shard]
+
+
+def client_spec(strategy):
+    """
+    Picklable description of the strategy's broker client so a worker can
+    build its own: the live Fyers API, or the same replay session and
+    session clock
+    """
+    session = getattr(strategy.fyers, 'session', None)
+    if session is not None and getattr(session, 'path', None):
+        return {
+            'kind': 'replay',
+            'session_file': session.path,
+            'latency_ms': getattr(strategy.fyers, 'latency', 0) * 1000,
+            'clock': strategy.clock.state()
+        }
+    return {'kind': 'live', 'client_id': strategy.client_id, 'access_token': strategy.access_token}
+
+
+def _build_client(spec):
+    """(fyers_client, clock) for a worker from client_spec()"""
+    if spec['kind'] == 'replay':
+        from clock import SimulatedClock
+        from fyers_replay import ReplaySession, SimulatedFyersModel
+        clock = SimulatedClock.from_state(spec['clock'])
+        session = ReplaySession.load(spec['session_file'])
+        return SimulatedFyersModel(session, clock, latency_ms=spec['latency_ms']), clock
+    from clock import get_clock
+    from fyers_client import create_fyers_client
+    return create_fyers_client(spec['client_id'], spec['access_token']), get_clock()
+
+
+class ShardedScanner:
+    """
+    Coordinator for one sharded scan
+
+    Usage:
+        scanner = ShardedScanner(strategy, processes=4)
+        scanner.start()            # warm-up: workers load caches, then wait
+        scanner.run(scan_results)  # trigger; entries are executed as they stream in
+        scanner.stop()
+    """
+
+    def __init__(self, strategy, processes):
+        """
+        Args:
+            strategy: The FnOTradingStrategy placing the orders
+            processes: Worker processes (shards)
+        """
+        self.strategy = strategy
+        self.shards = shard(list(strategy.stock_list), processes)
+        # spawn: a clean interpreter per worker, never a fork of this multi-threaded process
+        self._ctx = multiprocessing.get_context('spawn')
+        self._go = self._ctx.Event()
+        self._results = self._ctx.Queue()
+        self._token_requests = self._ctx.Queue()
+        self._grants = [self._ctx.Queue() for _ in self.shards]
+        self._processes = []
+        self._budget_thread = None
+        self.worker_stats = {}
+
+    def start(self):
+        """Spawn the workers and the token thread (idempotent)"""
+        if self._processes:
+            return
+        self._budget_thread = threading.Thread(target=self._serve_tokens, name='scan-budget', daemon=True)
+        self._budget_thread.start()
+
+        spec = client_spec(self.strategy)
+        workers = max(2, self.strategy.scan_workers // len(self.shards))
+        cache = self.strategy.prev_day_cache
+        for shard_id, stocks in enumerate(self.shards):
+            prev_day = {}
+            for stock in stocks:
+                symbol = self.strategy.get_symbol_format(stock)
+                if symbol in cache:
+                    prev_day[symbol] = cache[symbol]
+            process = self._ctx.Process(
+                target=_worker_main, name=f'scan-shard-{shard_id}', daemon=True,
+                args=(shard_id, stocks, prev_day, spec, workers,
+                      self._go, self._results, self._token_requests, self._grants[shard_id])
+            )
+            process.start()
+            self._processes.append(process)
+        log.info(f"🧩 Sharded scan: {sum(len(s) for s in self.shards)} stocks over {len(self.shards)} processes "
+                 f"({', '.join(str(len(s)) for s in self.shards)})")
+
+    def _serve_tokens(self):
+        """Grant one API call per request out of the strategy's rate limiter"""
+        limiter = self.strategy.rate_limiter
+        while True:
+            shard_id = self._token_requests.get()
+            if shard_id is None:
+                return
+            limiter.acquire()
+            self._grants[shard_id].put(1)
+
+    def run(self, scan_results):
+        """
+        Trigger the workers and execute entries as they stream in
+
+        Args:
+            scan_results: Summary counters, updated in place
+        """
+        self.start()
+        self._go.set()
+        pending = set(range(len(self.shards)))
+        while pending:
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if self.strategy.stop_event.is_set():
+                    log.info("Sharded scan stopped")
+                    return
+                for shard_id in list(pending):
+                    process = self._processes[shard_id]
+                    if not process.is_alive():
+                        log.error(f"❌ Scan shard {shard_id} exited (code {process.exitcode}) without finishing")
+                        pending.discard(shard_id)
+                continue
+
+            # Take everything that has arrived so the options are quoted in one batch
+            entries = []
+            while message is not None:
+                kind, shard_id, payload = message
+                if kind == 'entry':
+                    entries.append(payload)
+                elif kind == 'done':
+                    for key in WORKER_COUNTERS:
+                        scan_results[key] += payload['counters'][key]
+                    self.worker_stats[shard_id] = payload
+                    pending.discard(shard_id)
+                elif kind == 'error':
+                    log.error(f"❌ Scan shard {shard_id} failed: {payload}")
+                    pending.discard(shard_id)
+                try:
+                    message = self._results.get_nowait()
+                except queue.Empty:
+                    message = None
+            if entries:
+                self.strategy._execute_entries(entries, scan_results)
+
+        for shard_id, stats in sorted(self.worker_stats.items()):
+            log.info(f"  Shard {shard_id}: {stats['stocks']} stocks, {stats['entries']} qualifier(s), "
+                     f"{stats['calls']} API calls, {stats['seconds']:.2f}s")
+
+    def stop(self, timeout=5):
+        """Stop the token thread and the workers (workers never triggered are terminated)"""
+        processes, self._processes = self._processes, []
+        if self._budget_thread is not None:
+            self._token_requests.put(None)
+            self._budget_thread.join(timeout)
+            self._budget_thread = None
+        for process in processes:
+            if self._go.is_set():
+                process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(1)
+
+
+def _worker_main(shard_id, stocks, prev_day, spec, workers, go, results, token_requests, grants):
+    """Worker process: build a strategy for one shard, wait for the trigger, stream qualifiers"""
+    import time
+    from config import LOGGING_CONFIG
+    from log_pipeline import setup_logging, stop_logging
+    from rate_limiter import FyersRateLimiter
+    from fno_trading_strategy import FnOTradingStrategy
+
+    # Console only: the coordinator owns the log files and the journal
+    stop_logging()
+    setup_logging(dict(LOGGING_CONFIG, LOG_FILE=None, ACTIVITY_FILE=None))
+
+    class GrantedRateLimiter(FyersRateLimiter):
+        """Local stats, but every call waits for a token from the coordinator"""
+
+        def acquire(self):
+            token_requests.put(shard_id)
+            grants.get()
+            self.record_call()
+
+    try:
+        fyers, clock = _build_client(spec)
+        strategy = FnOTradingStrategy(
+            client_id=spec.get('client_id'), access_token=spec.get('access_token'), stock_list=stocks,
+            rate_limiter=GrantedRateLimiter(clock=clock), fyers_client=fyers, clock=clock, journal=False
+        )
+        strategy.scan_workers = workers
+        strategy.prefetch_workers = workers
+        strategy.prev_day_cache.update(prev_day)
+        strategy.warm_connections()
+
+        go.wait()
+        started = time.perf_counter()
+        scan_results = strategy._new_scan_results()
+        entries = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan') as executor:
+            future_to_stock = {executor.submit(strategy.get_first_candle, strategy.get_symbol_format(s)): s
+                               for s in stocks}
+            for future in concurrent.futures.as_completed(future_to_stock):
+                stock = future_to_stock[future]
+                try:
+                    candle = future.result()
+                except Exception as e:
+                    log.error(f"  ❌ Error fetching candle for {stock}: {e}")
+                    candle = None
+                symbol = strategy.get_symbol_format(stock)
+                if candle and symbol not in strategy.prev_day_cache:
+                    # Missed by the pre-fetch: one single call, as _fill_missing_prev_day does
+                    data = strategy.get_previous_day_data(symbol)
+                    if data:
+                        strategy.prev_day_cache[symbol] = data
+                entry = strategy._screen_stock(stock, candle, scan_results)
+                if entry:
+                    entries += 1
+                    results.put(('entry', shard_id, entry))
+
+        results.put(('done', shard_id, {
+            'counters': {key: scan_results[key] for key in WORKER_COUNTERS},
+            'stocks': len(stocks),
+            'entries': entries,
+            'calls': strategy.rate_limiter.total_calls_today,
+            'seconds': time.perf_counter() - started
+        }))
+    except Exception as e:
+        results.put(('error', shard_id, repr(e)))
+    finally:
+        stop_logging()
@@ -3,7 +3,8 @@ Test Fyers API Connection and Data Retrieval
 This will help debug the "Could not get first candle" issue
 """
 
-from fyers_apiv3 import fyersModel
+from fyers_client import create_fyers_client
+from rate_limiter import RateLimitedClient
 from config import FYERS_CONFIG, STOCK_LIST
 from datetime import datetime, timedelta
 import json
@@ -33,7 +34,7 @@ def test_connection():
         return None
     
     try:
-        fyers = fyersModel.FyersModel(client_id=client_id, token=access_token)
+        fyers = RateLimitedClient(create_fyers_client(client_id, access_token))  # Shares the account's call budget
         response = fyers.get_profile()
         
         if response.get('s') == 'ok':
@@ -182,13 +183,16 @@ def test_first_candle_logic(fyers):
     print(f"\nTrying to get first 3-min candle of {today}...")
     print(f"Time range: {today} 09:15:00 to {today} 09:18:00")
     
+    market_open = datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)
+    
     try:
+        # Times need date_format 0 (epoch); date_format 1 takes YYYY-MM-DD only
         data = {
             "symbol": symbol,
             "resolution": "3",
-            "date_format": "1",
-            "range_from": f"{today} 09:15:00",
-            "range_to": f"{today} 09:18:00",
+            "date_format": "0",
+            "range_from": str(int(market_open.timestamp())),
+            "range_to": str(int((market_open + timedelta(minutes=3)).timestamp())),
             "cont_flag": "1"
         }
         
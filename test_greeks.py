@@ -0,0 +1,100 @@
+"""
+Greeks Engine Tests
+GreeksEngine over a small PositionBook: live entries that are still
+waiting for a fill count at their order size when an entry is checked
+against the RISK_CONFIG Greek limits, so a batch of entries cannot breach
+them together.
+
+Run with:
+    python -m pytest -q test_greeks.py
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from clock import SimulatedClock
+from greeks import GreeksEngine
+from position_book import PositionBook
+
+NOW = datetime(2026, 1, 7, 10, 0)
+LOT = 750
+
+
+def position(stock, strike, status, lot_size, **extra):
+    return dict({'spot_symbol': f"NSE:{stock}-EQ", 'option_symbol': f"NSE:{stock}26JAN{strike}CE", 'type': 'CE',
+                 'strike': strike, 'entry_time': NOW, 'entry_price': 20.0, 'spot_price': 800.0,
+                 'lot_size': lot_size, 'status': status}, **extra)
+
+
+@pytest.fixture
+def engine():
+    strategy = SimpleNamespace(qualified_stocks=PositionBook(), clock=SimulatedClock(NOW), option_chain=None,
+                               log_activity=lambda message: None)
+    engine = GreeksEngine(strategy)
+    engine.limits = {'MAX_NET_DELTA_VALUE': None, 'MAX_NET_VEGA': None, 'MAX_THETA_PER_DAY': None}
+    return engine
+
+
+def quotes_for(book):
+    quotes = {}
+    for stock in book:
+        quotes[book[stock]['spot_symbol']] = {'lp': 800.0}
+        quotes[book[stock]['option_symbol']] = {'lp': 20.0}
+    return quotes
+
+
+def unit(engine, strike):
+    """Per-unit Greeks of one of the test contracts"""
+    return engine.contract(800.0, strike, f"NSE:X26JAN{strike}CE", 20.0, 'CE')
+
+
+def test_pending_entries_count_at_order_size(engine):
+    book = engine.book
+    book['SBIN'] = position('SBIN', 800, 'RUNNING', LOT)
+    book['PNB'] = position('PNB', 800, 'PENDING', 0, order_qty=LOT)
+    book['BEL'] = position('BEL', 800, 'PARTIAL', 250, order_qty=LOT)
+    engine.update(quotes_for(book))
+
+    vega = unit(engine, 800)['vega']
+    held, committed = engine.latest['portfolio'], engine.committed
+    assert held['count'] == 2
+    assert held['vega'] == pytest.approx(vega * (LOT + 250), rel=1e-6)
+    assert committed['count'] == 3
+    assert committed['vega'] == pytest.approx(vega * 3 * LOT, rel=1e-6)
+    # The dashboard shows what is held
+    assert set(engine.positions()) == {'SBIN', 'BEL'}
+
+
+def test_batch_of_live_entries_stays_inside_limits(engine):
+    book = engine.book
+    book['SBIN'] = position('SBIN', 800, 'RUNNING', LOT)
+    engine.update(quotes_for(book))
+    candidate = unit(engine, 800)
+    engine.limits['MAX_NET_VEGA'] = candidate['vega'] * LOT * 2.5
+
+    # Room for one more lot next to the running position
+    assert engine.allows(candidate, LOT, 800.0)
+
+    # Placed, not filled yet: it still takes up the room
+    book['PNB'] = position('PNB', 800, 'PENDING', 0, order_qty=LOT)
+    engine.update()
+    assert engine.latest['portfolio']['count'] == 1
+    assert not engine.allows(candidate, LOT, 800.0)
+
+    # Cancelled before any fill: the room is back
+    book['PNB']['status'] = 'CANCELLED'
+    engine.update()
+    assert engine.allows(candidate, LOT, 800.0)
+
+
+def test_order_size_change_reaches_the_cached_layout(engine):
+    book = engine.book
+    book['PNB'] = position('PNB', 800, 'PENDING', 0)
+    engine.update(quotes_for(book))
+    assert engine.committed['count'] == 0
+
+    book['PNB']['order_qty'] = LOT
+    engine.update()
+    assert engine.committed['vega'] == pytest.approx(unit(engine, 800)['vega'] * LOT, rel=1e-6)
@@ -0,0 +1,191 @@
+"""
+Order Stream Tests
+Drive OrderStream through the replay simulator: SimulatedFyersModel serves
+the orderbook and its ReplayOrderSocket stand-in delivers the order events,
+so the socket path, the merge into OrderIndex and the polling fallback run
+the same code they do live. FillTracker rides the same stream for the
+fill / cancel race of an entry that is being exited.
+
+Run with:
+    python -m pytest -q test_order_stream.py
+"""
+
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from fill_tracker import FillTracker
+from fyers_replay import ReplaySession, SimulatedClock, SimulatedFyersModel
+from order_stream import OrderStream
+from portfolio import PortfolioAggregator
+from position_book import PositionBook
+from rate_limiter import FyersRateLimiter
+
+SYMBOL = "NSE:SBIN26JAN800CE"
+SPEED = 100
+
+
+def wait_until(predicate, timeout=2.0):
+    """Poll `predicate` until it is true or `timeout` real seconds pass"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+@pytest.fixture
+def model():
+    start = datetime(2026, 1, 7, 9, 20)
+    session = ReplaySession({
+        "date": start.strftime("%Y-%m-%d"),
+        "funds": 100000.0,
+        "quotes": {SYMBOL: [[start.timestamp() - 60, {"lp": 100.0}]]}
+    })
+    return SimulatedFyersModel(session, SimulatedClock(start, speed=SPEED))
+
+
+@pytest.fixture
+def stream(model):
+    stream = OrderStream(model, FyersRateLimiter(clock=model.clock), model.clock,
+                         poll_seconds=1, reconcile_seconds=3600)
+    stream.changes = []
+    stream.subscribe(stream.changes.append)
+    stream.start()
+    assert wait_until(lambda: stream.connected)
+    yield stream
+    stream.stop()
+
+
+def buy(model, limit_price=None, qty=10):
+    """Place a BUY (market, or a resting limit order) and return its ID"""
+    data = {"symbol": SYMBOL, "qty": qty, "side": 1, "type": 2}
+    if limit_price is not None:
+        data.update(type=1, limitPrice=limit_price)
+    response = model.place_order(data)
+    assert response["s"] == "ok"
+    return response["id"]
+
+
+def event(order_id, **fields):
+    return {"s": "ok", "orders": {"id": order_id, **fields}}
+
+
+def test_socket_events_reach_the_index(model, stream):
+    assert stream.polls == 1   # Seeded once from the orderbook, then socket only
+    order_id = buy(model)
+
+    assert wait_until(lambda: (stream.index.get(order_id) or {}).get("status") == 2)
+    statuses = [order["status"] for changes in stream.changes for order in changes if order["id"] == order_id]
+    assert statuses == [6, 2]
+    assert stream.get_stats()["mode"] == "socket"
+    assert stream.polls == 1
+
+
+def test_deliver_merges_only_changes(model, stream):
+    order_id = buy(model, limit_price=50.0)
+    assert wait_until(lambda: stream.index.get(order_id) is not None)
+    stream.changes.clear()
+    version = stream.index.version
+    socket = stream._socket
+
+    # The same record again is not a change
+    socket.deliver({"s": "ok", "orders": stream.index.get(order_id)})
+    assert stream.changes == []
+    assert stream.index.version == version
+
+    # A partial update is merged into the known order and published once
+    socket.deliver(event(order_id, filledQty=4, tradedPrice=49.95))
+    socket.deliver(event(order_id, filledQty=4))
+    assert len(stream.changes) == 1
+    merged = stream.changes[0][0]
+    assert (merged["status"], merged["filledQty"], merged["tradedPrice"], merged["qty"]) == (6, 4, 49.95, 10)
+    assert stream.index.version == version + 1
+
+    # Failed events are ignored
+    socket.deliver({"s": "error", "orders": {"id": order_id, "status": 1}})
+    assert stream.index.get(order_id)["status"] == 6
+
+
+def test_dropped_socket_falls_back_to_polling(model, stream):
+    stream._socket.drop()
+    assert not stream.connected
+    assert stream.get_stats()["mode"] == "polling"
+
+    # Nothing is streamed any more: the order only shows up through an orderbook poll
+    polls = stream.polls
+    order_id = buy(model)
+    assert wait_until(lambda: stream.index.get(order_id) is not None)
+    assert stream.polls > polls
+    assert stream.index.get(order_id)["status"] == 2
+    assert any(order["id"] == order_id for changes in stream.changes for order in changes)
+
+    # Unchanged polls publish nothing
+    stream.changes.clear()
+    polls = stream.polls
+    assert wait_until(lambda: stream.polls >= polls + 3)
+    assert stream.changes == []
+
+
+@pytest.fixture
+def fills(model, stream):
+    """FillTracker on the stream, with one PENDING entry for SBIN"""
+    strategy = SimpleNamespace(qualified_stocks=PositionBook(), portfolio=PortfolioAggregator(),
+                               order_stream=stream, clock=model.clock, activity=[])
+    strategy.log_activity = strategy.activity.append
+    strategy._journal = lambda kind, stock, data: None
+    strategy.qualified_stocks["SBIN"] = {"option_symbol": SYMBOL, "type": "CE", "status": "PENDING",
+                                         "lot_size": 0, "order_qty": 10, "entry_price": 50.0}
+    strategy.portfolio.upsert("SBIN", strategy.qualified_stocks["SBIN"])
+    return FillTracker(strategy)
+
+
+def test_cancel_waits_for_a_fill_that_lands_first(model, stream, fills):
+    order_id = buy(model, limit_price=50.0)
+    fills.acknowledged("SBIN", "entry", order_id, 10, 50.0)
+    position = fills.book["SBIN"]
+    assert fills.pending_order("SBIN", "entry") == order_id
+
+    settled = {}
+
+    def cancel_side():
+        settled["ok"] = fills.wait_settled(order_id, 30)
+        settled["position"] = (position["status"], position["lot_size"])
+
+    waiter = threading.Thread(target=cancel_side)
+    waiter.start()
+    socket = stream._socket
+
+    # A fill that raced the cancel: the position grows, but the order is still open
+    socket.deliver(event(order_id, filledQty=4, tradedPrice=49.95))
+    time.sleep(0.05)
+    assert waiter.is_alive()
+    assert (position["status"], position["lot_size"]) == ("PARTIAL", 4)
+
+    # The cancel confirmation carries the final fill: the waiter sees the settled position
+    socket.deliver(event(order_id, status=1, filledQty=6))
+    waiter.join(2)
+    assert settled == {"ok": True, "position": ("RUNNING", 6)}
+    assert fills.pending_order("SBIN", "entry") is None
+
+    # Late duplicates of the finished order change nothing
+    socket.deliver(event(order_id, status=1, filledQty=6, message="dup"))
+    assert position["lot_size"] == 6
+
+
+def test_unconfirmed_cancel_times_out(model, stream, fills):
+    order_id = buy(model, limit_price=50.0)
+    fills.acknowledged("SBIN", "entry", order_id, 10, 50.0)
+
+    assert fills.wait_settled(order_id, 1) is False
+    assert fills.pending_order("SBIN", "entry") == order_id
+    assert fills.book["SBIN"]["status"] == "PENDING"
+
+    # Confirmed through the simulator's own cancel event
+    assert model.cancel_order({"id": order_id})["s"] == "ok"
+    assert fills.wait_settled(order_id, 1) is True
+    assert (fills.book["SBIN"]["status"], fills.book["SBIN"]["lot_size"]) == ("CANCELLED", 0)
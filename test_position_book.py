@@ -0,0 +1,89 @@
+"""
+Position Book Tests
+Deleting a position moves the book's last row into the hole: every column,
+the per-row overflow dict and the option symbol ID have to move with it,
+and nothing of the deleted row may survive into the next position stored
+in a freed row.
+
+Run with:
+    python -m pytest -q test_position_book.py
+"""
+
+import numpy as np
+import pytest
+
+from position_book import PositionBook
+
+
+def position(stock, **extra):
+    return dict({'spot_symbol': f"NSE:{stock}-EQ", 'option_symbol': f"NSE:{stock}26JAN800CE", 'type': 'CE',
+                 'strike': 800, 'entry_price': 20.0, 'lot_size': 750, 'status': 'RUNNING'}, **extra)
+
+
+@pytest.fixture
+def book():
+    book = PositionBook(capacity=2)   # Grows while the fixture fills it
+    book['SBIN'] = position('SBIN', order_qty=750, entry_order_id='O-SBIN')
+    book['PNB'] = position('PNB', entry_order_id='O-PNB')
+    book['BEL'] = position('BEL', type='PE', status='PARTIAL', lot_size=250, order_qty=500,
+                           entry_order_id='O-BEL', exit_price=21.5)
+    return book
+
+
+def test_delete_moves_last_row_with_its_overflow(book):
+    before = {stock: book.to_dict(stock) for stock in ('SBIN', 'BEL')}
+    del book['PNB']
+
+    assert list(book.stocks()) == ['SBIN', 'BEL']
+    assert {stock: book.to_dict(stock) for stock in ('SBIN', 'BEL')} == before
+    assert book['BEL']['option_symbol'] == "NSE:BEL26JAN800CE"
+    assert book['BEL'].get('order_qty') == 500
+    assert list(book.rows_with_status('PARTIAL')) == [1]
+
+
+def test_delete_clears_the_hole_when_the_last_row_has_no_overflow(book):
+    book['ITC'] = position('ITC')
+    del book['SBIN']
+
+    assert list(book.stocks()) == ['ITC', 'PNB', 'BEL']
+    assert book.to_dict('ITC') == position('ITC')
+    assert 'entry_order_id' not in book['ITC']
+    assert book['ITC']['option_symbol'] == "NSE:ITC26JAN800CE"
+
+
+def test_delete_last_row_leaves_nothing_for_the_next_position(book):
+    del book['BEL']
+    book['ITC'] = position('ITC')
+
+    assert book.to_dict('ITC') == position('ITC')
+    assert len(book) == 3
+    assert np.isnan(book.floats['exit_price'][:3]).all()
+
+
+def test_shared_option_symbol_survives_a_delete(book):
+    book['SBIN2'] = position('SBIN2', option_symbol="NSE:SBIN26JAN800CE")
+    del book['SBIN']
+
+    assert book['SBIN2']['option_symbol'] == "NSE:SBIN26JAN800CE"
+    assert book.option_symbols() == ["NSE:SBIN26JAN800CE", "NSE:PNB26JAN800CE", "NSE:BEL26JAN800CE"]
+
+
+def test_delete_every_row(book):
+    for stock in list(book):
+        del book[stock]
+    assert len(book) == 0 and book.stocks() == [] and book.option_symbols() == []
+
+    book['ITC'] = position('ITC')
+    assert book.to_dict('ITC') == position('ITC')
+
+
+def test_version_follows_rows_and_contracts(book):
+    version = book.version
+    book['SBIN']['status'] = 'EXITED'
+    book['SBIN']['exit_price'] = 22.0
+    assert book.version == version
+
+    book['PNB']['order_qty'] = 750
+    assert book.version == version + 1
+    del book['PNB']
+    assert book.version == version + 2
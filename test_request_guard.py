@@ -0,0 +1,214 @@
+"""
+Request Guard Tests
+validate_history / validate_quotes decide whether a market-data call goes
+out at all, so a rule that is too strict silently blocks valid requests:
+every Fyers resolution, both date formats and the range limits are pinned
+here, along with RequestGuard's per-day negative cache.
+
+Run with:
+    python -m pytest -q test_request_guard.py
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from request_guard import (HISTORY_RESOLUTIONS, MAX_DAILY_DAYS, MAX_INTRADAY_DAYS, MAX_QUOTE_SYMBOLS,
+                           RequestGuard, validate_history, validate_quotes)
+
+SYMBOL = "NSE:SBIN-EQ"
+DAY = 86400
+FROM = datetime(2026, 1, 5).timestamp()
+
+
+class ManualClock:
+    """Session clock that only moves when the test says so"""
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def time(self):
+        return self.current.timestamp()
+
+
+def history(**fields):
+    data = {'symbol': SYMBOL, 'resolution': '5', 'date_format': '0',
+            'range_from': int(FROM), 'range_to': int(FROM + 5 * DAY), 'cont_flag': '1'}
+    data.update(fields)
+    return data
+
+
+def rejected_field(response):
+    assert response is not None and response['code'] == -50
+    return next(iter(response['data']))
+
+
+# ----------------------------------------------------------------------
+# validate_history
+# ----------------------------------------------------------------------
+
+@pytest.mark.parametrize('resolution', ['5S', '10S', '15S', '30S', '45S', '1', '2', '3', '5', '10', '15', '20',
+                                        '30', '45', '60', '120', '180', '240', 'D', '1D'])
+def test_every_fyers_resolution_is_accepted(resolution):
+    assert resolution in HISTORY_RESOLUTIONS
+    assert validate_history(history(resolution=resolution)) is None
+
+
+@pytest.mark.parametrize('resolution', ['', '7', '1H', '1M', 'W', '5s', '360'])
+def test_unknown_resolutions_are_rejected(resolution):
+    assert rejected_field(validate_history(history(resolution=resolution))) == 'resolution'
+
+
+def test_numeric_resolution_is_accepted():
+    assert validate_history(history(resolution=15)) is None
+
+
+def test_epoch_ranges():
+    assert validate_history(history(range_from=str(int(FROM)), range_to=f"{FROM + DAY:.0f}")) is None
+    assert validate_history(history(range_from=FROM, range_to=FROM + DAY)) is None
+    assert rejected_field(validate_history(history(range_from='2026-01-05'))) == 'date_format'
+    assert rejected_field(validate_history(history(range_to=None))) == 'date_format'
+
+
+def test_date_format_defaults_to_epoch():
+    data = history()
+    del data['date_format']
+    assert validate_history(data) is None
+
+
+def test_date_ranges():
+    assert validate_history(history(date_format='1', range_from='2026-01-05', range_to='2026-01-09')) is None
+    assert validate_history(history(date_format=1, range_from='2026-01-05', range_to='2026-01-05')) is None
+    assert rejected_field(validate_history(history(date_format='1'))) == 'date_format'   # Epochs
+    assert rejected_field(validate_history(history(date_format='1', range_from='05-01-2026',
+                                                   range_to='2026-01-09'))) == 'date_format'
+    assert rejected_field(validate_history(history(date_format='1', range_from='2026-02-30',
+                                                   range_to='2026-03-02'))) == 'date_format'
+
+
+def test_unknown_date_format():
+    assert rejected_field(validate_history(history(date_format='2'))) == 'date_format'
+
+
+def test_reversed_range():
+    assert rejected_field(validate_history(history(range_from=FROM + DAY, range_to=FROM))) == 'range_from'
+
+
+@pytest.mark.parametrize('resolution, max_days', [('5', MAX_INTRADAY_DAYS), ('5S', MAX_INTRADAY_DAYS),
+                                                  ('D', MAX_DAILY_DAYS), ('1D', MAX_DAILY_DAYS)])
+def test_range_limits(resolution, max_days):
+    assert validate_history(history(resolution=resolution, range_to=FROM + max_days * DAY)) is None
+    too_long = history(resolution=resolution, range_to=FROM + max_days * DAY + 1)
+    assert rejected_field(validate_history(too_long)) == 'range_to'
+
+
+def test_daily_range_limit_with_dates():
+    start = datetime(2025, 1, 1)
+    end = start + timedelta(days=MAX_DAILY_DAYS)
+    data = history(resolution='D', date_format='1', range_from=f"{start:%Y-%m-%d}", range_to=f"{end:%Y-%m-%d}")
+    assert validate_history(data) is None
+    data['range_to'] = f"{end + timedelta(days=1):%Y-%m-%d}"
+    assert rejected_field(validate_history(data)) == 'range_to'
+
+
+@pytest.mark.parametrize('symbol', ["SBIN", "nse:SBIN-EQ", "NSE:SBIN EQ", None, ""])
+def test_malformed_symbols(symbol):
+    assert rejected_field(validate_history(history(symbol=symbol))) == 'symbol'
+
+
+@pytest.mark.parametrize('symbol', ["NSE:M&M-EQ", "NSE:BAJAJ-AUTO-EQ", "NSE:NIFTY50-INDEX", "NSE:SBIN26JAN800CE"])
+def test_listed_symbol_shapes(symbol):
+    assert validate_history(history(symbol=symbol)) is None
+
+
+def test_history_request_must_be_a_dict():
+    assert rejected_field(validate_history(None)) == 'data'
+
+
+# ----------------------------------------------------------------------
+# validate_quotes
+# ----------------------------------------------------------------------
+
+def test_quotes():
+    symbols = [f"NSE:S{i}-EQ" for i in range(MAX_QUOTE_SYMBOLS)]
+    assert validate_quotes({'symbols': ','.join(symbols)}) is None
+    assert validate_quotes({'symbols': ','.join(symbols) + ','}) is None   # Trailing comma
+    assert rejected_field(validate_quotes({'symbols': ','.join(symbols + ["NSE:X-EQ"])})) == 'symbols'
+    assert rejected_field(validate_quotes({'symbols': ''})) == 'symbols'
+    assert rejected_field(validate_quotes({'symbols': symbols})) == 'symbols'   # A list, not a string
+    assert rejected_field(validate_quotes({'symbols': "NSE:SBIN-EQ,SBIN"})) == 'symbols'
+
+
+# ----------------------------------------------------------------------
+# RequestGuard
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def clock():
+    return ManualClock(datetime(2026, 1, 7, 15, 29))
+
+
+@pytest.fixture
+def guard(clock):
+    return RequestGuard(clock=clock, max_entries=3)
+
+
+def test_valid_requests_go_out(guard):
+    assert guard.check('history', history()) is None
+    assert guard.check('quotes', {'symbols': SYMBOL}) is None
+    assert guard.get_stats() == {'preflight_rejected': 0, 'negative_cache_hits': 0, 'negative_cache_size': 0}
+
+
+def test_orders_are_never_guarded(guard):
+    assert guard.check('place_order', {'symbol': 'bad'}) is None
+    guard.observe('place_order', {'symbol': 'bad'}, {'s': 'error', 'code': -50})
+    assert guard.get_stats()['negative_cache_size'] == 0
+
+
+def test_preflight_rejection_is_cached(guard):
+    bad = history(resolution='7')
+    first = guard.check('history', bad)
+    assert first['code'] == -50
+    assert guard.check('history', dict(bad)) == first
+    assert guard.get_stats() == {'preflight_rejected': 1, 'negative_cache_hits': 1, 'negative_cache_size': 1}
+
+
+def test_deterministic_api_failures_are_cached(guard):
+    data = history(symbol="NSE:NOSUCH-EQ")
+    response = {'s': 'error', 'code': -300, 'message': 'Invalid symbol provided'}
+    guard.observe('history', data, response)
+    assert guard.check('history', data) == response
+    assert guard.check('history', history()) is None
+
+
+@pytest.mark.parametrize('response', [{'s': 'error', 'code': 429, 'message': 'request limit reached'},
+                                      {'s': 'error', 'code': -16, 'message': 'token expired'},
+                                      {'s': 'ok', 'code': 200, 'candles': []},
+                                      None])
+def test_retryable_outcomes_are_not_cached(guard, response):
+    guard.observe('history', history(), response)
+    assert guard.check('history', history()) is None
+
+
+def test_negative_cache_clears_when_the_day_rolls(guard, clock):
+    data = history(symbol="NSE:NOSUCH-EQ")
+    guard.observe('history', data, {'s': 'error', 'code': -300, 'message': 'Invalid symbol provided'})
+    clock.current += timedelta(minutes=30)      # Same day
+    assert guard.check('history', data) is not None
+
+    clock.current += timedelta(hours=9)         # Next morning
+    assert guard.check('history', data) is None
+    assert guard.get_stats()['negative_cache_size'] == 0
+
+
+def test_negative_cache_is_bounded(guard):
+    failure = {'s': 'error', 'code': -300, 'message': 'Invalid symbol provided'}
+    requests = [history(symbol=f"NSE:NOSUCH{i}-EQ") for i in range(4)]
+    for data in requests:
+        guard.observe('history', data, failure)
+    assert guard.get_stats()['negative_cache_size'] == 3
+    assert guard.check('history', requests[0]) is None   # Oldest dropped
+    assert guard.check('history', requests[-1]) == failure
@@ -0,0 +1,182 @@
+"""
+Scan Timeline Tracing (Chrome trace-event format)
+Records spans for the 9:18 scan and everything under it (first-candle
+fetches and their fallback, rate-limit waits, each Fyers call, option
+quotes, orders) into a per-day file that loads directly in
+chrome://tracing, Perfetto (ui.perfetto.dev) or speedscope.
+
+Tracing is toggled at runtime (POST /api/trace or tracing.enable()). When it
+is off, span() returns a shared no-op context manager after one flag check.
+Pending events are held in a bounded buffer (TRACE_CONFIG["MAX_EVENTS"]) until
+the next flush; once it is full the oldest events are dropped and counted.
+"""
+
+import os
+import json
+import asyncio
+import time
+import threading
+import contextlib
+from collections import deque
+from datetime import datetime
+
+_enabled = False
+_lock = threading.Lock()
+_events = deque(maxlen=100000)   # Pending events (append/popleft are thread-safe)
+_named_tids = set()
+_dropped = 0                     # Events pushed out of the full buffer since start
+_clock = None                    # Session clock naming the trace file (use_clock)
+_pid = os.getpid()
+_NOOP = contextlib.nullcontext()
+
+
+def is_enabled():
+    return _enabled
+
+
+def use_clock(clock):
+    """Name trace files by this clock's date (the strategy's session clock)"""
+    global _clock
+    _clock = clock
+
+
+def _record(event):
+    global _dropped
+    if len(_events) == _events.maxlen:
+        _dropped += 1
+    _events.append(event)
+
+
+def enable(flag=True):
+    """Turn tracing on or off (flushes pending events when turning off)"""
+    global _enabled
+    _enabled = bool(flag)
+    if not _enabled:
+        flush()
+
+
+def _tid():
+    """Thread id, or the asyncio task id so concurrent coroutines get their own track"""
+    task = None
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        pass
+    if task is not None:
+        tid, name = id(task), task.get_name()
+    else:
+        tid, name = threading.get_ident(), threading.current_thread().name
+    if tid not in _named_tids:
+        _named_tids.add(tid)
+        _record({'name': 'thread_name', 'ph': 'M', 'pid': _pid, 'tid': tid,
+                        'args': {'name': name}})
+    return tid
+
+
+class _Span:
+    __slots__ = ('name', 'cat', 'args', 'start')
+
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        _record({
+            'name': self.name, 'cat': self.cat, 'ph': 'X',
+            'ts': self.start * 1e6, 'dur': (end - self.start) * 1e6,
+            'pid': _pid, 'tid': _tid(), 'args': self.args
+        })
+        return False
+
+    def set(self, **args):
+        """Attach more arguments to the span while it is open"""
+        self.args.update(args)
+
+
+def span(name, cat='scan', **args):
+    """
+    Context manager recording one complete ('X') event
+
+    Usage:
+        with tracing.span('history', cat='api', symbol=symbol):
+            ...
+    """
+    if not _enabled:
+        return _NOOP
+    return _Span(name, cat, args)
+
+
+def instant(name, cat='scan', **args):
+    """Record a zero-duration marker"""
+    if not _enabled:
+        return
+    _record({'name': name, 'cat': cat, 'ph': 'i', 's': 't',
+                    'ts': time.perf_counter() * 1e6, 'pid': _pid, 'tid': _tid(), 'args': args})
+
+
+def request_symbol(args):
+    """Symbol(s) from a Fyers request dict, for span arguments"""
+    if _enabled and args and isinstance(args[0], dict):
+        return args[0].get('symbol') or args[0].get('symbols')
+    return None
+
+
+def trace_path(day=None):
+    """Per-day trace file path"""
+    from config import TRACE_CONFIG
+    day = day or (_clock.now() if _clock is not None else datetime.now())
+    return os.path.join(TRACE_CONFIG.get('DIR', 'traces'), f"trace_{day.strftime('%Y%m%d')}.json")
+
+
+def flush():
+    """
+    Append pending events to today's trace file
+
+    Uses the JSON-array trace format, which viewers accept without the
+    closing bracket, so each flush simply appends.
+
+    Returns:
+        int: Number of events written
+    """
+    with _lock:
+        pending = []
+        while _events:
+            pending.append(_events.popleft())
+        _named_tids.clear()  # Re-emit thread names in the next batch
+        if not pending:
+            return 0
+        path = trace_path()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, 'a') as f:
+            if new_file:
+                f.write('[\n')
+            f.write(',\n'.join(json.dumps(e, default=str) for e in pending))
+            f.write(',\n')
+        return len(pending)
+
+
+def status():
+    """Tracing state for the dashboard / API"""
+    return {'enabled': _enabled, 'pending_events': len(_events), 'dropped_events': _dropped, 'file': trace_path()}
+
+
+def _init_from_config():
+    global _events
+    try:
+        from config import TRACE_CONFIG
+        _events = deque(maxlen=TRACE_CONFIG.get('MAX_EVENTS', 100000))
+        enable(TRACE_CONFIG.get('ENABLED', False))
+    except ImportError:
+        pass
+
+
+_init_from_config()
@@ -0,0 +1,202 @@
+"""
+Trading Universe Compiler
+Resolves STOCK_LIST against the Fyers NSE_FO symbol master before the
+strategy starts, so the pre-fetch and the 9:18 scan only spend API calls on
+underlyings that actually have F&O contracts today:
+
+- duplicates are dropped (first occurrence wins, order kept)
+- renamed / merged names are mapped to their current symbol (RENAMED)
+- names with no contracts in the master are dropped and reported
+
+The result is cached (UNIVERSE_CONFIG["CACHE_FILE"]) per stock list and
+master file, so restarts skip the CSV parse.
+
+Usage:
+    from universe import get_universe
+    stock_list = get_universe(STOCK_LIST)['stocks']
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+import requests
+import pandas as pd
+
+from log_pipeline import get_logger
+
+log = get_logger('universe')
+
+MASTER_FILE = "nse_fo.csv"
+MASTER_URL = "https://public.fyers.in/sym_details/NSE_FO.csv"
+MASTER_MAX_AGE = 86400  # Re-download after 24 hours
+
+# Fyers NSE_FO.csv columns (no header row)
+LOT_SIZE_COLUMN = 3
+SYMBOL_COLUMN = 9
+UNDERLYING_COLUMN = 13
+
+# Old NSE symbol -> current one (renames, mergers, demergers)
+RENAMED = {
+    "MINDTREE": "LTIM",
+    "CADILAHC": "ZYDUSLIFE",
+    "MCDOWELL-N": "UNITDSPR",
+    "L&TFH": "LTF",
+    "AMARAJABAT": "ARE&M",
+    "SRTRANSFIN": "SHRIRAMFIN",
+    "GMRINFRA": "GMRAIRPORT",
+    "ZOMATO": "ETERNAL",
+}
+
+_master_lock = threading.Lock()
+_master = (None, None)  # (mtime, DataFrame) of the last parsed master file
+
+
+def ensure_master(path=MASTER_FILE, max_age=MASTER_MAX_AGE):
+    """
+    Download the symbol master if it is missing or older than `max_age`
+
+    Returns:
+        str: Path of the master file, or None if there is none on disk
+    """
+    stale = not os.path.exists(path) or time.time() - os.path.getmtime(path) > max_age
+    if stale:
+        try:
+            log.info(f"Downloading Fyers master symbol file from {MASTER_URL}...")
+            response = requests.get(MASTER_URL, timeout=30)
+            if response.status_code == 200:
+                with open(path, 'wb') as f:
+                    f.write(response.content)
+                log.info(f"Downloaded {path}")
+            else:
+                log.warning(f"Failed to download Fyers master file: Status {response.status_code}")
+        except Exception as e:
+            log.warning(f"Failed to download Fyers master file: {e}")
+    return path if os.path.exists(path) else None
+
+
+def load_master(path=MASTER_FILE):
+    """
+    Parsed symbol master (downloaded if stale; parsed once per file version)
+
+    Returns:
+        pandas.DataFrame, or None when no master is available
+    """
+    global _master
+    path = ensure_master(path)
+    if path is None:
+        return None
+    mtime = os.path.getmtime(path)
+    with _master_lock:
+        cached_mtime, df = _master
+        if cached_mtime != mtime or df is None:
+            df = pd.read_csv(path, header=None, low_memory=False)
+            _master = (mtime, df)
+    return df
+
+
+def compile_universe(stocks, master=None):
+    """
+    Dedupe, map and validate a stock list
+
+    Args:
+        stocks: Configured stock list (e.g. STOCK_LIST)
+        master: Parsed symbol master (None = dedupe and map only)
+
+    Returns:
+        dict: {
+            'stocks': [...],             # tradable underlyings, configured order
+            'renamed': {old: new},
+            'duplicates': [...],
+            'dropped': [...],            # no F&O contracts in the master
+            'validated': bool            # False when no master was available
+        }
+    """
+    tradable = None
+    if master is not None:
+        tradable = set(master[UNDERLYING_COLUMN].dropna().astype(str).str.strip())
+
+    result = {'stocks': [], 'renamed': {}, 'duplicates': [], 'dropped': [], 'validated': tradable is not None}
+    seen = set()
+    for stock in stocks:
+        name = stock.strip().upper()
+        if tradable is not None and name not in tradable and RENAMED.get(name) in tradable:
+            result['renamed'][name] = RENAMED[name]
+            name = RENAMED[name]
+        elif tradable is None and name in RENAMED:
+            result['renamed'][name] = RENAMED[name]
+            name = RENAMED[name]
+        if name in seen:
+            result['duplicates'].append(stock)
+            continue
+        seen.add(name)
+        if tradable is not None and name not in tradable:
+            result['dropped'].append(stock)
+            continue
+        result['stocks'].append(name)
+    return result
+
+
+def _cache_key(stocks, master_path):
+    mtime = os.path.getmtime(master_path) if master_path and os.path.exists(master_path) else None
+    blob = json.dumps({'stocks': list(stocks), 'master_mtime': mtime, 'renamed': RENAMED}, sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def get_universe(stocks, master_path=MASTER_FILE):
+    """
+    Compiled universe for a stock list, from the cache when the list and
+    the master file are unchanged
+
+    Args:
+        stocks: Configured stock list
+        master_path: Fyers NSE_FO master CSV
+
+    Returns:
+        dict: compile_universe() result plus 'configured' (input count) and 'cached'
+    """
+    from config import UNIVERSE_CONFIG
+    if not UNIVERSE_CONFIG.get('ENABLED', True):
+        return {'stocks': list(stocks), 'renamed': {}, 'duplicates': [], 'dropped': [],
+                'validated': False, 'configured': len(stocks), 'cached': False}
+
+    ensure_master(master_path)
+    cache_file = UNIVERSE_CONFIG.get('CACHE_FILE')
+    if cache_file and not os.path.isabs(cache_file):
+        cache_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), cache_file)
+    key = _cache_key(stocks, master_path)
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r') as f:
+                cached = json.load(f)
+            if cached.get('key') == key:
+                return dict(cached['universe'], cached=True)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    started = time.perf_counter()
+    master = load_master(master_path) if os.path.exists(master_path) else None
+    universe = compile_universe(stocks, master)
+    universe['configured'] = len(stocks)
+
+    if universe['renamed']:
+        log.info(f"🔁 Universe: mapped {', '.join(f'{old}→{new}' for old, new in universe['renamed'].items())}")
+    if universe['duplicates']:
+        log.info(f"🧹 Universe: skipped duplicates {', '.join(universe['duplicates'])}")
+    if universe['dropped']:
+        log.warning(f"⚠️ Universe: no F&O contracts for {', '.join(universe['dropped'])} - dropped")
+    if not universe['validated']:
+        log.warning("⚠️ Universe: symbol master unavailable - list deduped and mapped but not validated")
+    log.info(f"Universe: {len(universe['stocks'])} tradable of {len(stocks)} configured "
+             f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+    if cache_file and universe['validated']:
+        try:
+            os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+            with open(cache_file, 'w') as f:
+                json.dump({'key': key, 'universe': universe}, f)
+        except OSError as e:
+            log.warning(f"Could not cache the universe: {e}")
+    return dict(universe, cached=False)